@@ -0,0 +1,73 @@
+"""
+Import-time benchmark for 'import gazer'.
+
+Run from anywhere:
+
+    python benchmarks/import_time.py --budget 0.5 --repeat 5
+
+Every measurement runs in a fresh interpreter. The benchmark fails (exit
+code 1) if the best of 'repeat' import times exceeds the budget (seconds), 
+or if importing gazer pulls in any of the heavy dependencies below, which 
+should only be imported on first use.
+
+"""
+from __future__ import print_function
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+HEAVY = ('sklearn', 'scipy', 'skopt', 'pandas', 'tqdm', 'joblib', 
+         'keras', 'tensorflow', 'xgboost', 'matplotlib', 'seaborn')
+
+SNIPPET = """
+import sys, json, time, warnings
+warnings.simplefilter('ignore')
+start = time.time()
+import gazer
+elapsed = time.time() - start
+heavy = sorted(set(m.split('.')[0] for m in sys.modules) & set({heavy!r}))
+print(json.dumps({{'elapsed': elapsed, 'heavy': heavy}}))
+"""
+
+
+def measure(repeat=5):
+    """ Time 'import gazer' in 'repeat' fresh interpreters. """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = SNIPPET.format(heavy=HEAVY)
+    results = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=root)
+        results.append(json.loads(output.decode().strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=0.5, 
+                        help="Maximum allowed import time (seconds).")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Number of fresh interpreters to time.")
+    args = parser.parse_args()
+    
+    results = measure(args.repeat)
+    best = min(r['elapsed'] for r in results)
+    heavy = sorted(set(m for r in results for m in r['heavy']))
+    
+    print("import gazer: best {:.3f}s, worst {:.3f}s over {} runs (budget {:.3f}s)"
+          .format(best, max(r['elapsed'] for r in results), len(results), args.budget))
+    failed = False
+    if heavy:
+        print("FAIL: heavy modules imported eagerly: {}".format(", ".join(heavy)))
+        failed = True
+    if best > args.budget:
+        print("FAIL: import time exceeds budget.")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
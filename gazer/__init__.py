@@ -1,4 +1,5 @@
 import warnings
+from importlib.util import find_spec
 
 # Set version and author/email by hand
 __version__ = '0.0.1'
@@ -6,15 +7,13 @@ __author__ = "Magnus Axelsson"
 __email__ = "johanmagnusaxelsson<at>gmail<dot>com"
 
 
-# Find external packages
+# Find external packages (without importing them)
 def __checklib__(lib, alias):
-    try:
-        exec("import {}".format(lib))
+    if find_spec(lib) is not None:
         return True
-    except:
-        warnings.warn("""{} import failed; '{}' 
-        will be unavailable.""".format(lib, alias), RuntimeWarning)
-        return False
+    warnings.warn("""{} not found; '{}' 
+    will be unavailable.""".format(lib, alias), RuntimeWarning)
+    return False
     
 __importflags__ = [
     __checklib__(lib, alias) for lib, alias 
@@ -24,6 +23,7 @@ __importflags__ = [
 # Once the flags are set, we can import package
 from .core import GazerMetaLearner
 from .ensembler import GazerMetaEnsembler
+from .predictor import EnsemblePredictor
 
 
-__all__ = [ "GazerMetaLearner", "GazerMetaEnsembler" ]
\ No newline at end of file
+__all__ = [ "GazerMetaLearner", "GazerMetaEnsembler", "EnsemblePredictor" ]
\ No newline at end of file
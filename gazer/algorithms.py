@@ -4,43 +4,189 @@ This module provides an overview and collects all implemented base classifiers
 from several possible sources.
 
 The core module uses the below function when importing algorithms into its 
-library.
+library. Algorithms are described by lightweight descriptors: a classifier
+module is only imported, and the meta classifier only instantiated, once the
+algorithm is selected and first accessed (see 'AlgorithmRegistry').
 
-To add a new algorithm simply add a new line describing the file and the class
-of the new classifier: ('file_name', 'name_of_meta_class')
+To add a new algorithm simply add a new line describing the file, the class
+and the name of the new classifier: ('file_name', 'name_of_meta_class', 'name')
+The name must match the 'name' attribute set by the meta class.
 
 """
+import inspect
+from importlib import import_module
+from importlib.util import find_spec
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
 
 def implemented(add_network=True, add_xgboost=True):
     """ 
     Hard coded list of algorithms. Certain algorithms (such as e.g. keras) 
-    are only sent in if flag allows it. 
+    are only sent in if flag allows it. Nothing is imported here. 
     
     """    
 
     algorithms = [    
         # Scikit-learn algorithms
-        ('adaboost', 'MetaAdaBoostClassifier'),
-        ('gbm', 'MetaGradBoostingClassifier'),
-        ('logistic_regression', 'MetaLogisticRegressionClassifier'),
-        ('nearest_neighbors', 'MetaKNearestNeighborClassifier'), 
-        ('naive_bayes', 'MetaBernoulliNBayesClassifier'),
-        ('naive_bayes', 'MetaGaussianNBayesClassifier'),
-        ('naive_bayes', 'MetaMultinomialNBayesClassifier'),        
-        ('random_forest', 'MetaRandomForestClassifier'),
-        ('sgdescent', 'MetaSGDClassifier'),
-        ('svm', 'MetaSVMClassifier'),
-        ('tree', 'MetaDecisionTreeClassifier')]
+        ('adaboost', 'MetaAdaBoostClassifier', 'adaboost'),
+        ('gbm', 'MetaGradBoostingClassifier', 'gbm'),
+        ('logistic_regression', 'MetaLogisticRegressionClassifier', 'logreg'),
+        ('nearest_neighbors', 'MetaKNearestNeighborClassifier', 'knn'), 
+        ('naive_bayes', 'MetaBernoulliNBayesClassifier', 'bernoulli_nb'),
+        ('naive_bayes', 'MetaGaussianNBayesClassifier', 'gaussian_nb'),
+        ('naive_bayes', 'MetaMultinomialNBayesClassifier', 'multinomial_nb'),        
+        ('random_forest', 'MetaRandomForestClassifier', 'random_forest'),
+        ('sgdescent', 'MetaSGDClassifier', 'sgd_hinge'),
+        ('svm', 'MetaSVMClassifier', 'svm'),
+        ('tree', 'MetaDecisionTreeClassifier', 'tree')]
     
     # Keras
     if add_network:
-        import keras
-        algorithms.append(('neural_network', 'MetaNeuralNetworkClassifier'))
+        algorithms.append(('neural_network', 'MetaNeuralNetworkClassifier', 'neuralnet'))
     
     # Xgboost
     if add_xgboost:
-        import xgboost
-        algorithms.append(('xgb', 'MetaXGBoostClassifier'))        
+        algorithms.append(('xgb', 'MetaXGBoostClassifier', 'xgboost'))        
     
     return algorithms
 
+
+# Third party packages each classifier module needs (scikit-learn otherwise)
+REQUIRES = {'neural_network': ('keras',),
+            'xgb': ('xgboost',)}
+
+
+
+class AlgorithmDescriptor(object):
+    """
+    Describes how to build a meta classifier without importing it.
+
+    Parameters:
+    ------------
+        module : str
+            Module name in the 'classifiers' package, or the full name of
+            a module defining the meta classifier.
+
+        cls : str
+            Name of the meta classifier class.
+
+        name : str
+            Name of the algorithm (i.e. the key in GazerMetaLearner.clf).
+
+        params : None or dict, default: None
+            Keyword arguments passed to the meta classifier on instantiation.
+
+    """
+    def __init__(self, module, cls, name, params=None):
+        self.module = module
+        self.cls = cls
+        self.name = name
+        self.params = {} if params is None else dict(params)
+
+    def __repr__(self):
+        return "AlgorithmDescriptor({}.{}, name='{}')".format(self.module, self.cls, self.name)
+
+    def load(self):
+        """ Import and return the meta classifier class. """
+        path = self.module
+        if not '.' in path:
+            package = __name__.rpartition('.')[0]
+            path = ".".join((package, "classifiers", path))
+        return getattr(import_module(path), self.cls)
+
+    def missing(self):
+        """ Required packages that are not installed (nothing is imported). """
+        requires = REQUIRES.get(self.module, ('sklearn',))
+        return [package for package in requires if find_spec(package) is None]
+
+    def accepts(self, param):
+        """ True if the meta classifier's __init__ takes 'param'. """
+        return param in inspect.getfullargspec(self.load().__init__).args[1:]
+
+
+
+class AlgorithmRegistry(MutableMapping):
+    """
+    Dictionary of (name, meta classifier) pairs whose values are created
+    on first access from a set of AlgorithmDescriptor's.
+
+    Parameters:
+    ------------
+        descriptors : list of AlgorithmDescriptor
+            Algorithms available in the registry (in order).
+
+        factory : callable
+            Called with a descriptor to create the meta classifier. If it
+            returns None, the algorithm is dropped from the registry.
+
+    """
+    def __init__(self, descriptors, factory):
+        self._descriptors = [(d.name, d) for d in descriptors]
+        self._factory = factory
+        self._instances = {}
+
+    def descriptor(self, name):
+        for key, descriptor in self._descriptors:
+            if key == name:
+                return descriptor
+        raise KeyError(name)
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def reset(self, name, params):
+        """ Replace the parameters of an algorithm. The meta classifier is
+        rebuilt (lazily) on next access.
+        """
+        self.descriptor(name)  # raises KeyError for unknown names
+        self._descriptors = [(key, AlgorithmDescriptor(d.module, d.cls, d.name, params)
+                              if key == name else d) for key, d in self._descriptors]
+        self._instances.pop(name, None)
+        return
+
+    def __getitem__(self, name):
+        if not name in self._instances:
+            instance = self._factory(self.descriptor(name))
+            if instance is None:
+                del self[name]
+                raise KeyError(name)
+            self._instances[name] = instance
+        return self._instances[name]
+
+    def items(self):
+        """ (name, meta classifier) pairs, skipping the algorithms that fail to build. """
+        pairs = []
+        for name in list(self):
+            try:
+                pairs.append((name, self[name]))
+            except KeyError:
+                continue
+        return pairs
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def __setitem__(self, name, value):
+        if not name in self:
+            cls = type(value)
+            self._descriptors.append((name, AlgorithmDescriptor(cls.__module__, cls.__name__, name)))
+        self._instances[name] = value
+
+    def __delitem__(self, name):
+        if not name in self:
+            raise KeyError(name)
+        self._descriptors = [(key, d) for key, d in self._descriptors if key != name]
+        self._instances.pop(name, None)
+
+    def __contains__(self, name):
+        return any(key == name for key, _ in self._descriptors)
+
+    def __iter__(self):
+        return iter([key for key, _ in self._descriptors])
+
+    def __len__(self):
+        return len(self._descriptors)
@@ -0,0 +1,450 @@
+"""
+Packed model archive.
+
+A library stored as one pickle per model is slow to list and to load on
+network filesystems, and carries no metadata. A 'ModelArchive' appends the
+pickled models to a few large segment files and indexes them in a manifest:
+
+    <archive>/manifest.json
+    <archive>/segment_0000.bin
+    <archive>/segment_0001.bin
+
+    {'version': 1, 'segments': ['segment_0000.bin', ...],
+     'members': [{'id': 0, 'name': 'random_forest', 'segment': 0, 'offset': 0,
+                  'size': 183262, 'score': 0.91, 'params': {'n_estimators': 128, ...}},
+                 ...]}
+
+Opening an archive reads the manifest only: a member is unpickled from its
+byte range of a segment when it is loaded. Members are referred to by
+'<archive>#<id>' (see 'member_ref'); 'load_model' accepts such references
+as well as plain model files, so they can be used wherever the ensembler
+expects a model file.
+
+A 'ModelWriter' persists models (to files, or to an archive) in a background
+thread, so that writing overlaps with fitting the next models.
+
+Example:
+---------
+    >>> ensembler.fit(X, y, save_dir='library', archive=True)
+    >>> ModelArchive('library').members(name='random_forest')
+    >>> ensembler = GazerMetaEnsembler.from_state('library')
+
+"""
+import io
+import os
+import glob
+import json
+import queue
+import warnings
+import threading
+
+from .cost import get_params, _scalars
+from .instrument import bus
+from .utils.lazy import LazyModule
+
+# Heavy dependencies are imported on first use
+joblib = LazyModule('sklearn.externals.joblib')
+
+
+MANIFEST = 'manifest.json'
+SEGMENT = 'segment_{:04d}.bin'
+SEPARATOR = '#'
+VERSION = 1
+
+
+
+def pack(model, compress=0):
+    """ Pickled bytes of a model, as stored in an archive. """
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer, compress=compress)
+    return buffer.getvalue()
+
+
+def is_archive(path):
+    """ True if 'path' is a folder holding an archive manifest. """
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def member_ref(path, member_id):
+    """ Reference to member 'member_id' of the archive at 'path'. """
+    return "{}{}{}".format(path, SEPARATOR, member_id)
+
+
+def split_ref(ref):
+    """ Tuple (archive path, member id) of a member reference, or
+    (ref, None) if 'ref' is a plain model file.
+    """
+    path, separator, member = ref.rpartition(SEPARATOR)
+    if separator and member.isdigit() and is_archive(path):
+        return path, int(member)
+    return ref, None
+
+
+# Readers are shared, so that a manifest is read once per process
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def open_archive(path):
+    """ Read-only archive at 'path'. The manifest is read again only if
+    it was rewritten since the last call.
+    """
+    mtime = os.path.getmtime(os.path.join(path, MANIFEST))
+    key = os.path.abspath(path)
+    with _readers_lock:
+        reader = _readers.get(key)
+        if reader is None or reader[0] != mtime:
+            reader = _readers[key] = (mtime, ModelArchive(path))
+    return reader[1]
+
+
+def load_model(ref):
+    """ Load a pickled model file, or an archive member. """
+    path, member = split_ref(ref)
+    if member is None:
+        return joblib.load(ref)
+    return open_archive(path).load(member)
+
+
+def source_file(ref):
+    """ File holding a model: the segment file of an archive member. """
+    path, member = split_ref(ref)
+    if member is None:
+        return ref
+    return open_archive(path).segment_file(member)
+
+
+def cache_prefix(ref):
+    """ Prefix of the files cached for a model (e.g. its predictions).
+    Those of an archive member are kept inside the archive folder.
+    """
+    path, member = split_ref(ref)
+    if member is None:
+        return ref
+    return os.path.join(path, "member_{:06d}".format(member))
+
+
+
+class ModelArchive(object):
+    """
+    Models packed into segment files, indexed by a manifest.
+    Adding members is safe from several threads.
+
+    Parameters:
+    ------------
+        path : str
+            Folder of the archive. It is created if needed.
+
+        mode : str, default: 'r'
+            - 'r': read an existing archive,
+            - 'w': create an archive; an existing archive in the folder
+                   (and its cached files) is removed,
+            - 'a': add members to an existing archive (or create it).
+                   New members go to new segments: existing segments are
+                   never modified.
+
+        segment_size : integer, default: 256
+            Size (in megabytes) after which a new segment file is started.
+
+        compress : integer, default: 0
+            joblib compression level (0-9) of added members.
+
+    Notes:
+    -------
+        The manifest is written by 'flush' and 'close' (or on leaving a
+        'with' block): members added since are not visible to readers.
+
+    """
+    def __init__(self, path, mode='r', segment_size=256, compress=0):
+        if not mode in ('r', 'w', 'a'):
+            raise ValueError("mode should be 'r', 'w' or 'a'.")
+        self.path = path
+        self.mode = mode
+        self.segment_size = segment_size * 2**20
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._file = None
+
+        if mode == 'w' or (mode == 'a' and not is_archive(path)):
+            if is_archive(path):
+                self._remove()
+            elif not os.path.isdir(path):
+                os.makedirs(path)
+            self.manifest = {'version': VERSION, 'segments': [], 'members': []}
+        else:
+            with open(os.path.join(path, MANIFEST)) as f:
+                self.manifest = json.load(f)
+            if self.manifest.get('version') != VERSION:
+                raise ValueError("Unsupported archive version: {}"
+                                 .format(self.manifest.get('version')))
+        self._members = {member['id']: member for member in self.manifest['members']}
+        self._next_id = max(self._members) + 1 if self._members else 0
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.manifest['members'])
+
+
+    def _remove(self):
+        """ Remove the files of the archive in 'path'. """
+        with open(os.path.join(self.path, MANIFEST)) as f:
+            segments = json.load(f).get('segments', [])
+        filenames = [os.path.join(self.path, segment) for segment in segments]
+        for filename in filenames + glob.glob(os.path.join(self.path, 'member_*')):
+            if os.path.isfile(filename):
+                os.remove(filename)
+        os.remove(os.path.join(self.path, MANIFEST))
+
+
+    def _next_segment(self):
+        if self._file is not None:
+            self._file.close()
+        filename = SEGMENT.format(len(self.manifest['segments']))
+        self._file = open(os.path.join(self.path, filename), 'wb')
+        self.manifest['segments'].append(filename)
+
+
+    def add(self, name, model, score=None, params=None):
+        """
+        Pickle a model and append it to the archive.
+
+        Parameters:
+        ------------
+            name : str
+                Name of the algorithm (e.g. 'random_forest').
+
+            model : object
+                Fitted model.
+
+            score : None or float, default: None
+                Training score, kept in the manifest.
+
+            params : None or dict, default: None
+                Parameters kept in the manifest (only scalars). Taken
+                from the model if None.
+
+        Returns:
+        ---------
+            Reference of the member (see 'member_ref').
+
+        """
+        # Pickle outside the lock: only the writes are serialized
+        params = get_params(model) if params is None else params
+        return self.add_packed(name, pack(model, self.compress), score=score, params=params)
+
+
+    def reserve(self):
+        """ Reserve the id of a member that is added later ('add_packed'). """
+        with self._lock:
+            member_id = self._next_id
+            self._next_id += 1
+        return member_id
+
+
+    def add_packed(self, name, data, score=None, params=None, member_id=None):
+        """ Append a model pickled by 'pack' (e.g. in a worker process),
+        optionally under a reserved id. See 'add'.
+        """
+        if self.mode == 'r':
+            raise ValueError("Archive {} is opened read-only.".format(self.path))
+        params = _scalars(params or {})
+        with self._lock:
+            if member_id is None:
+                member_id = self._next_id
+                self._next_id += 1
+            if self._file is None or (self._file.tell() > 0 and
+                                      self._file.tell() + len(data) > self.segment_size):
+                self._next_segment()
+            member = {'id': member_id, 'name': name,
+                      'segment': len(self.manifest['segments']) - 1,
+                      'offset': self._file.tell(), 'size': len(data),
+                      'score': None if score is None else float(score),
+                      'params': params}
+            self._file.write(data)
+            self.manifest['members'].append(member)
+            self._members[member['id']] = member
+        return member_ref(self.path, member['id'])
+
+
+    def flush(self):
+        """ Flush the current segment and write the manifest, both synced
+        to disk. The manifest is written under a temporary name and then 
+        renamed, so readers never see a partial index.
+        """
+        if self.mode == 'r':
+            return
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            filename = os.path.join(self.path, MANIFEST)
+            temp = "{}.{}.tmp".format(filename, os.getpid())
+            with open(temp, 'w') as f:
+                json.dump(self.manifest, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, filename)
+        return
+
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.mode = 'r'
+        return
+
+
+    def members(self, name=None):
+        """ List of member entries of the manifest, optionally of a single
+        algorithm only.
+        """
+        return [dict(member) for member in self.manifest['members']
+                if name is None or member['name'] == name]
+
+
+    def refs(self):
+        """ List of (name, reference) tuples, sorted by name. """
+        return [(member['name'], member_ref(self.path, member['id']))
+                for member in sorted(self.manifest['members'],
+                                     key=lambda m: (m['name'], m['id']))]
+
+
+    def segment_file(self, member_id):
+        member = self._members[member_id]
+        return os.path.join(self.path, self.manifest['segments'][member['segment']])
+
+
+    def read(self, member_id):
+        """ Pickled bytes of a member. """
+        member = self._members[member_id]
+        if self._file is not None:
+            with self._lock:
+                self._file.flush()
+        with open(self.segment_file(member_id), 'rb') as f:
+            f.seek(member['offset'])
+            data = f.read(member['size'])
+        if len(data) != member['size']:
+            raise IOError("Member {} of {} is truncated.".format(member_id, self.path))
+        return data
+
+
+    def load(self, member_id):
+        """ Unpickle a member. Only its byte range is read. """
+        return joblib.load(io.BytesIO(self.read(member_id)))
+
+
+
+class ModelWriter(object):
+    """
+    Persist fitted models in a background thread.
+
+    'submit' queues a model and returns at once with the path (or archive
+    reference) the model is written to. At most 'max_pending' models wait
+    in the queue: when it is full, 'submit' blocks until the writer has
+    caught up, so that memory does not grow without bound. 'close' returns
+    once every model is written and synced to disk.
+
+    Parameters:
+    ------------
+        archive : None or ModelArchive, default: None
+            Add models to this archive, or else pickle them to the paths
+            given to 'submit'.
+
+        compress : integer, default: 0
+            joblib compression level (0-9) of model files. Members of an
+            archive are compressed as set by the archive.
+
+        max_pending : integer, default: 2
+            Size of the queue. With max_pending=0 models are written by
+            the calling thread in 'submit'.
+
+    Notes:
+    -------
+        A model that could not be written is reported with a warning,
+        and its path is kept in 'failed' (path: error).
+
+    """
+    def __init__(self, archive=None, compress=0, max_pending=2):
+        self.archive = archive
+        self.compress = compress
+        self.failed = {}
+        self._queue = None
+        if max_pending > 0:
+            self._queue = queue.Queue(maxsize=max_pending)
+            self._thread = threading.Thread(target=self._run, name='gazer-writer')
+            self._thread.daemon = True
+            self._thread.start()
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def submit(self, name, model, path=None, score=None, params=None):
+        """
+        Write a model (see ModelArchive.add for the parameters).
+
+        Returns:
+        ---------
+            Path of the model file, or reference of the archive member.
+
+        """
+        member_id = None
+        if self.archive is not None:
+            member_id = self.archive.reserve()
+            path = member_ref(self.archive.path, member_id)
+        task = (path, member_id, name, model, score, params)
+        if self._queue is None:
+            self._write(*task)
+        else:
+            self._queue.put(task)
+        return path
+
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            self._write(*task)
+
+
+    def _write(self, path, member_id, name, model, score, params):
+        try:
+            with bus.timer('serialize', path=path, algorithm=name, source='writer'):
+                if self.archive is not None:
+                    params = get_params(model) if params is None else params
+                    self.archive.add_packed(name, pack(model, self.archive.compress), 
+                                            score=score, params=params, member_id=member_id)
+                else:
+                    with open(path, 'wb') as f:
+                        joblib.dump(model, f, compress=self.compress)
+                        f.flush()
+                        os.fsync(f.fileno())
+        except Exception as e:
+            self.failed[path] = repr(e)
+            bus.count('write_failures', path=path, error=repr(e))
+            warnings.warn("Could not write {}: {}".format(path, e))
+
+
+    def close(self):
+        """ Wait until all queued models are written. Archive members are
+        synced by ModelArchive.close.
+        """
+        if self._queue is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._queue = None
+        return
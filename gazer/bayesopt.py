@@ -0,0 +1,358 @@
+"""
+Batched Bayesian optimization of several search spaces at once.
+
+Every (algorithm, space) pair is a 'Study' that wraps a scikit-optimize
+Optimizer. In every round each unfinished study proposes a batch of points
+(ask), all proposals of all studies are cross validated concurrently in a
+pool of workers, and the scores are reported back (tell). A batch of more
+than one point is proposed with a constant liar strategy: pending points are
+temporarily assumed to score e.g. the best value seen so far ('cl_min'),
+which pushes the next proposal elsewhere.
+
+A study may be backed by a 'StudyStore': a JSON-lines file to which every
+evaluated point is appended as soon as its score is known. A later run on the
+same algorithm, space, scoring, cv and data warm-starts from the stored
+points and never evaluates them again.
+
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+import json
+import hashlib
+import warnings
+
+import numpy as np
+
+from .utils.lazy import LazyModule
+from .utils.parallel import allocate_jobs, effective_n_jobs
+from .utils.shared import shared, attach
+
+# Heavy dependencies are imported on first use
+skopt = LazyModule('skopt')
+base = LazyModule('sklearn.base')
+joblib = LazyModule('sklearn.externals.joblib')
+model_selection = LazyModule('sklearn.model_selection')
+sklearn_utils = LazyModule('sklearn.utils')
+
+# Loss told for a point without a finite loss when no finite loss is known
+FAILED_LOSS = 1e6
+
+
+
+def evaluate_point(estimator, params, data, scoring, cv, n_jobs=1):
+    """ Mean cross validation score of 'estimator' with 'params'. Defined at
+    module level so that it can be dispatched to a pool of worker processes.
+
+    Returns (score, error message, duration) where score is None if the 
+    fit failed.
+    """
+    start = time.time()
+    try:
+        estimator = base.clone(estimator).set_params(**params)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            if hasattr(cv, 'cross_val_score'):
+                # FoldCache: reuse its fold arrays and transformed features
+                scores = cv.cross_val_score(estimator, scoring=scoring, n_jobs=n_jobs)
+            else:
+                X, y = attach(data)
+                scores = model_selection.cross_val_score(
+                    estimator, X, y, cv=cv, scoring=scoring, n_jobs=n_jobs)
+    except:
+        return (None, str(sys.exc_info()[1]), time.time()-start)
+    return (np.mean(scores), None, time.time()-start)
+
+
+
+def _to_json(value):
+    """ Convert numpy scalars to python types. """
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _point_key(point):
+    return json.dumps([_to_json(value) for value in point])
+
+
+def _finite_losses(losses, known=()):
+    """ Replace NaN or infinite losses (e.g. of folds that failed to fit) by
+    the worst finite loss in 'losses' and 'known', or by FAILED_LOSS.
+    """
+    finite = [loss for loss in list(losses) + list(known) if np.isfinite(loss)]
+    worst = max(finite) if finite else FAILED_LOSS
+    return [loss if np.isfinite(loss) else worst for loss in losses]
+
+
+def _cv_digest(cv):
+    """ Stable description of the folds: a hash of the fold indices of a
+    FoldCache or of a list of (train, test) index arrays, else repr(cv).
+    """
+    if hasattr(cv, 'indices'):
+        cv = cv.indices()
+    if not isinstance(cv, (list, tuple)):
+        return repr(cv)
+    sha = hashlib.sha1()
+    for train, test in cv:
+        for idx in (train, test):
+            idx = np.ascontiguousarray(idx, dtype=np.int64)
+            sha.update(str(len(idx)).encode())
+            sha.update(idx.tobytes())
+    return sha.hexdigest()
+
+
+def study_digest(name, space, scoring, cv, greater_is_better, data_fingerprint):
+    """ Hash everything that a stored score depends on. Folds are described
+    by their indices (see '_cv_digest'), so that identical folds give the
+    same digest in every run.
+    """
+    scoring = getattr(scoring, '__name__', scoring)
+    items = [(key, repr(dim)) for key, dim in space.items()]
+    description = repr((name, items, repr(scoring), _cv_digest(cv), 
+                        bool(greater_is_better), data_fingerprint))
+    return hashlib.sha1(description.encode()).hexdigest()
+
+
+
+class StudyStore(object):
+    """
+    Append-only JSON-lines file with the evaluated points of a study.
+    Every line holds one point: {"x": [...], "loss": float, "params": {...}}.
+
+    Parameters:
+    ------------
+        path : str
+            File to read from and append to. Its folder is created if needed.
+
+    """
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        self.path = path
+
+    def load(self):
+        """ Return list of (point, loss) pairs. A truncated last line
+        (e.g. after a crash) is skipped.
+        """
+        history = []
+        if not os.path.isfile(self.path):
+            return history
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    history.append((record['x'], record['loss']))
+                except (ValueError, KeyError):
+                    continue
+        return history
+
+    def append(self, point, loss, params):
+        record = {'x': [_to_json(value) for value in point], 
+                  'loss': float(loss), 
+                  'params': {k: _to_json(v) for k, v in params.items()}}
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+
+class Study(object):
+    """
+    Optimization of a single search space.
+
+    Parameters:
+    ------------
+        key : str
+            Unique name of the study (e.g. algorithm name and space index).
+
+        name : str
+            Name of the algorithm.
+
+        estimator : sklearn estimator
+            Estimator to tune (cloned for every evaluation).
+
+        space : dict
+            Parameter names mapped to skopt dimensions.
+
+        n_calls : integer
+            Number of points to evaluate.
+
+        random_state : None or integer, default: None
+
+        store : None or StudyStore, default: None
+            Persist every evaluated point. Stored points warm-start the
+            optimizer and count towards 'n_calls'.
+
+    """
+    def __init__(self, key, name, estimator, space, n_calls, random_state=None, store=None):
+        self.key = key
+        self.name = name
+        self.estimator = estimator
+        self.names = list(space.keys())
+        self.n_calls = n_calls
+        self.failed = False
+        self.n_told = 0
+        self.store = store
+        self._known = {}
+        
+        history = [] if store is None else store.load()
+        if history and random_state is not None:
+            # Do not replay the random initial points of the earlier run
+            seed = sklearn_utils.check_random_state(random_state).randint(np.iinfo(np.int32).max)
+            random_state = seed + len(history)
+        self.optimizer = skopt.Optimizer(list(space.values()),
+                                         n_initial_points=max(1, min(10, n_calls)),
+                                         random_state=random_state)
+        if history:
+            try:
+                self.optimizer.tell([x for x, _ in history], 
+                                    _finite_losses([loss for _, loss in history]))
+            except ValueError:
+                warnings.warn("{}: stored points do not fit the space; starting afresh."
+                              .format(key))
+            else:
+                self._known = {_point_key(x): loss for x, loss in history}
+                self.n_told = len(history)
+
+    @property
+    def remaining(self):
+        return 0 if self.failed else max(0, self.n_calls - self.n_told)
+
+    def params(self, point):
+        return {name: value for name, value in zip(self.names, point)}
+
+    def ask(self, n_points, strategy='cl_min', n_retries=3):
+        """ Propose points. Already evaluated points are dropped and the
+        optimizer is asked again (at most 'n_retries' times).
+        """
+        for _ in range(n_retries):
+            proposal = self.optimizer.ask(n_points=n_points, strategy=strategy)
+            points = [point for point in proposal if self.lookup(point) is None]
+            if points:
+                return points
+        # Nothing new to propose: known points are counted without evaluation
+        return proposal
+
+    def lookup(self, point):
+        """ Stored loss of an already evaluated point, or None. """
+        return self._known.get(_point_key(point))
+
+    def tell(self, points, losses):
+        """ Report losses. A NaN loss is told as the worst finite loss. """
+        losses = _finite_losses(losses, self.optimizer.yi)
+        self.optimizer.tell(points, losses)
+        self.n_told += len(points)
+        for point, loss in zip(points, losses):
+            key = _point_key(point)
+            if self.store is not None and not key in self._known:
+                self.store.append(point, loss, self.params(point))
+            self._known[key] = loss
+
+    def best(self):
+        """ Return (params, loss) of the best point, or None. """
+        if not self.optimizer.yi:
+            return None
+        i = int(np.argmin(self.optimizer.yi))
+        return self.params(self.optimizer.Xi[i]), self.optimizer.yi[i]
+
+
+
+def run_studies(studies, X, y, scoring='accuracy', greater_is_better=True, cv=10,
+                n_jobs=1, batch_size=1, strategy='cl_min', budget=None, verbose=0):
+    """
+    Optimize a list of studies concurrently.
+
+    Parameters:
+    ------------
+        studies : list of Study
+
+        X, y : training data, or a DataHandle (y is then ignored)
+
+        scoring, greater_is_better, cv : see GazerMetaLearner.bayes_optimize
+
+        n_jobs : integer, default: 1
+            Total core budget. Points are evaluated in a pool of at most
+            'n_jobs' workers; spare cores go to cross_val_score.
+
+        batch_size : integer, default: 1
+            Number of points each study proposes per round.
+
+        strategy : str, default: 'cl_min'
+            Constant liar strategy used when proposing several points:
+            'cl_min', 'cl_mean' or 'cl_max'.
+
+        budget : None or TimeBudget, default: None
+            Wall-clock budget over the study keys. Every round only the
+            studies selected by the budget (at most one per core) propose
+            points, and the loop stops when the budget is spent.
+
+        verbose : integer, default: 0
+
+    Returns:
+    ---------
+        List of studies (updated in place).
+
+    """
+    sign = -1. if greater_is_better else 1.
+    n_round = 0
+    with shared(X, y, n_jobs=effective_n_jobs(n_jobs)) as data:
+        while any(study.remaining for study in studies):
+
+            active = [study for study in studies if study.remaining]
+            if budget is not None:
+                for study in studies:
+                    if not study.remaining:
+                        budget.exhaust(study.key)
+                keys = budget.select(n=effective_n_jobs(n_jobs))
+                if not keys:
+                    break
+                active = [study for study in active if study.key in keys]
+
+            proposals = []
+            for study in active:
+                if study.remaining:
+                    n_points = min(batch_size, study.remaining)
+                    proposals.extend((study, point) for point in study.ask(n_points, strategy))
+
+            # Points evaluated in an earlier run are not evaluated again
+            results = [None if study.lookup(point) is None else (sign*study.lookup(point), None, None) 
+                       for study, point in proposals]
+            todo = [i for i, result in enumerate(results) if result is None]
+            
+            n_workers, inner_jobs = allocate_jobs([True]*len(todo), n_jobs)
+            # Worker processes receive the fold indices of a FoldCache only
+            folds = cv.indices() if n_workers > 1 and hasattr(cv, 'indices') else cv
+            evaluated = joblib.Parallel(n_jobs=n_workers)(
+                joblib.delayed(evaluate_point)(proposals[i][0].estimator, 
+                                               proposals[i][0].params(proposals[i][1]), 
+                                               data, scoring, folds, n_jobs=inner)
+                for i, inner in zip(todo, inner_jobs))
+            for i, result in zip(todo, evaluated):
+                results[i] = result
+                if budget is not None:
+                    budget.report(proposals[i][0].key, result[2], result[0])
+
+            for study in studies:
+                told = [(point, score, error) for (s, point), (score, error, _)
+                        in zip(proposals, results) if s is study]
+                if not told:
+                    continue
+                errors = [error for _, score, error in told if score is None]
+                if errors:
+                    warnings.warn("{}: {} of {} points failed: {}"
+                                  .format(study.key, len(errors), len(told), errors[0]))
+                if len(errors) == len(told):
+                    study.failed = True
+                    continue
+                # Failed points are told as the worst loss (see Study.tell)
+                study.tell([point for point, _, _ in told],
+                           [np.nan if score is None else sign*score for _, score, _ in told])
+
+            n_round += 1
+            if verbose > 0:
+                print("Round {}: evaluated {} points ({} workers), {} known"
+                      .format(n_round, len(todo), n_workers, len(proposals)-len(todo)))
+    return studies
@@ -0,0 +1,226 @@
+"""
+Wall-clock budget scheduling for hyperparameter search.
+
+A 'TimeBudget' splits a total time budget across a set of search tasks (one
+per algorithm and parameter space). Searches ask the scheduler which task
+should run its next trial, and report the duration and score of every trial.
+
+Every task is entitled to a share of the time proportional to its weight:
+
+    weight = promise * speed
+
+    - promise: 1 during the first 'min_trials' trials. Then it decreases
+      linearly with the rank of the task's best score among all tasks,
+      and is halved when the task did not improve in its last 'patience'
+      trials.
+    - speed: min(1, median trial duration / mean trial duration of the
+      task), i.e. tasks whose trials are slower than typical are penalized.
+
+The next trial goes to the task that is furthest below its share. A trial is
+only started if it is expected to finish within the budget, keeping aside
+the time needed to refit the best configuration of every task. Trials are
+never interrupted, so the first trial of a task (whose duration is unknown)
+may overrun the budget.
+
+"""
+import time
+
+import numpy as np
+
+from .utils.lazy import LazyModule
+
+# Heavy dependencies are imported on first use
+base = LazyModule('sklearn.base')
+
+
+
+class TimeBudget(object):
+    """
+    Parameters:
+    ------------
+        keys : list of str
+            Search tasks (e.g. algorithm names).
+
+        time_budget : float
+            Total wall-clock budget (seconds).
+
+        greater_is_better : boolean, default: True
+            If True, then a higher score is better.
+
+        min_trials : integer, default: 2
+            Number of trials of a task before its promise is assessed.
+
+        patience : integer, default: 5
+            Number of trials without improvement after which the promise
+            of a task is halved.
+
+    """
+    def __init__(self, keys, time_budget, greater_is_better=True, min_trials=2, patience=5):
+        if time_budget <= 0:
+            raise ValueError("'time_budget' should be positive (seconds).")
+        self.keys = list(keys)
+        self.time_budget = float(time_budget)
+        self.sign = 1. if greater_is_better else -1.
+        self.min_trials = min_trials
+        self.patience = patience
+        self.start = time.time()
+
+        self.durations = {key: [] for key in self.keys}
+        self.scores = {key: [] for key in self.keys}
+        self.refit_times = {key: 0. for key in self.keys}
+        self.exhausted = set()
+
+
+    @property
+    def elapsed(self):
+        return time.time() - self.start
+
+    @property
+    def remaining(self):
+        return self.time_budget - self.elapsed
+
+    @property
+    def reserve(self):
+        """ Time kept aside to refit the best configuration of every task. """
+        return sum(self.refit_times.values())
+
+    @property
+    def expired(self):
+        return self.remaining <= self.reserve
+
+
+    def spent(self, key):
+        return sum(self.durations[key])
+
+    def best(self, key):
+        """ Best (signed) score of a task, or None. """
+        return max(self.scores[key]) if self.scores[key] else None
+
+    def _promise(self, key):
+        scores = self.scores[key]
+        if len(scores) < self.min_trials:
+            return 1.
+        bests = sorted([self.best(k) for k in self.keys if self.scores[k]], reverse=True)
+        rank = bests.index(self.best(key))
+        promise = 1. - rank / float(len(bests))
+        if len(scores) > self.patience and max(scores[-self.patience:]) <= max(scores[:-self.patience]):
+            promise *= 0.5
+        return promise
+
+    def _speed(self, key):
+        if not self.durations[key]:
+            return 1.
+        typical = np.median([np.mean(d) for d in self.durations.values() if d])
+        return min(1., typical / max(np.mean(self.durations[key]), 1e-9))
+
+    def weights(self):
+        """ Dictionary of (key, normalized weight) of the active tasks. """
+        active = [key for key in self.keys if not key in self.exhausted]
+        weights = {key: self._promise(key) * self._speed(key) for key in active}
+        total = sum(weights.values())
+        return {key: w / total if total > 0 else 0. for key, w in weights.items()}
+
+
+    def select(self, n=1):
+        """
+        Return up to 'n' tasks that should run a trial next, most under-served
+        first. Returns an empty list when the budget is spent (or no task's
+        next trial fits in the remaining time).
+        """
+        available = self.remaining - self.reserve
+        if available <= 0:
+            return []
+        weights = self.weights()
+        candidates = []
+        for key, weight in weights.items():
+            expected = self.durations[key][-1] if self.durations[key] else 0.
+            if expected > available or weight <= 0:
+                continue
+            candidates.append((self.spent(key) / weight, key))
+        return [key for _, key in sorted(candidates)[:n]]
+
+
+    def report(self, key, duration, score=None, refit_time=None):
+        """
+        Record a trial.
+
+        Parameters:
+        ------------
+            key : str
+                Task that ran the trial.
+
+            duration : float
+                Duration (seconds) of the trial.
+
+            score : None or float, default: None
+                Score of the trial (None if the trial failed).
+
+            refit_time : None or float, default: None
+                Estimated time to refit the task's best configuration.
+
+        """
+        self.durations[key].append(duration)
+        if score is not None and np.isfinite(score):
+            self.scores[key].append(self.sign * score)
+        if refit_time is not None:
+            self.refit_times[key] = refit_time
+        return
+
+
+    def exhaust(self, key):
+        """ Mark a task as done (no more trials available). """
+        self.exhausted.add(key)
+        return
+
+
+    def summary(self):
+        """ List of (key, trials, seconds spent, best score) tuples. """
+        return [(key, len(self.durations[key]), self.spent(key),
+                 None if self.best(key) is None else self.sign * self.best(key))
+                for key in self.keys]
+
+
+
+class TrialResults(object):
+    """
+    Trials of a task searched under a TimeBudget. Mimics RandomizedSearchCV:
+    consult 'best_params_', 'best_score_', 'best_estimator_' and 'cv_results_'.
+
+    Parameters:
+    ------------
+        estimator : sklearn estimator
+            Estimator that was tuned (it is cloned when refitting).
+
+    """
+    def __init__(self, estimator):
+        self.estimator = estimator
+        self.cv_results_ = {key: [] for key in ('params', 'mean_test_score', 'eligible')}
+
+    def __len__(self):
+        return len(self.cv_results_['params'])
+
+    def add(self, params, score, eligible=True):
+        """ Record a trial. Only eligible trials (e.g. not dropped by
+        racing) can be selected as best.
+        """
+        self.cv_results_['params'].append(params)
+        self.cv_results_['mean_test_score'].append(score)
+        self.cv_results_['eligible'].append(eligible)
+        return
+
+    def refit(self, X, y):
+        """ Fit the best eligible configuration on all data. """
+        trials = [(score, params) for params, score, eligible in
+                  zip(*[self.cv_results_[key] for key in ('params', 'mean_test_score', 'eligible')])
+                  if eligible]
+        if not trials:
+            raise ValueError("No eligible trials.")
+        self.best_score_, self.best_params_ = max(trials, key=lambda t: t[0])
+        self.best_estimator_ = base.clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
@@ -1,26 +1,30 @@
-from .adaboost import *
-from .gbm import *
-from .logistic_regression import *
-from .naive_bayes import *
-from .nearest_neighbors import *
-from .random_forest import *
-from .neural_network import *
-from .sgdescent import *
-from .svm import *
-from .tree import *
-from .xgb import *
+from importlib import import_module
 
-__all__ = [
-    'MetaAdaBoostClassifier', 
-    'MetaGradBoostingClassifier',
-    'MetaKNearestNeighborClassifier', 
-    'MetaLogisticRegressionClassifier',
-    'MetaSGDClassifier',
-    'MetaGaussianNBayesClassifier',
-    'MetaMultinomialNBayesClassifier',
-    'MetaBernoulliNBayesClassifier',
-    'MetaNeuralNetworkClassifier',
-    'MetaRandomForestClassifier',
-    'MetaSVMClassifier',
-    'MetaXGBoostClassifier',
-    'MetaDecisionTreeClassifier' ]
\ No newline at end of file
+# Meta classifiers are imported from their module on first access, so that
+# using one algorithm does not import the others (e.g. keras or xgboost)
+_modules = {
+    'MetaAdaBoostClassifier': 'adaboost', 
+    'MetaGradBoostingClassifier': 'gbm',
+    'MetaKNearestNeighborClassifier': 'nearest_neighbors', 
+    'MetaLogisticRegressionClassifier': 'logistic_regression',
+    'MetaSGDClassifier': 'sgdescent',
+    'MetaGaussianNBayesClassifier': 'naive_bayes',
+    'MetaMultinomialNBayesClassifier': 'naive_bayes',
+    'MetaBernoulliNBayesClassifier': 'naive_bayes',
+    'MetaNeuralNetworkClassifier': 'neural_network',
+    'MetaRandomForestClassifier': 'random_forest',
+    'MetaSVMClassifier': 'svm',
+    'MetaXGBoostClassifier': 'xgb',
+    'MetaDecisionTreeClassifier': 'tree' }
+
+__all__ = list(_modules)
+
+
+def __getattr__(name):
+    if not name in _modules:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    return getattr(import_module("." + _modules[name], __name__), name)
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -5,12 +5,15 @@ from ..base import BaseClassifier
 from ..externals.clr_callback import CyclicLR
 
 import os
+import time
 import warnings
 import collections
 import numpy as np
 import pandas as pd
 
 import keras.backend as K
+from sklearn.model_selection import train_test_split
+
 from keras.models import Sequential
 from keras.utils import to_categorical
 from keras.wrappers.scikit_learn import KerasClassifier
@@ -205,24 +208,28 @@ class MetaNeuralNetworkClassifier(BaseClassifier):
         return model
         
         
-    def check_training(X, y, train_size=0.1):
+    def check_training(self, X, y, train_size=0.1, random_state=None):
         """ 
         Perform training on p% (p<<100) of the training data to check that 
         we can include the algorithm without having to wait for a very long 
         time to finish training on the full dataset.
+        
+        Returns the training time (seconds) on the (stratified) sample.
         """
         
         # We cap the size of the training fraction
         train_size = 0.5 if train_size > 0.5 else train_size
-        X_sample, _, y_sample, _ = train_test_split(X, y, train_size=train_size)
+        X_sample, _, y_sample, _ = train_test_split(X, y, train_size=train_size, stratify=y,
+                                                    random_state=random_state)
 
         start_time = time.time()
-        self.estimator.fit(X_sample, y_sample)
+        self.fit(X_sample, y_sample)
         total_time = time.time()-start_time
         
         # Output a warning 
         warnings.warn("Time spent training on %s%% of data: %.2f (min)" 
                                     % (100*train_size, total_time/60.))
+        return total_time
                 
     def _callbacks(self):
         """ Implement callbacks """
@@ -1,32 +1,102 @@
 from __future__ import print_function
 
+import os
 import sys
 import time
 import inspect
 import warnings
 
 from operator import itemgetter
-from importlib import import_module  
 import numpy as np
 
-from skopt import gp_minimize
-from sklearn.model_selection import (cross_val_score, 
-                                     RandomizedSearchCV)
-
-from .metrics import get_scorer
-from .algorithms import implemented        
-from .utils.mappings import skopt_space_mapping
+from .metrics import get_scorer, StreamingScorer, StreamingLogLoss
+from .algorithms import implemented, AlgorithmDescriptor, AlgorithmRegistry
+from .halving import make_search, _take
+from .folds import FoldCache
+from .racing import Racer, RacingSearch
+from .budget import TimeBudget, TrialResults
+from .cost import CostRecorder, CostModel, measure, get_params
+from .instrument import bus
+from .bayesopt import Study, StudyStore, run_studies, study_digest
+from .utils.parallel import allocate_jobs, supports_n_jobs, effective_n_jobs
+from .utils.shared import shared, attach
+from .utils.chunks import iter_chunks
+from .utils.cache import PredictionCache, fingerprint
+from .utils.lazy import LazyModule
 from .base import EnsembleBaseClassifier, BaseClassifier
 
 
+# Heavy dependencies are imported on first use
+skopt = LazyModule('skopt')
+joblib = LazyModule('sklearn.externals.joblib')
+model_selection = LazyModule('sklearn.model_selection')
+sklearn_base = LazyModule('sklearn.base')
+
 from gazer import __importflags__
-if __importflags__[0]: 
-    import keras
-if __importflags__[1]: 
-    import xgboost
 if not __package__:
     __package__ = __name__
 
+
+
+def _fit_algorithm(name, clf, data, n_jobs=1, track_memory=False):
+    """ Fit a single (sklearn-like) meta estimator. Defined at module 
+    level so that it can be dispatched to a pool of worker processes.
+    
+    - 'data' is a DataHandle (or an (X, y) tuple) that we attach to.
+    
+    Returns (name, fitted meta estimator, seconds, peak memory).
+    """
+    X, y = attach(data)
+    if n_jobs != 1 and supports_n_jobs(clf.estimator):
+        clf.estimator.set_params(**{'n_jobs': n_jobs})
+    _, seconds, peak = measure(clf.estimator.fit, X, y, track_memory=track_memory)
+    return (name, clf, seconds, peak)
+
+
+def _screen_algorithm(name, estimator, data, train, val, scoring, track_memory=False):
+    """ Fit a clone of 'estimator' on rows 'train' and score it on rows 'val'. 
+    Defined at module level so that it can be dispatched to worker processes.
+    
+    Returns (name, number of training rows, seconds, peak memory, score), 
+    where the score is None if the fit failed.
+    """
+    X, y = attach(data)
+    y = np.asarray(y)
+    estimator = sklearn_base.clone(estimator)
+    try:
+        _, seconds, peak = measure(estimator.fit, _take(X, train), y[train], 
+                                   track_memory=track_memory)
+        if scoring == 'log_loss':
+            y_pred = estimator.predict_proba(_take(X, val))
+        else:
+            y_pred = estimator.predict(_take(X, val))
+        score = get_scorer(scoring)(y[val], y_pred)
+    except Exception:
+        warnings.warn("Screening failed for {}: {}".format(name, sys.exc_info()[1]))
+        return (name, len(train), None, None, None)
+    return (name, len(train), seconds, peak, score)
+
+
+def _extrapolate_score(sizes, scores, n, sign=1.):
+    """ Extrapolate a learning curve to 'n' training rows, assuming the 
+    score is linear in log(size). The extrapolated gain is never negative
+    and never larger than the gain observed over the subsamples.
+    """
+    sizes, scores = np.asarray(sizes, dtype=float), sign * np.asarray(scores, dtype=float)
+    last = scores[np.argmax(sizes)]
+    if len(np.unique(sizes)) < 2:
+        return sign * last
+    slope = np.polyfit(np.log(sizes), scores, 1)[0]
+    gain = max(0., slope) * (np.log(n) - np.log(sizes.max()))
+    return sign * (last + min(gain, max(0., last - scores[np.argmin(sizes)])))
+
+
+# Wrap 'predict' and 'predict_proba' of a meta estimator
+_predict = (lambda clf, x: clf.predict(x) if hasattr(clf, 'predict') 
+                                          else clf.estimator.predict(x))
+_predict_proba = (lambda clf, x: clf.estimator.predict_proba(x) 
+                  if clf.get_info()['predict_probas'] else np.zeros(x.shape[0]))
+
     
     
 class GazerMetaLearner():
@@ -59,6 +129,11 @@ class GazerMetaLearner():
        
         verbose : integer, default: 0 
             If verbose>0 then output feedback messages.       
+            
+        cache_size : integer, default: 256
+            Size (in megabytes) of the cache that memoizes predictions of
+            fitted algorithms, keyed by model version and a hash of the
+            input data. Set cache_size=0 to disable caching.
     
     Returns:
     ---------
@@ -70,9 +145,14 @@ class GazerMetaLearner():
           around scikit-learn like algorithms.
 
         - Algorithms are accessible through self.clf[name] where name is of str type.
+          A meta estimator is only imported and instantiated on first access.
 
         - Names are available in 'self.names' and you may consult this property whenever you need
           a hint on how to inspect an algorithm (or change it).
+          
+        - Fit and predict costs (wall time, peak memory, data shape, parameters) are 
+          recorded in 'self.costs'. Use 'self.cost_model()' to predict the cost of new 
+          configurations. Set 'self.costs = CostRecorder(path)' to keep records on disk.
     
     """
     def __init__(self, 
@@ -82,7 +162,8 @@ class GazerMetaLearner():
                  base_estimator=None, 
                  exclude=None, 
                  verbose=0, 
-                 random_state=None):                    
+                 random_state=None,
+                 cache_size=256):                    
         
         options = ('random', 'all', 'select')
         
@@ -109,8 +190,14 @@ class GazerMetaLearner():
         # Estimators (used when method == 'select')
         self.estimators = [] if estimators is None else list(estimators)
         
-        # For internal use only
-        self._mapper = {}
+        # Memoize predictions: the version of an algorithm is bumped 
+        # whenever it is refitted or its parameters change
+        self._versions = {}
+        self._cache = (PredictionCache(max_bytes=cache_size * 2**20) 
+                       if cache_size else None)
+        
+        # Fit and predict costs (see gazer.cost)
+        self.costs = CostRecorder()
 
         # Build repository of classifiers
         try:
@@ -138,11 +225,11 @@ class GazerMetaLearner():
     def update(self, name, params):
         """ 
         
-        Update any meta estimator's parameters. For now,
-        we first delete the old version of the meta estimator in
-        the 'self.clf' dictionary, then attempt to replace it with a new
-        version. If update fails, we fall back to the old version again, 
-        and throw a warning.
+        Update any meta estimator's parameters. The parameters are checked
+        against the meta estimator's signature, and a new version replaces 
+        the old one in the 'self.clf' dictionary. It is instantiated on 
+        first access. If update fails, we keep the old version and throw 
+        a warning.
         
         - Note: if self.verbose > 0 we print the meta estimator's init signature
           if for some reason the update procedure fails.
@@ -168,30 +255,42 @@ class GazerMetaLearner():
             
         if not name in self.names:
             raise ValueError("'name' not a valid name: see 'self.names'.")
-                             
-        mod_name, meta_estimator = self._mapper[name].split("__")
-        
-        # Find correct module
-        module = import_module(
-            ".".join((__package__, "classifiers", mod_name)), package=True)
         
-        new = getattr(module, meta_estimator)        
-        
-        # If we fail to update; keep old version
-        old = self.clf.pop(name)
-        try:
-            self.clf[name] = new(**params)
-        except:
-            _, desc, _ = sys.exc_info()
-            warnings.warn("Failed to update {}. Msg: {}"
-                          .format(name, desc))
+        # Parameters are validated against the meta estimator's signature; 
+        # the new version is only instantiated on next access.
+        descriptor = self.clf.descriptor(name)
+        unknown = [key for key in params if not descriptor.accepts(key)]
+        if not unknown:
+            self.clf.reset(name, params)
+        else:
+            warnings.warn("Failed to update {}. Msg: unexpected parameter(s) {}"
+                          .format(name, ", ".join(unknown)))
             if self.verbose > 0:
-                signature = inspect.getfullargspec(old.__init__)
+                signature = inspect.getfullargspec(descriptor.load().__init__)
                 print("{0:18}  {1}".format("Variable:", 'Default value:'))
                 for arg, default in zip(signature.args[1:], 
                                         signature.defaults):
                     print("{0:18}  {1}".format("<{}>".format(arg), default))
-            self.clf[name] = old
+        self._touch(name)
+        return
+    
+    
+    def _touch(self, name=None):
+        """ Invalidate cached predictions of algorithm 'name' (all if None). """
+        for key in ([name] if name is not None else self.names):
+            self._versions[key] = self._versions.get(key, 0) + 1
+        return
+    
+    
+    def _version(self, name):
+        """ Version token of a (fitted) algorithm. """
+        return (id(self.clf[name]), self._versions.get(name, 0))
+    
+    
+    def clear_cache(self):
+        """ Drop all memoized predictions. """
+        if self._cache is not None:
+            self._cache.clear()
         return
         
         
@@ -201,17 +300,23 @@ class GazerMetaLearner():
         global __importflags__
         to_add = implemented(*__importflags__)
         
-        # Build from available
-        repo = []        
-        for module, cls in to_add:
-            instance = self._add_algorithm(module, cls)            
-            if (instance is not None) and (instance.name not in self.exclude):
-                repo.append((instance.name, instance))  
-                self._mapper[instance.name] = "__".join((module, cls))
+        # Nothing is imported or instantiated at this point: algorithms whose
+        # packages are not installed are skipped
+        repo = []
+        for module, cls, name in to_add:
+            if name in self.exclude:
+                continue
+            descriptor = AlgorithmDescriptor(module, cls, name)
+            missing = descriptor.missing()
+            if missing:
+                warnings.warn("Could not import {}\nNo module named {}"
+                              .format(module, ", ".join(missing)), RuntimeWarning)
+                continue
+            repo.append(descriptor)
                 
         # All
         if self.method=='all':
-            return {name:clf for name, clf in repo}
+            return AlgorithmRegistry(repo, self._add_algorithm)
         
         
         # Random
@@ -220,47 +325,46 @@ class GazerMetaLearner():
             if self.verbose>0: 
                 print("Sampling {} algorithms".format(num))
             repo = [repo[i] for i in np.random.choice(len(repo), num, replace=False)]           
-            return {name:clf for name, clf in repo}
+            return AlgorithmRegistry(repo, self._add_algorithm)
         
         
         # Select 
         if self.method=='select':
             if len(self.estimators)>0:
-                return {name:clf for name, clf in repo if name in self.estimators}
+                return AlgorithmRegistry([d for d in repo if d.name in self.estimators], 
+                                         self._add_algorithm)
             elif self.estimators is None or (len(self.estimators)==0):
                 raise Exception()
 
                 
-    def _add_algorithm(self, module_name, algorithm_name):                     
-        """ Import classifier algorithms """
-                    
-        path_to_module = ".".join((__package__, "classifiers", module_name))
-        print('path', path_to_module)
-        try:
-            module = import_module(path_to_module, package=True)
-        except ImportError:
+    def _add_algorithm(self, descriptor):                     
+        """ Import and instantiate a classifier algorithm (None if the import fails) """
+        with bus.timer('construct', algorithm=descriptor.name, source='learner'):
             try:
-                module = import_module(path_to_module, package=False)
-            except:
+                algorithm = descriptor.load()
+            except ImportError:
                 warnings.warn("Could not import {}\n{}"
-                              .format(module_name, sys.exc_info()[1]), 
-                               RuntimeWarning)
+                              .format(descriptor.module, sys.exc_info()[1]), 
+                              RuntimeWarning)
                 return None
+            
+            params = descriptor.params.copy()
+            if issubclass(algorithm, EnsembleBaseClassifier):
+                params.setdefault('random_state', self.random_state)
+                params.setdefault('base_estimator', self.base_estimator)
+            elif issubclass(algorithm, BaseClassifier):            
+                if descriptor.accepts('random_state'):
+                    params.setdefault('random_state', self.random_state)
+            instance = algorithm(**params)
         
-        algorithm = getattr(module, algorithm_name)        
-        
-        if issubclass(algorithm, EnsembleBaseClassifier):
-            instance = algorithm(random_state = self.random_state,
-                                 base_estimator = self.base_estimator)                    
-        elif issubclass(algorithm, BaseClassifier):            
-            if hasattr(algorithm(), 'random_state'):
-                instance = algorithm(random_state = self.random_state)
-            else:
-                instance = algorithm()                
+        # Names of the 'implemented' table must match those set by the classes
+        if not '.' in descriptor.module and getattr(instance, 'name', descriptor.name) != descriptor.name:
+            raise ValueError("{}.{} is named '{}', but registered as '{}' (see gazer.algorithms)."
+                             .format(descriptor.module, descriptor.cls, instance.name, descriptor.name))
         return instance
     
     
-    def fit(self, X, y, n_jobs=1):
+    def fit(self, X, y, n_jobs=1, backend=None):
         """ 
         Fit available algorithms.
         
@@ -270,34 +374,254 @@ class GazerMetaLearner():
         Parameters:
         ------------
         
-            X : numpy matrix, pandas DataFrame, 2D numpy array
-                Training data.
+            X : numpy matrix, pandas DataFrame, 2D numpy array or DataHandle
+                Training data. Pass a DataHandle (see gazer.utils.shared) 
+                to reuse data that has already been published.
                 
             y : numpy array, iterable
-                Training labels.
+                Training labels (ignored if X is a DataHandle).
                 
             n_jobs : integer, optional, default: 1
                 Perform parallel computation if implemented in algorithm.
+                When backend='multiprocessing' this is the total core budget
+                shared by all algorithms.
+                
+            backend : None or str, default: None
+                If None, algorithms are fitted one at a time. Set 
+                backend='multiprocessing' to fit algorithms concurrently in a
+                pool of worker processes. Each algorithm is given one core, and
+                any spare cores are handed to algorithms that can parallelize
+                internally (i.e. expose 'n_jobs').
+                - Algorithms that implement their own `fit` (the neural network)
+                  are always fitted in the main process.
         
         """
-        for name, clf in self.clf.items():            
-            start = time.time()            
+        if backend not in (None, 'multiprocessing'):
+            raise ValueError("backend should be None or 'multiprocessing'.")
             
-            if hasattr(clf, 'fit'):
-                clf.fit(X, y, verbose=self.verbose)
-            else:
-                if n_jobs != 1 and hasattr(clf.estimator, 'n_jobs'):
-                    clf.estimator.set_params(**{'n_jobs': n_jobs})
-                clf.estimator.fit(X, y)
+        # Meta estimators with their own fit api stay in this process
+        native = [(name, clf) for name, clf in self.clf.items() if hasattr(clf, 'fit')]
+        pooled = [(name, clf) for name, clf in self.clf.items() if not hasattr(clf, 'fit')]
+        
+        timings = []
+        n_workers = 1 if backend is None else len(pooled)
+        track_memory = self.costs.track_memory
+        
+        # Data is published once, workers attach to it without copying
+        with shared(X, y, n_jobs=n_workers) as data:
+            shape = attach(data)[0].shape
+            for name, clf in native:
+                with bus.timer('fit', algorithm=name, source='learner', shape=shape):
+                    _, delta, peak = measure(clf.fit, *attach(data), verbose=self.verbose, 
+                                             track_memory=track_memory)
+                timings.append((name, clf, delta, peak))
             
+            if backend is None:
+                for name, clf in pooled:
+                    with bus.timer('fit', algorithm=name, source='learner', shape=shape):
+                        timings.append(_fit_algorithm(name, clf, data, n_jobs=n_jobs, 
+                                                      track_memory=track_memory))
+            elif pooled:
+                n_workers, inner_jobs = allocate_jobs(
+                    [supports_n_jobs(clf.estimator) for _, clf in pooled], n_jobs)
+                fitted = joblib.Parallel(n_jobs=n_workers, backend=backend)(
+                    joblib.delayed(_fit_algorithm)(name, clf, data, n_jobs=jobs, 
+                                                   track_memory=track_memory) 
+                    for (name, clf), jobs in zip(pooled, inner_jobs))
+                # Workers return fitted copies: collect them back into 'self.clf'
+                for name, clf, delta, peak in fitted:
+                    self.clf[name] = clf
+                    timings.append((name, clf, delta, peak))
+                    bus.record('fit', delta, algorithm=name, source='learner', shape=shape, 
+                               backend=backend)
+        
+        self._touch()
+        for name, clf, delta, peak in timings:
+            self.costs.record(name, 'fit', delta, shape, params=get_params(clf), 
+                              peak_bytes=peak)
             if self.verbose>0:
-                delta = (time.time()-start)/float(60)
-                print("{}: training time = {:.1f} min.".format(name, delta))
+                print("{}: training time = {:.1f} min.".format(name, delta/float(60)))
         return
     
     
+    def cost_model(self, **kwargs):
+        """ Fit a CostModel (see gazer.cost) on the costs recorded so far, 
+        i.e. on 'self.costs'. Keyword arguments are passed to CostModel.
+        """
+        return CostModel(**kwargs).fit(self.costs)
+    
+    
+    def screen(self, X, y, sizes=(0.05, 0.1, 0.2), scoring='accuracy', time_limit=None, 
+               tolerance=0.01, validation_size=0.2, n_jobs=1, drop=True, random_state=None):
+        """
+        Screen algorithms on stratified subsamples of the data, and drop those 
+        that are too slow or clearly dominated before an expensive search or 
+        ensembling stage.
+        
+        Every algorithm is fitted on subsamples of increasing size (in parallel) 
+        and scored on a held out validation set. The full-data fit time is 
+        predicted with a CostModel fitted on the cost records (screening fits 
+        are recorded in 'self.costs'), and the full-data score by extrapolating 
+        the learning curve (linear in the log of the sample size).
+        
+        An algorithm is dropped if:
+            - all of its fits failed, or
+            - its predicted fit time exceeds 'time_limit', or
+            - another algorithm is predicted to be at least as fast and to 
+              score better by at least 'tolerance'.
+        
+        Parameters:
+        ------------
+            X : matrix-like or DataHandle
+                Training data, shape (n_samples, n_features).
+                
+            y : array-like
+                Labels, shape (n_samples,). Ignored if X is a DataHandle.
+                
+            sizes : tuple of floats or integers, default: (0.05, 0.1, 0.2)
+                Subsample sizes, as fractions of the training part of the data 
+                or as numbers of rows.
+                
+            scoring : str, default: 'accuracy'
+                Metric (see gazer.metrics.get_scorer). Lower is better for 
+                'log_loss', higher for all other metrics.
+                
+            time_limit : None or float, default: None
+                Maximum predicted full-data fit time (seconds).
+                
+            tolerance : float, default: 0.01
+                Score margin by which an algorithm must be beaten to be 
+                considered dominated.
+                
+            validation_size : float, default: 0.2
+                Fraction of the data held out for scoring.
+                
+            n_jobs : integer, default: 1
+                Number of fits to run in parallel (worker processes).
+                - Note: concurrent fits compete for cores, which inflates the 
+                  measured (and thus predicted) times somewhat.
+                
+            drop : boolean, default: True
+                Remove the dropped algorithms from 'self.clf'. If False, only 
+                report them.
+                
+            random_state : None or integer, default: None
+                Seeds the validation split and the subsamples.
+                
+        Returns:
+        ---------
+            Dictionary {name: {'sizes', 'fit_times', 'scores', 'predicted_time', 
+            'predicted_score', 'dropped'}} where 'dropped' is None or the reason
+            the algorithm was dropped.
+            - Algorithms that implement their own `fit` (the neural network) 
+              are timed with 'check_training' only; they are never considered 
+              dominated.
+        
+        """
+        greater_is_better = scoring != 'log_loss'
+        sign = 1. if greater_is_better else -1.
+        rng = np.random.RandomState(random_state)
+        
+        X_, y_ = attach(X) if hasattr(X, 'attach') else (X, y)
+        y_ = np.asarray(y_)
+        n_rows, n_cols = X_.shape[0], (X_.shape[1] if len(X_.shape) > 1 else 1)
+        n_classes = len(np.unique(y_))
+        
+        train, val = model_selection.train_test_split(
+            np.arange(n_rows), test_size=validation_size, stratify=y_, random_state=rng)
+        subsamples = []
+        for size in sorted(sizes):
+            m = int(size * len(train)) if isinstance(size, float) else int(size)
+            m = max(m, 2 * n_classes)
+            if m >= len(train):
+                subsamples.append(train)
+                break
+            subsamples.append(model_selection.train_test_split(
+                train, train_size=m, stratify=y_[train], random_state=rng)[0])
+        
+        native = [(name, clf) for name, clf in self.clf.items() if hasattr(clf, 'fit')]
+        pooled = [(name, clf) for name, clf in self.clf.items() if not hasattr(clf, 'fit')]
+        
+        results = {name: {'sizes': [], 'fit_times': [], 'scores': [], 'predicted_time': None, 
+                          'predicted_score': None, 'dropped': None} for name in self.names}
+        track_memory = self.costs.track_memory
+        with self.costs.tagged('screen'):
+            with shared(X, y, n_jobs=n_jobs) as data:
+                # Largest fits first, so that workers finish at about the same time
+                fitted = joblib.Parallel(n_jobs=n_jobs)(
+                    joblib.delayed(_screen_algorithm)(name, clf.estimator, data, sub, val, 
+                                                      scoring, track_memory=track_memory)
+                    for sub in reversed(subsamples) for name, clf in pooled)
+            for name, m, seconds, peak, score in fitted:
+                if score is None:
+                    continue
+                results[name]['sizes'].append(m)
+                results[name]['fit_times'].append(seconds)
+                results[name]['scores'].append(score)
+                self.costs.record(name, 'fit', seconds, (m, n_cols), 
+                                  params=get_params(self.clf[name]), peak_bytes=peak)
+                bus.record('fit', seconds, algorithm=name, source='screen', shape=(m, n_cols), 
+                           score=score)
+            
+            for name, clf in native:
+                train_size = len(subsamples[-1]) / float(len(train))
+                seconds = clf.check_training(_take(X_, train), y_[train], train_size=train_size,
+                                             random_state=random_state)
+                m = int(train_size * len(train))
+                results[name]['sizes'].append(m)
+                results[name]['fit_times'].append(seconds)
+                self.costs.record(name, 'fit', seconds, (m, n_cols), params=get_params(clf))
+        self._touch()
+        
+        # Predict full-data costs and scores
+        model = self.cost_model()
+        for name, result in results.items():
+            if not result['fit_times']:
+                result['dropped'] = 'failed'
+                continue
+            predicted, _ = model.predict(name, get_params(self.clf[name]), n_rows, n_cols)
+            if predicted is None:
+                # Too few records for the cost model: assume linear scaling
+                m = max(result['sizes'])
+                predicted = result['fit_times'][result['sizes'].index(m)] * n_rows / float(m)
+            result['predicted_time'] = predicted
+            if result['scores']:
+                result['predicted_score'] = _extrapolate_score(
+                    result['sizes'], result['scores'], n_rows, sign=sign)
+            if time_limit is not None and predicted > time_limit:
+                result['dropped'] = 'slow'
+        
+        candidates = [(name, r) for name, r in results.items() 
+                      if r['dropped'] is None and r['predicted_score'] is not None]
+        for name, result in candidates:
+            for other, competitor in candidates:
+                if (other != name and competitor['predicted_time'] <= result['predicted_time'] 
+                        and sign * (competitor['predicted_score'] - result['predicted_score']) 
+                        >= tolerance):
+                    result['dropped'] = 'dominated by {}'.format(other)
+                    break
+        
+        dropped = [name for name, r in results.items() if r['dropped'] is not None]
+        if len(dropped) == len(results):
+            warnings.warn("Screening would drop all algorithms; keeping them.")
+            dropped = []
+        if self.verbose > 0:
+            for name, r in results.items():
+                print("{0:18} time={1} score={2} {3}".format(
+                    name+":", 
+                    "N/A" if r['predicted_time'] is None else "{:.1f}s".format(r['predicted_time']),
+                    "N/A" if r['predicted_score'] is None else "{:.4f}".format(r['predicted_score']),
+                    "" if r['dropped'] is None else "(dropped: {})".format(r['dropped'])))
+        if drop:
+            for name in dropped:
+                del self.clf[name]
+                bus.count('screened_out', algorithm=name, reason=results[name]['dropped'])
+        return results
+    
+    
     def set_params(self, name, params):
         clf = self._get_algorithm(name)
+        self._touch(name)
         try:
             clf.adjust_params(params)
         except AttributeError:
@@ -333,10 +657,7 @@ class GazerMetaLearner():
             - Length of labels: len('GazerMetaLearner().names')
 
         """
-        # Wrap 'predict' using a Lambda expression
-        predict = (lambda clf, x: clf.predict(x) if hasattr(clf, 'predict') 
-                                               else clf.estimator.predict(x))        
-        return [(name, predict(clf, X)) for name, clf in self.clf.items()]
+        return self._memoize('predict', _predict, X)
     
 
     def predict_proba(self, X):
@@ -357,13 +678,78 @@ class GazerMetaLearner():
             - Length of probas: len('GazerMetaLearner().names')
          
         """
-        # Wrap 'predict_proba' using Lambda expression
-        predict_proba = (lambda clf, x: clf.estimator.predict_proba(x) 
-                         if clf.get_info()['predict_probas'] else np.zeros(x.shape[0]))
-        return [(name, predict_proba(clf, X)) for name, clf in self.clf.items()] 
+        return self._memoize('predict_proba', _predict_proba, X)
+    
+    
+    def _memoize(self, method, predict, X, use_cache=True):
+        """ Apply 'predict' with every algorithm, serving repeated requests 
+        for unchanged (model, data) pairs from the prediction cache.
+        - Note: cached arrays are read-only.
+        """
+        def compute(name, clf):
+            with bus.timer('predict', algorithm=name, method=method, source='learner'):
+                result, delta, peak = measure(predict, clf, X, 
+                                              track_memory=self.costs.track_memory)
+            self.costs.record(name, 'predict', delta, X.shape, params=get_params(clf), 
+                              peak_bytes=peak)
+            return result
+        
+        if self._cache is None or not use_cache:
+            return [(name, compute(name, clf)) for name, clf in self.clf.items()]
+        # The whole of X is hashed: data differing only in rows outside a
+        # sample must not be served predictions of the other
+        data_key = fingerprint(X, full=True)
+        return [(name, self._cache.memoize(
+                    (name, method, self._version(name), data_key), 
+                    lambda: compute(name, clf))) 
+                for name, clf in self.clf.items()]
+    
+    
+    def iter_predict(self, X, chunk_size=10000):
+        """
+        Generator version of 'predict' for data that does not fit in memory.
+        
+        Parameters:
+        -----------
+            X : array-like, or iterable of chunks
+                Data with shape (n_samples, n_features), which is predicted on
+                'chunk_size' rows at a time, or an iterable yielding chunks.
+                
+            chunk_size : integer, default: 10000
+                Number of rows per chunk (used when X is an array).
+                
+        Yields:
+        --------
+            For each chunk: a list of (name, class_label) tuples (see 'predict').
+            
+        """
+        for X_chunk, _ in iter_chunks(X, chunk_size=chunk_size):
+            yield self._memoize('predict', _predict, X_chunk, use_cache=False)
+            
+            
+    def iter_predict_proba(self, X, chunk_size=10000):
+        """
+        Generator version of 'predict_proba' for data that does not fit in memory.
+        
+        Parameters:
+        -----------
+            X : array-like, or iterable of chunks
+                Data with shape (n_samples, n_features), which is predicted on
+                'chunk_size' rows at a time, or an iterable yielding chunks.
+                
+            chunk_size : integer, default: 10000
+                Number of rows per chunk (used when X is an array).
+                
+        Yields:
+        --------
+            For each chunk: a list of (name, class_proba) tuples (see 'predict_proba').
+            
+        """
+        for X_chunk, _ in iter_chunks(X, chunk_size=chunk_size):
+            yield self._memoize('predict_proba', _predict_proba, X_chunk, use_cache=False)
     
 
-    def evaluate(self, X, y, metric='accuracy', get_loss=True, **kwargs):
+    def evaluate(self, X, y, metric='accuracy', get_loss=True, chunk_size=None, **kwargs):
         """
         Evalute predictions computed from X against ground truth given by y 
         using native scikit-learn metrics.
@@ -384,6 +770,12 @@ class GazerMetaLearner():
 
             get_loss : boolean, default: True
                 Compute the log loss score whenever possible.
+                
+            chunk_size : None or integer, default: None
+                If set, predict and accumulate metrics 'chunk_size' rows at 
+                a time so that peak memory is bounded by the chunk size.
+                - Streaming is also used if X is an iterable yielding 
+                  (X_chunk, y_chunk) tuples, in which case y should be None.
         
         
         Returns:
@@ -395,33 +787,93 @@ class GazerMetaLearner():
         """
         if metric is None:
             raise ValueError("Please specify a metric")        
-        scorer = get_scorer(metric)
         
+        if chunk_size is not None or not hasattr(X, 'shape'):
+            scores = self._evaluate_chunks(X, y, metric=metric, get_loss=get_loss, 
+                                           chunk_size=chunk_size or 10000)
+            self._print_scores(scores)
+            return scores
+        
+        scorer = get_scorer(metric)
         scores = {}
         for name, y_pred in self.predict(X):            
-            score = scorer(y, y_pred) 
+            with bus.timer('score', algorithm=name, metric=metric, source='learner'):
+                score = scorer(y, y_pred) 
             scores[name] = {'score': np.round(score, decimals=4), 'loss': 'N/A'}        
         
         if get_loss:
             log_loss = get_scorer('log_loss')            
             for name, proba in self.predict_proba(X):               
                 try:
-                    loss = log_loss(y, proba)
+                    with bus.timer('score', algorithm=name, metric='log_loss', source='learner'):
+                        loss = log_loss(y, proba)
                     scores[name]['loss'] = np.round(loss, decimals=4)
                 except:
                     scores[name]['loss'] = np.nan
                     warnings.warn("Could not compute loss for {}"
                                   .format(name), RuntimeWarning)                                       
+        self._print_scores(scores)
+        return scores
+    
+    
+    def _evaluate_chunks(self, X, y, metric, get_loss, chunk_size):
+        """ Streaming version of 'evaluate': metrics are accumulated 
+        chunk by chunk and predictions are discarded after each chunk.
+        """
+        streaming_loss = (lambda clf: StreamingLogLoss(
+            getattr(clf.estimator, 'classes_', getattr(clf, 'classes_', None))))
+        
+        scorers, losses = {}, {}
+        for name, clf in self.clf.items():
+            scorers[name] = (streaming_loss(clf) if metric=='log_loss' 
+                             else StreamingScorer(metric))
+            losses[name] = streaming_loss(clf) if get_loss else None
+        
+        failed = set()
+        for X_chunk, y_chunk in iter_chunks(X, y, chunk_size=chunk_size):
+            if metric != 'log_loss':
+                for name, y_pred in self._memoize('predict', _predict, X_chunk, use_cache=False):
+                    scorers[name].update(y_chunk, y_pred)
+            if not (get_loss or metric=='log_loss'):
+                continue
+            for name, proba in self._memoize('predict_proba', _predict_proba, 
+                                             X_chunk, use_cache=False):
+                if name in failed:
+                    continue
+                try:
+                    if metric=='log_loss':
+                        scorers[name].update(y_chunk, proba)
+                    if get_loss:
+                        losses[name].update(y_chunk, proba)
+                except:
+                    failed.add(name)
+        
+        scores = {}
+        for name in self.clf.keys():
+            score = np.nan if (metric=='log_loss' and name in failed) else scorers[name].result()
+            scores[name] = {'score': np.round(score, decimals=4), 'loss': 'N/A'}
+            if get_loss:
+                if name in failed:
+                    scores[name]['loss'] = np.nan
+                    warnings.warn("Could not compute loss for {}"
+                                  .format(name), RuntimeWarning)
+                else:
+                    scores[name]['loss'] = np.round(losses[name].result(), decimals=4)
+        return scores
+    
+    
+    def _print_scores(self, scores):
         if self.verbose>0:
             for name, score in scores.items():
                 print("{0:18} {1}".format(name+":", ",  ".join(
                     ["{}={}".format(k,v) for k,v in score.items()])),
                      end="\n{}\n".format("-" * 45))
-        return scores
+        return
     
 
     def rand_optimize(self, X, y, n_iter=12, scoring='accuracy', cv=10, n_jobs=1, 
-                      sample_params=False, min_params=2, get_params=False, random_state=None):
+                      sample_params=False, min_params=2, get_params=False, random_state=None,
+                      search='random', eta=3, racing=False, time_budget=None):
         """
         
         This method is a wrapper to cross validation using RandomizedSearchCV from scikit-learn 
@@ -435,10 +887,12 @@ class GazerMetaLearner():
         ------------
 
         X : 
-            Data matrix (n_samples, n_features)
+            Data matrix (n_samples, n_features), or a DataHandle
+            - When n_jobs != 1 the data is published once as a memory map
+              which is shared by all search workers.
         
         y : 
-            Labels/ground truth (n_samples,)
+            Labels/ground truth (n_samples,). Ignored if X is a DataHandle.
         
         n_iter : integer, default: 1
             Number of iterations to use in RandomizedSearchCV method, 
@@ -447,8 +901,11 @@ class GazerMetaLearner():
         scoring : string or callable, default: 'accuracy'
             Type of scorer to use in optimization
         
-        cv : integer or callable, default: 10
+        cv : integer, callable or FoldCache, default: 10
             Number of cross validation folds, or callable of correct type
+            - Folds are computed once (gazer.folds.FoldCache) and reused by
+              all algorithms and candidates. Pass a FoldCache to also reuse 
+              them across calls.
         
         n_jobs : integer, default: 1
             Specify number of parallel processes to use
@@ -465,19 +922,49 @@ class GazerMetaLearner():
         random_state: None or integer, default: None
             Used for reproducible results
         
+        search : str, default: 'random'
+            - 'random': every sampled configuration is cross validated on all folds, 
+              as in RandomizedSearchCV (see gazer.racing.RacingSearch).
+            - 'halving': successive halving. All 'n_iter' configurations start on a 
+              small budget and only the best 1/eta fraction is promoted to the next, 
+              eta times larger, budget.
+            - 'hyperband': several successive halving brackets, from aggressive 
+              (n_iter configurations on the smallest budget) to conservative.
+            The budget is 'n_estimators', 'max_iter' or the number of training samples 
+            depending on the algorithm (see gazer.halving.RESOURCES).
+        
+        eta : integer, default: 3
+            Promotion rate of search='halving' and search='hyperband'. Ignored otherwise.
+        
+        racing : boolean, default: False
+            Only with search='random': evaluate every candidate fold by fold and drop it 
+            once it is worse than the median of earlier candidates, or significantly 
+            worse than the best candidate so far (see gazer.racing).
+        
+        time_budget : None or float, default: None
+            Only with search='random': total wall-clock budget (seconds). Trials of all 
+            algorithms are interleaved, and time is shifted away from algorithms whose 
+            trials are slow or unpromising (see gazer.budget). When the budget is spent 
+            the best configuration found for each algorithm is refitted on all data; 
+            'n_iter' still caps the number of trials per algorithm. An algorithm that 
+            got no trial within the budget is returned unfitted, with score None.
+        
         Returns:
         --------
             List containing (classifier name, most optimized classifier) tuples       
         
         """  
+        searches = ('random', 'halving', 'hyperband')
+        if not search in searches:
+            raise ValueError("search should be in: {}".format(", ".join(searches)))
+        if racing and search != 'random':
+            raise ValueError("racing requires search='random'.")
+        if time_budget is not None and search != 'random':
+            raise ValueError("time_budget requires search='random'.")
+        
         get_key = (lambda name, i: name if i<2 else name+str(i-1))
         
-        def search(clf, params):        
-                        
-            if not params:
-                print(clf.name, 'No params')
-                return (clf.estimator.fit(X, y), None)
-            
+        def tune_params(clf, params):
             pars = params.copy()                       
             kwargs = {}
             if sample_params and (not get_params):
@@ -488,12 +975,28 @@ class GazerMetaLearner():
                 kwargs = {'keys': clf.cv_params_to_tune, 
                           'mode': 'select'}                             
             
-            pars = clf.set_tune_params(pars, **kwargs) if kwargs else pars   
+            return clf.set_tune_params(pars, **kwargs) if kwargs else pars   
+        
+        def _search(clf, params):        
+                        
+            if not params:
+                print(clf.name, 'No params')
+                return (clf.estimator.fit(X, y), None)
+            
+            pars = tune_params(clf, params)
             niter = min(n_iter, clf.max_n_iter)        
             
-            randsearch = RandomizedSearchCV(clf.estimator, pars, 
-                                            n_iter=niter, scoring=scoring, cv=cv, 
-                                            n_jobs=n_jobs, random_state=random_state)            
+            if search == 'random':
+                # Without racing every candidate runs on all the cached folds
+                randsearch = RacingSearch(
+                    clf.estimator, pars, cv, n_iter=niter, scoring=scoring, 
+                    n_jobs=n_jobs, random_state=random_state, racing=racing, 
+                    verbose=self.verbose)
+            else:
+                randsearch = make_search(
+                    clf.name, clf.estimator, pars, search=search, n_candidates=niter, 
+                    eta=eta, scoring=scoring, cv=cv, n_jobs=n_jobs, 
+                    random_state=random_state, verbose=self.verbose)
             fitted = False
             start = time.time()
             try:
@@ -512,14 +1015,90 @@ class GazerMetaLearner():
                     delta = (time.time()-start)/60.0
                     print("==== {} ==== \n>>> Search time: {:.1f} (min) \n>>> Best score: {:.4f}"
                           .format(clf.name, delta, randsearch.best_score_), end='\n\n') 
-                
-        return {get_key(name, idx): search(clf, params) 
-                for name, clf in self.clf.items() for idx, params 
-                in enumerate(clf.cv_params, start=1)}
+        
+        with shared(X, y, n_jobs=n_jobs) as data:
+            X, y = attach(data)
+            if not isinstance(cv, FoldCache):
+                cv = FoldCache(X, y, cv=cv)
+            if time_budget is None:
+                results = {get_key(name, idx): _search(clf, params) 
+                           for name, clf in self.clf.items() for idx, params 
+                           in enumerate(clf.cv_params, start=1)}
+            else:
+                tasks = [(get_key(name, idx), clf, tune_params(clf, params) if params else {}, 
+                          min(n_iter, clf.max_n_iter)) for name, clf in self.clf.items() 
+                         for idx, params in enumerate(clf.cv_params, start=1)]
+                results = self._budget_search(X, y, tasks, time_budget, scoring, cv, 
+                                              n_jobs, racing, random_state)
+        # Estimators were refitted in place
+        self._touch()
+        return results
+
+
+    def _budget_search(self, X, y, tasks, time_budget, scoring, folds, n_jobs, racing, 
+                       random_state):
+        """ Interleave the random search trials of all tasks, i.e. (key, meta 
+        estimator, params, n_iter) tuples, under a TimeBudget. 
+        """
+        budget = TimeBudget([key for key, _, _, _ in tasks], time_budget)
+        n_cores = effective_n_jobs(n_jobs)
+        
+        trials, searches, racers = {}, {}, {}
+        for key, clf, pars, niter in tasks:
+            trials[key] = (iter(model_selection.ParameterSampler(
+                               pars, n_iter=niter, random_state=random_state)) 
+                           if pars else iter([{}]))
+            searches[key] = TrialResults(clf.estimator)
+            racers[key] = Racer(folds, scoring=scoring, n_jobs=n_jobs) if racing else None
+        
+        while True:
+            keys = budget.select()
+            if not keys:
+                break
+            key = keys[0]
+            params = next(trials[key], None)
+            if params is None:
+                budget.exhaust(key)
+                continue
+            
+            estimator = sklearn_base.clone(searches[key].estimator).set_params(**params)
+            start = time.time()
+            try:
+                if racers[key] is not None:
+                    score, scores, pruned = racers[key].evaluate(estimator)
+                else:
+                    scores = folds.cross_val_score(estimator, scoring=scoring, n_jobs=n_jobs)
+                    score, pruned = np.mean(scores), False
+            except:
+                budget.report(key, time.time()-start)
+                if self.verbose > 0:
+                    print(key, 'failed fit:', sys.exc_info()[1])
+                continue
+            duration = time.time()-start
+            searches[key].add(params, score, eligible=not pruned)
+            # Refit on all data takes about as long as a (serial) fold fit
+            budget.report(key, duration, score, 
+                          refit_time=duration * min(n_cores, len(scores)) / len(scores))
+        
+        if self.verbose > 0:
+            for key, n_trials, spent, best in budget.summary():
+                print("==== {} ==== \n>>> Trials: {} \n>>> Time: {:.1f} (sec) \n>>> Best score: {}"
+                      .format(key, n_trials, spent, best), end='\n\n')
+        
+        results = {}
+        for key, clf, _, _ in tasks:
+            try:
+                results[key] = (searches[key].refit(X, y), searches[key].best_score_)
+            except ValueError:
+                warnings.warn("{}: no (complete) trial within the time budget.".format(key))
+                results[key] = (clf.estimator, None)
+        return results
 
 
     def bayes_optimize(self, X, y, n_calls=50, scoring='accuracy', 
-                       greater_is_better=True, cv=10, n_jobs=1, random_state=None):
+                       greater_is_better=True, cv=10, n_jobs=1, random_state=None,
+                       batch_size=None, strategy='cl_min', state_dir=None, racing=False,
+                       time_budget=None):
         """        
         Use package 'scikit-optimize' (github.com/scikit-optimize/scikit-optimize) 
         to do Bayesian Optimization instead of random grid search.
@@ -527,12 +1106,14 @@ class GazerMetaLearner():
         Parameters:
         ------------
             X : matrix-like, 2d-array
-                Should be a pandas dataframe or a numpy array.
+                Should be a pandas dataframe, a numpy array or a DataHandle.
                 - This data is split into folds using a CV procedure
                   (cross_val_score)
+                - When n_jobs != 1 the data is published once as a memory map
+                  which is shared by all cross validation workers.
             
             y : numpy array, iterable
-                Training labels/ground truth.
+                Training labels/ground truth. Ignored if X is a DataHandle.
                 
             n_calls : int, default: 50
                 Number of iterations/function evaluations allowed
@@ -545,60 +1126,191 @@ class GazerMetaLearner():
                 If True, then a higher metric score is better, and
                 if set to False, a lower score equals better classifier.
                 
-            cv : int, or callable, default: 10
+            cv : int, callable or FoldCache, default: 10
                 Number of CV folds (if integer), or data splitter which
                 generates train+val splits/folds.
+                - Folds are computed once (gazer.folds.FoldCache) and fold
+                  arrays, as well as the features of a Pipeline's leading 
+                  transformers (e.g. the Nystroem map of 'svm'), are reused 
+                  by all algorithms and candidates. Pass a FoldCache to also 
+                  reuse them across calls.
                 
             n_jobs : int, default: 1
                 Used by cross_val_score to speed up function evaluation.
+                - In batch mode this is the total core budget: points are
+                  evaluated concurrently, spare cores go to cross_val_score.
                 
             random_state : None, int, or callable, default: None
                 Used to set the random state, for reproducibility.
                 
+            batch_size : None or int, default: None
+                - None: optimize one space after the other, evaluating
+                  one point at a time (gp_minimize).
+                - int: all spaces (of all algorithms) are optimized at the
+                  same time. In every round each space proposes 'batch_size'
+                  points and all proposals are evaluated concurrently.
+                  When done, the best parameters are set on each estimator.
+                
+            strategy : str, default: 'cl_min'
+                Constant liar strategy used to propose a batch of points:
+                'cl_min', 'cl_mean' or 'cl_max'. Ignored if batch_size=None.
+                
+            state_dir : None or str, default: None
+                Folder wherein every evaluated point is stored as soon as it is
+                scored (one JSON-lines file per algorithm and space, see 
+                gazer.bayesopt.StudyStore). A later run with the same space, 
+                scoring, cv and data resumes from the stored points:
+                - the optimizer is warm-started and stored points are not re-evaluated,
+                - 'n_calls' is the total number of points, including stored ones.
+                Implies batch mode (batch_size=1 if batch_size=None).
+                
+            racing : boolean, default: False
+                Evaluate every point fold by fold and stop once it is worse 
+                than the median of earlier points, or significantly worse 
+                than the best point so far (see gazer.racing). A dropped 
+                point is reported to the optimizer as the worst point of its 
+                space so far (its partial mean would flatter it). Not 
+                available in batch mode.
+                
+            time_budget : None or float, default: None
+                Total wall-clock budget (seconds) shared by all spaces of all 
+                algorithms. Points are proposed by the spaces that the scheduler 
+                selects, shifting time away from spaces whose evaluations are slow 
+                or unpromising (see gazer.budget). The search stops when the budget 
+                is spent, returning the best points found so far; 'n_calls' still 
+                caps the number of points per space. Implies batch mode 
+                (batch_size=1 if batch_size=None).
+                
         Returns:
         ---------
             'opts' : dict of (params, abs(best_score)) tuples: {name: (params, score),..}
             
         """           
+        from .utils.mappings import skopt_space_mapping
         skopt_spaces = [(name, params) for name, clf in self.clf.items() 
                         for params in clf.cv_params]      
         skopt_spaces = skopt_space_mapping(skopt_spaces)  
         
+        if (state_dir is not None or time_budget is not None) and batch_size is None:
+            batch_size = 1
+        if racing and batch_size is not None:
+            raise ValueError("racing is not available in batch mode.")
+        if batch_size is not None:
+            return self._bayes_optimize_batch(X, y, skopt_spaces, n_calls, scoring, 
+                                              greater_is_better, cv, n_jobs, 
+                                              random_state, batch_size, strategy, state_dir, 
+                                              time_budget)
         opts = {} 
-        for name, clf in self.clf.items():                   
+        with shared(X, y, n_jobs=n_jobs) as data:
+            X, y = attach(data)
+            folds = cv if isinstance(cv, FoldCache) else FoldCache(X, y, cv=cv)
+            for name, clf in self.clf.items():                   
             
-            spaces = [_space for _name, _space in skopt_spaces if _name==name]                                    
-            if not spaces:
-                raise ValueError("{}: spaces undefined.".format(name))
+                spaces = [_space for _name, _space in skopt_spaces if _name==name]                                    
+                if not spaces:
+                    raise ValueError("{}: spaces undefined.".format(name))
             
-            for space in spaces:                
-                if not space:
-                    warnings.warn("{}: empty space (continue).".format(name))
-                    continue                          
-                names, parspace = space.keys(), space.values()
+                for space in spaces:                
+                    if not space:
+                        warnings.warn("{}: empty space (continue).".format(name))
+                        continue                          
+                    names, parspace = space.keys(), space.values()
+                    racer = (Racer(folds, scoring=scoring, greater_is_better=greater_is_better, 
+                                   n_jobs=n_jobs) if racing else None)
+                    losses = []
             
-                def feval(params):
-                    pars = {_name: param for _name, param in zip(names, params)}
-                    clf.estimator.set_params(**pars) 
-                    score = cross_val_score(clf.estimator, X, y, 
-                                            cv=cv, 
-                                            scoring=scoring, 
-                                            n_jobs=n_jobs)
-                    score = np.mean(score)
-                    return -score if greater_is_better else score
-                
-                with warnings.catch_warnings():
-                    warnings.simplefilter('ignore')
-                    try:
-                        res_gp = gp_minimize(feval, parspace, 
-                                             n_calls=n_calls, 
-                                             random_state=random_state)  
-                    except:
-                        warnings.warn("Optimization failed: {}".format(sys.exc_info()[1]))
-                        continue
+                    def feval(params):
+                        pars = {_name: param for _name, param in zip(names, params)}
+                        clf.estimator.set_params(**pars) 
+                        pruned = False
+                        if racer is not None:
+                            score, _, pruned = racer.evaluate(clf.estimator)
+                        else:
+                            score = folds.cross_val_score(clf.estimator, 
+                                                          scoring=scoring, 
+                                                          n_jobs=n_jobs)
+                        score = np.mean(score)
+                        loss = -score if greater_is_better else score
+                        if pruned:
+                            # Pessimistic: the worst loss observed so far
+                            loss = max(losses + [loss])
+                        else:
+                            losses.append(loss)
+                        return loss
+                
+                    with warnings.catch_warnings():
+                        warnings.simplefilter('ignore')
+                        try:
+                            res_gp = skopt.gp_minimize(feval, parspace, 
+                                                       n_calls=n_calls, 
+                                                       random_state=random_state)  
+                        except:
+                            warnings.warn("Optimization failed: {}".format(sys.exc_info()[1]))
+                            continue
                         
-                opts[name] = [{k:v for k, v in zip(names, res_gp.x)}, abs(res_gp.fun)]                       
+                    opts[name] = [{k:v for k, v in zip(names, res_gp.x)}, abs(res_gp.fun)]                       
                 
-                if self.verbose > 0:
-                    print("{} \t abs(best_score): {:.4f}".format(name, abs(res_gp.fun)))                
+                    if self.verbose > 0:
+                        print("{} \t abs(best_score): {:.4f}".format(name, abs(res_gp.fun)))                
+        # Estimator parameters were changed in place
+        self._touch()
+        return opts
+
+
+    def _bayes_optimize_batch(self, X, y, skopt_spaces, n_calls, scoring, greater_is_better, 
+                              cv, n_jobs, random_state, batch_size, strategy, state_dir=None, 
+                              time_budget=None):
+        """ Batched and concurrent version of 'bayes_optimize'. """
+        if batch_size < 1:
+            raise ValueError("'batch_size' should be a positive integer.")
+        
+        if state_dir is not None:
+            data_fingerprint = fingerprint(X.X if hasattr(X, 'attach') else X, full=True)
+        
+        # Folds are computed before the stores, whose names depend on them
+        if not isinstance(cv, FoldCache):
+            cv = FoldCache(*attach(X if hasattr(X, 'attach') else (X, y)), cv=cv)
+        
+        def get_store(name, space):
+            if state_dir is None:
+                return None
+            digest = study_digest(name, space, scoring, cv, greater_is_better, data_fingerprint)
+            return StudyStore(os.path.join(state_dir, "{}_{}.jsonl".format(name, digest[:16])))
+        
+        studies = []
+        for name, clf in self.clf.items():
+            spaces = [_space for _name, _space in skopt_spaces if _name==name]
+            if not spaces:
+                raise ValueError("{}: spaces undefined.".format(name))
+            for idx, space in enumerate(spaces):
+                if not space:
+                    warnings.warn("{}: empty space (continue).".format(name))
+                    continue
+                studies.append(Study("{}_{}".format(name, idx), name, clf.estimator, 
+                                     space, n_calls, random_state=random_state, 
+                                     store=get_store(name, space)))
+        
+        budget = (None if time_budget is None else 
+                  TimeBudget([study.key for study in studies], time_budget, 
+                             greater_is_better=greater_is_better))
+        run_studies(studies, X, y, scoring=scoring, greater_is_better=greater_is_better, 
+                    cv=cv, n_jobs=n_jobs, batch_size=batch_size, strategy=strategy, 
+                    budget=budget, verbose=self.verbose)
+        
+        # Keep the best space of every algorithm
+        opts = {}
+        for study in studies:
+            best = study.best()
+            if best is None:
+                continue
+            params, loss = best
+            if not study.name in opts or loss < opts[study.name][1]:
+                opts[study.name] = [params, loss]
+        
+        for name, (params, loss) in opts.items():
+            self.clf[name].estimator.set_params(**params)
+            opts[name][1] = abs(loss)
+            if self.verbose > 0:
+                print("{} \t abs(best_score): {:.4f}".format(name, abs(loss)))
+        self._touch()
         return opts
@@ -1,6 +1,9 @@
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
+from .utils.lazy import LazyModule
+
+# Plotting libraries are imported on first use
+sns = LazyModule('seaborn')
+plt = LazyModule('matplotlib.pyplot')
 
 
 class CheckClassifierCorrelation():
@@ -0,0 +1,328 @@
+"""
+Runtime cost records and a lightweight cost model.
+
+Every fit (and every uncached predict) that goes through GazerMetaLearner, the
+ensembler or param_search is recorded by a 'CostRecorder':
+
+    {'algorithm': 'random_forest', 'stage': 'fit', 'seconds': 12.3,
+     'peak_bytes': 104857600, 'nrow': 100000, 'ncol': 40,
+     'params': {'n_estimators': 128, 'max_depth': 7, ...}, 'source': 'learner'}
+
+A 'CostModel' is fitted on such records: per algorithm and stage a (ridge)
+regression of log(seconds), and of log(peak memory), on log(nrow), log(ncol),
+log-transformed numeric parameters and indicators of categorical parameters.
+Since runtimes tend to follow power laws in the data size and in parameters
+like 'n_estimators', a log-log model extrapolates reasonably from few records.
+
+Example:
+---------
+    >>> learner.fit(X, y)
+    >>> model = learner.cost_model()
+    >>> model.predict('random_forest', {'n_estimators': 512}, nrow=10**6, ncol=40)
+
+"""
+import os
+import json
+import time
+import threading
+import contextlib
+
+import numpy as np
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+STAGES = ('fit', 'predict')
+
+
+
+def measure(fn, *args, track_memory=False, **kwargs):
+    """
+    Call fn(*args, **kwargs) and measure its cost.
+
+    Peak memory is measured with tracemalloc (allocations made by python and
+    numpy) if track_memory=True and no other trace is active, else it is 
+    reported as None. Tracing slows down allocation heavy code, and is
+    process wide: allocations of concurrent threads are counted as well.
+
+    Returns:
+    ---------
+        Tuple (result, seconds, peak_bytes).
+
+    """
+    trace = track_memory and tracemalloc is not None and not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+    start = time.time()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        seconds = time.time() - start
+        peak = None
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def get_params(clf):
+    """ Scalar parameters of a meta estimator (or an sklearn estimator). """
+    estimator = getattr(clf, 'estimator', clf)
+    if hasattr(estimator, 'get_params'):
+        try:
+            params = estimator.get_params(deep=False)
+        except Exception:
+            params = {}
+    else:
+        params = getattr(clf, 'init_params', {})
+    return _scalars(params)
+
+
+def _to_json(value):
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _scalars(params):
+    """ Keep the parameters that can be encoded (and stored as json). """
+    params = {key: _to_json(value) for key, value in params.items()}
+    return {key: value for key, value in params.items()
+            if value is None or isinstance(value, (bool, int, float, str))}
+
+
+
+class CostRecorder(object):
+    """
+    Collects cost records in memory and, optionally, appends them to a
+    JSON-lines file. Safe to use from several threads.
+
+    Parameters:
+    ------------
+        path : None or str, default: None
+            File to append records to. Existing records in the file are
+            loaded on instantiation.
+
+        track_memory : boolean, default: False
+            Measure peak memory (see 'measure'). Opt-in: tracing is slow,
+            and peaks are not measured in threaded fits.
+
+    Notes:
+    -------
+        The recorder can be pickled (e.g. with a GazerMetaLearner, or to
+        send it to worker processes): its lock is recreated on unpickling.
+
+    """
+    def __init__(self, path=None, track_memory=False):
+        self.path = path
+        self.track_memory = track_memory
+        self._source = 'learner'
+        self._records = []
+        self._lock = threading.Lock()
+        if path is not None and os.path.isfile(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        self._records.append(json.loads(line))
+                    except ValueError:
+                        continue
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+    @contextlib.contextmanager
+    def tagged(self, source):
+        """ Attribute records made within the context to 'source'. """
+        previous, self._source = self._source, source
+        try:
+            yield self
+        finally:
+            self._source = previous
+
+
+    def record(self, algorithm, stage, seconds, shape, params=None, peak_bytes=None,
+               source=None):
+        """
+        Add a record.
+
+        Parameters:
+        ------------
+            algorithm : str
+                Name of the algorithm (e.g. 'random_forest').
+
+            stage : str
+                'fit' or 'predict'.
+
+            seconds : float
+                Wall time.
+
+            shape : tuple
+                Shape (nrow, ncol) of the data.
+
+            params : None or dict, default: None
+                Parameters of the algorithm (only scalars are kept).
+
+            peak_bytes : None or integer, default: None
+                Peak memory allocated during the call.
+
+            source : None or str, default: None
+                Where the call was made (learner, ensembler, param_search..)
+                Defaults to the current tag (see 'tagged'), i.e. 'learner'.
+
+        """
+        if not stage in STAGES:
+            raise ValueError("stage should be in: {}".format(", ".join(STAGES)))
+        nrow = shape[0]
+        ncol = shape[1] if len(shape) > 1 else 1
+        record = {'algorithm': algorithm, 'stage': stage, 'seconds': float(seconds),
+                  'peak_bytes': None if peak_bytes is None else int(peak_bytes),
+                  'nrow': int(nrow), 'ncol': int(ncol), 
+                  'source': self._source if source is None else source,
+                  'params': _scalars(params or {})}
+        with self._lock:
+            self._records.append(record)
+            if self.path is not None:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(record) + "\n")
+        return record
+
+
+    def records(self, algorithm=None, stage=None):
+        """ List of records, optionally filtered by algorithm and stage. """
+        return [r for r in self._records
+                if (algorithm is None or r['algorithm'] == algorithm)
+                and (stage is None or r['stage'] == stage)]
+
+
+    def clear(self):
+        with self._lock:
+            self._records = []
+        return
+
+
+
+class _LogLinear(object):
+    """ Ridge regression of log(target) on encoded records. """
+
+    def __init__(self, target, alpha=1.0):
+        self.target = target
+        self.alpha = alpha
+
+    def _encode(self, record):
+        x = {'log_nrow': np.log(max(1, record['nrow'])),
+             'log_ncol': np.log(max(1, record['ncol']))}
+        for key, value in record['params'].items():
+            if isinstance(value, bool) or value is None or isinstance(value, str):
+                x["{}={}".format(key, value)] = 1.
+            else:
+                x[key] = np.sign(value) * np.log1p(abs(value))
+        return x
+
+    def fit(self, records):
+        records = [r for r in records if r.get(self.target) is not None and r[self.target] > 0]
+        encoded = [self._encode(r) for r in records]
+        self.features = sorted(set(key for x in encoded for key in x))
+        self.n_records = len(records)
+        if not records:
+            return self
+        X = np.array([[x.get(key, 0.) for key in self.features] for x in encoded])
+        t = np.log([r[self.target] for r in records])
+        self.mean_ = X.mean(axis=0)
+        self.intercept_ = t.mean()
+        Xc = X - self.mean_
+        # Ridge keeps the fit stable with fewer records than features
+        A = Xc.T.dot(Xc) + self.alpha * np.eye(len(self.features))
+        self.coef_ = np.linalg.solve(A, Xc.T.dot(t - self.intercept_))
+        return self
+
+    def predict(self, record):
+        if not self.n_records:
+            return None
+        x = self._encode(record)
+        x = np.array([x.get(key, 0.) for key in self.features])
+        return float(np.exp(self.intercept_ + (x - self.mean_).dot(self.coef_)))
+
+
+
+class CostModel(object):
+    """
+    Predict the cost of a configuration from cost records.
+
+    Parameters:
+    ------------
+        alpha : float, default: 0.1
+            Ridge penalty of the log-linear regressions.
+
+        min_records : integer, default: 2
+            Minimum number of records of an (algorithm, stage) pair
+            required to make a prediction.
+
+    """
+    def __init__(self, alpha=0.1, min_records=2):
+        self.alpha = alpha
+        self.min_records = min_records
+        self.models = {}
+
+
+    def fit(self, records):
+        """ Fit on a list of records, or a CostRecorder. """
+        if hasattr(records, 'records'):
+            records = records.records()
+        self.models = {}
+        for key in set((r['algorithm'], r['stage']) for r in records):
+            subset = [r for r in records if (r['algorithm'], r['stage']) == key]
+            if len(subset) < self.min_records:
+                continue
+            self.models[key] = (_LogLinear('seconds', self.alpha).fit(subset),
+                                _LogLinear('peak_bytes', self.alpha).fit(subset))
+        return self
+
+
+    def predict(self, algorithm, params, nrow, ncol, stage='fit'):
+        """
+        Predict the cost of fitting (or predicting with) an algorithm.
+
+        Parameters:
+        ------------
+            algorithm : str
+                Name of the algorithm.
+
+            params : dict
+                Parameters of the configuration.
+
+            nrow, ncol : integer
+                Data dimensions.
+
+            stage : str, default: 'fit'
+                'fit' or 'predict'.
+
+        Returns:
+        ---------
+            Tuple (seconds, peak_bytes). Either is None if it cannot be
+            predicted (too few records).
+
+        """
+        if not (algorithm, stage) in self.models:
+            return None, None
+        record = {'nrow': nrow, 'ncol': ncol, 'params': _scalars(params)}
+        seconds, memory = self.models[(algorithm, stage)]
+        return seconds.predict(record), memory.predict(record)
+
+
+    def affordable(self, algorithm, params, nrow, ncol, seconds, stage='fit'):
+        """ False if the predicted cost exceeds 'seconds'. Configurations
+        that cannot be predicted are considered affordable.
+        """
+        predicted, _ = self.predict(algorithm, params, nrow, ncol, stage=stage)
+        return predicted is None or predicted <= seconds
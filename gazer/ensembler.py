@@ -2,45 +2,243 @@ from __future__ import print_function
 
 import os, sys, time, copy, glob, random, warnings
 from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import numpy as np
-from sklearn.externals import joblib 
-from tqdm import tqdm_notebook as tqdm
 
 from .metrics import get_scorer
 from .sampling import Loguniform
 from .core import GazerMetaLearner
-from .library import library_config
-from .optimization import param_search
+from .utils.shared import shared, attach
+from .utils.lazy import LazyModule
+from .utils.cache import fingerprint
+from .cost import CostRecorder, measure, get_params
+from .archive import ModelArchive, ModelWriter, is_archive, pack
+from .archive import load_model, source_file, cache_prefix
+from .utils.parallel import effective_n_jobs, balance_n_jobs
+from .instrument import bus, progress
 
+# Heavy dependencies are imported on first use
+joblib = LazyModule('sklearn.externals.joblib')
 
+# Validation predictions are cached next to each model file, as
+# '<model file>.<data fingerprint>.<kind>.npy' (see 'hillclimb'). Those 
+# of archive members are kept in the archive folder (see gazer.archive)
+PREDICTIONS_SUFFIX = '.npy'
 
-def single_fit(estimator, scorer, X, y, path, i, **kwargs):
+
+
+def single_fit(estimator, scorer, data, path, i, recorder=None, algorithm=None, 
+               track_memory=False, writer=None, packed=False, compress=0, **kwargs):
+    """ Fit, pickle and score a single estimator. Fit and predict costs
+    are recorded with 'recorder' (a CostRecorder) if given.
+    - If 'writer' (a ModelWriter) is given the model is handed to it, to 
+      be written in the background (to 'path', or to the writer's archive).
+    - If packed=True, the pickled bytes and the params of the model are 
+      returned in place of its path, for the caller to add to an archive.
+    - 'compress' is the joblib compression level of the pickle, unless
+      it is written by 'writer'.
+    """
     modelfile = os.path.join(path, "model_{:04d}train.pkl".format(i))
+    X, y = attach(data)
+    track_memory = track_memory and recorder is not None and recorder.track_memory
+    fields = {'algorithm': algorithm, 'source': 'ensembler', 'model': i}
     try:
-        estimator.set_params(**kwargs).fit(X, y)
-        joblib.dump(estimator, modelfile)
-        return (modelfile, scorer(estimator.predict(X), y))
+        with bus.timer('fit', **fields):
+            _, fit_time, fit_peak = measure(estimator.set_params(**kwargs).fit, X, y, 
+                                            track_memory=track_memory)
+        with bus.timer('predict', **fields):
+            yhat, predict_time, predict_peak = measure(estimator.predict, X, 
+                                                       track_memory=track_memory)
+        with bus.timer('score', **fields):
+            score = scorer(yhat, y)
+        params = get_params(estimator)
+        if writer is not None:
+            # Timed by the writer (as 'serialize')
+            modelfile = writer.submit(algorithm, estimator, modelfile, score=score, params=params)
+        else:
+            with bus.timer('serialize', path=modelfile, **fields):
+                if packed:
+                    modelfile = (pack(estimator, compress=compress), params)
+                else:
+                    with open(modelfile, 'wb') as f:
+                        joblib.dump(estimator, f, compress=compress)
+                        f.flush()
+                        os.fsync(f.fileno())
+        bus.count('models_fitted', **fields)
+        if recorder is not None:
+            recorder.record(algorithm, 'fit', fit_time, X.shape, params=params, 
+                            peak_bytes=fit_peak, source='ensembler')
+            recorder.record(algorithm, 'predict', predict_time, X.shape, params=params, 
+                            peak_bytes=predict_peak, source='ensembler')
+        return (modelfile, score)
     except:
         fail = (None, float("-Inf"))
         _, desc, _ = sys.exc_info()
+        bus.count('fit_failures', error=repr(desc), **fields)
         warnings.warn("Could not fit and save: {}".format(desc))
         return fail
     
     
-def _sklearn_score_fitted(path, X, y, scorer):
+def _process_fit(estimator, scorer, data, path, i, algorithm=None, track_memory=False, 
+                 packed=False, compress=0, **kwargs):
+    """ 'single_fit' in a worker process. Costs are recorded locally and 
+    returned with the result: (result of 'single_fit', list of records).
+    """
+    recorder = CostRecorder(track_memory=track_memory)
+    result = single_fit(estimator, scorer, data, path, i, recorder=recorder, 
+                        algorithm=algorithm, track_memory=track_memory, packed=packed, 
+                        compress=compress, **kwargs)
+    return result, recorder.records()
+
+
+def _fit_cost(estimator, shape):
+    """ Rough relative cost of fitting 'estimator' on data of 'shape': the
+    size of the data times the number of sub-estimators of an ensemble.
+    """
+    n_estimators = getattr(estimator, 'n_estimators', 1)
+    if not isinstance(n_estimators, (int, float, np.number)):
+        n_estimators = 1
+    return float(shape[0]) * shape[1] * max(1, n_estimators)
+
+
+def _code_dtype(n_classes):
+    """ Smallest unsigned integer type that holds 'n_classes' class codes. """
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n_classes <= np.iinfo(dtype).max + 1:
+            return dtype
+    return np.int64
+
+
+def _encode(labels, classes):
+    """ Class codes of 'labels', i.e. indices into the sorted array 'classes',
+    in the smallest unsigned dtype. None if some labels are not in 'classes'.
+    """
+    labels = np.asarray(labels)
+    codes = np.minimum(np.searchsorted(classes, labels), len(classes)-1)
+    if not np.array_equal(classes[codes], labels):
+        return None
+    return codes.astype(_code_dtype(len(classes)))
+
+
+def _compact(yhat, classes):
+    """ Encoded predictions if possible: (codes, True), else (yhat, False). """
+    if classes is not None:
+        codes = _encode(yhat, classes)
+        if codes is not None:
+            return codes, True
+    return yhat, False
+
+
+def _align_proba(proba, model_classes, classes):
+    """ Probabilities as float32 columns aligned with 'classes'. Probability
+    assigned to labels that are not in 'classes' is discarded.
+    """
+    model_classes = np.asarray(model_classes)
+    idx = np.minimum(np.searchsorted(classes, model_classes), len(classes)-1)
+    known = classes[idx] == model_classes
+    aligned = np.zeros((proba.shape[0], len(classes)), dtype=np.float32)
+    aligned[:, idx[known]] = proba[:, known]
+    return aligned
+
+
+def _cache_file(path, key, kind):
+    return "{}.{}.{}{}".format(cache_prefix(path), key[:16], kind, PREDICTIONS_SUFFIX)
+
+
+def _load_predictions(path, key, kinds):
+    """ Memory map the cached arrays 'kinds' of a model. Returns None if 
+    caching is off (key=None), or if an array is missing or older than 
+    the model file.
+    """
+    if key is None:
+        return None
+    arrays = []
+    for kind in kinds:
+        filename = _cache_file(path, key, kind)
+        try:
+            if os.path.getmtime(filename) < os.path.getmtime(source_file(path)):
+                return None
+            arrays.append(np.load(filename, mmap_mode='r'))
+        except (IOError, OSError, ValueError):
+            return None
+    bus.count('prediction_cache_hits', path=path)
+    return arrays
+
+
+def _save_predictions(path, key, **arrays):
+    """ Cache arrays of a model. Files are written under a temporary name 
+    and then renamed, so readers never see partial files. Object arrays 
+    cannot be memory mapped and are not cached.
+    """
+    if key is None:
+        return
+    arrays = {kind: np.asarray(array) for kind, array in arrays.items()}
+    if any(array.dtype.hasobject for array in arrays.values()):
+        return
+    try:
+        for kind, array in arrays.items():
+            filename = _cache_file(path, key, kind)
+            temp = "{}.{}.tmp{}".format(filename, os.getpid(), PREDICTIONS_SUFFIX)
+            np.save(temp, array)
+            os.replace(temp, filename)
+    except (IOError, OSError):
+        warnings.warn("Could not cache predictions of {}: {}".format(path, sys.exc_info()[1]))
+    return
+
+
+def _sklearn_score_fitted(path, data, scorer, classes=None, voting='hard', scoring=None, 
+                          key=None):
+    """ Load a fitted model, predict on `X` and score against `y`. 
+    Predictions are returned as class codes if 'classes' is given (and
+    holds all predicted labels). With voting='soft' float32 probabilities
+    aligned with 'classes' are returned instead.
+    
+    - If 'key' (a fingerprint of `X`) is given, predictions are read from,
+      or else written to, the cache files next to the model.
+    """
+    X, y = attach(data)
     try:
-        model = joblib.load(path)
-        yhat = model.predict(X) 
-        score = scorer(yhat, y)        
-        return (path, yhat, score)
+        if voting == 'soft':
+            cached = _load_predictions(path, key, ('proba', 'classes'))
+            if cached is None:
+                with bus.timer('load', path=path, source='ensembler'):
+                    model = load_model(path)
+                with bus.timer('predict', path=path, source='ensembler'):
+                    cached = (model.predict_proba(X).astype(np.float32), model.classes_)
+                _save_predictions(path, key, proba=cached[0], classes=cached[1])
+            proba = _align_proba(cached[0], cached[1], classes)
+            with bus.timer('score', path=path, source='ensembler'):
+                score = _soft_scores(proba[None], 1., _encode(y, classes), classes, 
+                                     scoring, scorer)[0]
+            return (path, score, proba, True)
+        cached = _load_predictions(path, key, ('labels',))
+        if cached is None:
+            with bus.timer('load', path=path, source='ensembler'):
+                model = load_model(path)
+            with bus.timer('predict', path=path, source='ensembler'):
+                yhat = model.predict(X) 
+            _save_predictions(path, key, labels=yhat)
+        else:
+            yhat = cached[0]
+        with bus.timer('score', path=path, source='ensembler'):
+            score = scorer(y, yhat)        
+        return (path, score) + _compact(yhat, classes)
     except:
+        bus.count('load_failures', path=path, error=repr(sys.exc_info()[1]))
         return None
     
     
-def _keras_score_fitted(path, X, y, scorer):
+def _keras_score_fitted(path, data, scorer, classes=None, voting='hard', scoring=None, 
+                        key=None):
     """ Load previously fitted keras model. Then predict
     on `X` and return score based on comparison to `y`.
+    - The network's outputs are the (sorted) classes seen in training.
+    - Predictions are cached as in '_sklearn_score_fitted'.
     """
+    X, y = attach(data)
+    cached = _load_predictions(path, key, ('proba' if voting == 'soft' else 'labels',))
+    if cached is not None:
+        return _score_predictions(path, cached[0], y, scorer, classes, voting, scoring)
     from keras.models import load_model
     import tensorflow as tf
     config = tf.ConfigProto()
@@ -49,13 +247,276 @@ def _keras_score_fitted(path, X, y, scorer):
         sess = tf.Session(graph=graph, config=config)
         with sess.as_default():
             try:
-                model = load_model(path)
-                yhat = model.predict_classes(X)
-                score = scorer(yhat, y)
-                return (path, yhat, score)
+                with bus.timer('load', path=path, source='ensembler'):
+                    model = load_model(path)
+                with bus.timer('predict', path=path, source='ensembler'):
+                    if voting == 'soft':
+                        predictions = model.predict(X).astype(np.float32)
+                        _save_predictions(path, key, proba=predictions)
+                    else:
+                        predictions = model.predict_classes(X)
+                        _save_predictions(path, key, labels=predictions)
+                return _score_predictions(path, predictions, y, scorer, classes, voting, scoring)
             except:
+                bus.count('load_failures', path=path, error=repr(sys.exc_info()[1]))
                 return None
             
+
+def _add_vote(tally, codes):
+    """
+    Class predicted by a weighted vote after adding one vote to a running
+    tally, for several candidates at once.
+    
+    Parameters:
+    ------------
+        tally : numpy array, shape (n_samples, n_classes)
+            Weighted vote count of the current ensemble.
+            
+        codes : numpy array, shape (n_candidates, n_samples)
+            Class codes predicted by each candidate.
+    
+    Returns:
+    ---------
+        Numpy array of class codes, shape (n_candidates, n_samples). Ties
+        go to the lowest class code, as with np.argmax.
+    
+    """
+    rows = np.arange(tally.shape[0])
+    best = tally.argmax(axis=1)
+    top = tally[rows, best]
+    votes = tally[rows, codes] + 1
+    return np.where((votes > top) | ((votes == top) & (codes < best)), codes, best)
+
+
+def _hard_scores(predicted, y, classes, scoring, scorer):
+    """ Scores of hard votes: 'predicted' holds the class codes predicted by
+    every candidate ensemble, shape (n_candidates, n_samples), 'y' the codes 
+    of the labels. Accuracy is computed for all candidates at once.
+    """
+    if scoring == 'accuracy':
+        return (predicted == y).mean(axis=1)
+    labels = classes[y]
+    return np.array([scorer(labels, classes[pred]) for pred in predicted])
+
+
+def _soft_scores(sums, weight, y, classes, scoring, scorer):
+    """
+    Scores of averaged probabilities.
+    
+    Parameters:
+    ------------
+        sums : numpy array, shape (n_candidates, n_samples, n_classes)
+            Weighted sum of the probabilities of every candidate ensemble.
+            
+        weight : float
+            Total weight of the candidate ensembles, i.e. 'sums / weight' 
+            are the averaged probabilities.
+            
+        y : numpy array, shape (n_samples,)
+            Codes of the labels (indices into 'classes').
+    
+    Returns:
+    ---------
+        Numpy array of scores, shape (n_candidates,). Log loss and accuracy
+        are computed for all candidates at once; other metrics (auc, f1, ...)
+        one candidate at a time.
+        
+    """
+    rows = np.arange(len(y))
+    if scoring == 'log_loss':
+        return -np.log(np.clip(sums[:, rows, y] / weight, 1e-15, 1.)).mean(axis=1)
+    if scoring == 'accuracy':
+        return (sums.argmax(axis=2) == y).mean(axis=1)
+    labels = classes[y]
+    scores = []
+    for total in sums:
+        if scoring == 'auc' and len(classes) == 2:
+            scores.append(scorer(labels, total[:, 1] / weight))
+        elif scoring == 'auc':
+            scores.append(scorer(labels, total / weight, multi_class='ovr', labels=classes))
+        else:
+            scores.append(scorer(labels, classes[total.argmax(axis=1)]))
+    return np.array(scores)
+
+
+def _candidate_scores(tally, weight, candidates, y, classes, scoring, scorer, voting, 
+                      max_bytes=2**27):
+    """ Scores of the current ensemble ('tally', 'weight') plus a single vote 
+    of each candidate. Soft votes are added a chunk of candidates at a time,
+    so that the summed probabilities stay below 'max_bytes'.
+    """
+    if voting == 'hard':
+        return _hard_scores(_add_vote(tally, candidates), y, classes, scoring, scorer)
+    step = max(1, int(max_bytes // max(1, tally.nbytes)))
+    return np.concatenate([_soft_scores(tally + candidates[i:i+step], weight + 1, y, 
+                                        classes, scoring, scorer)
+                           for i in range(0, len(candidates), step)])
+
+
+def _agreement(labels, n_classes, max_bytes=2**27):
+    """ Pairwise agreement of a pool of models: the fraction of samples on 
+    which two models predict the same class. 'labels' holds class codes, 
+    shape (n_models, n_samples). The (n_models, n_models) matrix is a 
+    product of one-hot encoded predictions, accumulated a chunk of samples
+    at a time so that the encoding stays below 'max_bytes'.
+    """
+    n_models, n_samples = labels.shape
+    step = max(1, int(max_bytes // (4 * n_models * n_classes)))
+    agreement = np.zeros((n_models, n_models), dtype=np.float32)
+    for i in range(0, n_samples, step):
+        onehot = (labels[:, i:i+step, None] == np.arange(n_classes)).astype(np.float32)
+        onehot = onehot.reshape(n_models, -1)
+        agreement += onehot.dot(onehot.T)
+    return agreement / n_samples
+
+
+def _prune(labels, y, n_classes, threshold, max_samples=10000, seed=0):
+    """
+    Select a diverse subset of a pool of models, ordered best first.
+    
+    A model is dropped if it agrees with a better model that is kept on at 
+    least a fraction 'threshold' of the samples (near duplicates), or if it 
+    is dominated: it is only correct where a better model that is kept is 
+    correct too. With more than 'max_samples' samples, agreement and 
+    dominance are estimated on a random subset of them.
+    
+    Returns:
+    ---------
+        Array of the indices of the models that are kept.
+    
+    """
+    n_samples = labels.shape[1]
+    if n_samples > max_samples:
+        rows = np.sort(np.random.RandomState(seed).choice(n_samples, max_samples, replace=False))
+        labels, y = labels[:, rows], y[rows]
+    agreement = _agreement(labels, n_classes)
+    correct = (labels == y).astype(np.float32)
+    # beats[i, j]: number of samples where model i is correct and model j is not
+    beats = correct.dot(1. - correct.T)
+    keep = []
+    for i in range(len(labels)):
+        if keep and (agreement[i, keep].max() >= threshold or (beats[i, keep] == 0).any()):
+            continue
+        keep.append(i)
+    return np.asarray(keep)
+
+
+def _sample_size(p, n):
+    """ Number of algorithms to sample: a fraction (float) or a number (int). """
+    if isinstance(p, float):
+        return int(p * float(n))
+    elif isinstance(p, int):
+        return p
+    raise TypeError("p should be int or float.")
+
+
+def _hillclimb_restart(data, classes, scorer, weights, p, greater_is_better=True, 
+                       seed=None, verbose=0, voting='hard', scoring=None):
+    """
+    Run a single hillclimb restart. Defined at module level so that restarts
+    can be dispatched to a pool of worker processes.
+    
+    Parameters:
+    ------------
+        data : DataHandle or tuple
+            Holds (pool, y), where 'y' are the codes of the labels (indices 
+            into 'classes') and 'pool' holds the predictions of every model:
+            - voting='hard': class codes, shape (n_models, n_samples),
+            - voting='soft': probabilities, shape (n_models, n_samples, n_classes).
+            
+        weights : numpy array, shape (n_models,)
+            Initial weights, i.e. 1 for members of the initial ensemble.
+            
+        seed : None or int, default: None
+            Seed of the random stream used to sample the candidates.
+            
+        voting : str, default: 'hard'
+            Score weighted majority votes ('hard') or weighted averages of 
+            probabilities ('soft').
+            
+        scoring : None or str, default: None
+            Name of the metric behind 'scorer'; used to vectorize accuracy
+            and log loss.
+    
+    Returns:
+    ---------
+        Tuple (weights, score) of the final ensemble, or (None, None) if no 
+        candidates could be sampled.
+    
+    """
+    pool, y = attach(data)
+    rng = np.random.RandomState(seed)
+    sign = 1. if greater_is_better else -1.
+    max_iter = 100
+    
+    # Every round scores all candidates at once against a running tally of
+    # (weighted) votes or probabilities, i.e. O(pool * n_samples) per round
+    members = np.sort(rng.choice(len(pool), size=_sample_size(p, len(pool)), replace=False))
+    if not len(members):
+        return None, None
+    candidates = np.asarray(pool[members])
+    weights = np.array(weights, dtype=float)
+    
+    rows = np.arange(len(y))
+    tally = np.zeros((len(y), len(classes)))
+    for i in np.flatnonzero(weights):
+        if voting == 'soft':
+            tally += weights[i] * pool[i]
+        else:
+            tally[rows, pool[i]] += weights[i]
+    
+    if not weights.any():
+        curr_score = -sign * np.inf
+    elif voting == 'soft':
+        curr_score = _soft_scores(tally[None], weights.sum(), y, classes, scoring, scorer)[0]
+    else:
+        curr_score = _hard_scores(tally.argmax(axis=1)[None], y, classes, scoring, scorer)[0]
+    if verbose > 0:
+        print("Initial ensemble score = {:.4f}".format(curr_score))
+    
+    for i in range(1, max_iter):                                    
+        with bus.timer('hillclimb', iteration=i, candidates=len(members), seed=seed) as event:
+            scores = _candidate_scores(tally, weights.sum(), candidates, y, classes, 
+                                       scoring, scorer, voting)
+            # First candidate with the best score, as in a sequential scan
+            best = int(np.argmax(sign * scores))
+            event['score'] = scores[best]
+            event['improved'] = bool(sign * scores[best] > sign * curr_score)
+        
+        if not event['improved']:
+            if verbose > 0:
+                print("Failed to improve. Updated score was: {:.4f}".format(scores[best]))
+            break                        
+        
+        curr_score = scores[best]
+        if voting == 'soft':
+            tally += candidates[best]
+        else:
+            tally[rows, candidates[best]] += 1
+        weights[members[best]] += 1                
+        if verbose > 0:
+            print("Loop iter: {} \tScore: {:.4f}".format(i, curr_score))
+    return weights, curr_score
+
+
+def _score_predictions(path, predictions, y, scorer, classes, voting, scoring):
+    """ Score the predictions of a network: labels (voting='hard') or 
+    probabilities over the sorted classes (voting='soft').
+    """
+    try:
+        with bus.timer('score', path=path, source='ensembler'):
+            if voting == 'soft':
+                if predictions.shape[1] != len(classes):
+                    raise ValueError("Network outputs do not match the classes.")
+                score = _soft_scores(np.asarray(predictions)[None], 1., _encode(y, classes), 
+                                     classes, scoring, scorer)[0]
+                return (path, score, np.asarray(predictions), True)
+            score = scorer(y, predictions)
+        return (path, score) + _compact(predictions, classes)
+    except:
+        bus.count('load_failures', path=path, error=repr(sys.exc_info()[1]))
+        return None
+
             
 class GazerMetaEnsembler(object):
     """
@@ -72,7 +533,7 @@ class GazerMetaEnsembler(object):
             (X.shape[0], X.shape[1]) where `X` is the canonical data-matrix
             with shape (n_samples, n_features)
         
-        models : optional, dict, default: None
+        models : optional, list of (name, path) tuples, default: None
             Only used when instantiating from a pre-existing state. 
             Activated by from_state = True (see below).
             
@@ -115,7 +576,7 @@ class GazerMetaEnsembler(object):
         # These are set according to passed state variable
         if not from_state:
             self.ensemble = self._build()
-            self.models = {}   
+            self.models = []   
             self.allow_train = True
         elif from_state:
             self.ensemble = None
@@ -125,8 +586,16 @@ class GazerMetaEnsembler(object):
     
     @classmethod
     def from_state(cls, topdir):        
+        """ Instantiate from the models saved under 'topdir' by 'fit': 
+        model files in per-algorithm folders, and/or the members of the
+        archive in 'topdir' (only its manifest is read, see gazer.archive).
+        """
         kwargs = {'learner': None, 'data_shape': None, 'from_state': True}
-        kwargs.update({'models': cls.fetch_state_dict(topdir)})        
+        models = ModelArchive(topdir).refs() if is_archive(topdir) else []
+        models += [(name, os.path.join(topdir, name, file)) 
+                   for name, files in sorted(cls.fetch_state_dict(topdir).items()) 
+                   for file in sorted(files)]
+        kwargs.update({'models': sorted(models, key=itemgetter(0))})        
         return cls(**kwargs)
 
     
@@ -140,6 +609,8 @@ class GazerMetaEnsembler(object):
         for dirpath, dirnames, dirfiles in search_tree:
             if dirnames:
                 raise Exception("Tree is too deep. Remove subdirs: {}".format(dirnames))
+            # Skip cached predictions (see 'hillclimb')
+            dirfiles = [file for file in dirfiles if not file.endswith(PREDICTIONS_SUFFIX)]
             if dirfiles:
                 key = os.path.basename(dirpath)
                 d[key] = dirfiles
@@ -152,6 +623,7 @@ class GazerMetaEnsembler(object):
         """ Build ensemble from base learners 
         contained in the `learner` object.        
         """
+        from .library import library_config
         lib = library_config(self.learner.names, *self.data_shape)        
         build = {}
         for name, grid in lib:            
@@ -213,23 +685,27 @@ class GazerMetaEnsembler(object):
                     return np.linspace(low, high, points, endpoint=True)
     
     
-    def fit(self, X, y, save_dir, scoring='accuracy', n_jobs=1, verbose=0, **kwargs):
+    def fit(self, X, y, save_dir, scoring='accuracy', n_jobs=1, verbose=0, archive=False, 
+            backend='threading', compress=0, max_pending=2, **kwargs):
         """
         Fit an ensemble of algorithms.
         
         - Models are pickled under the `save_dir`
-          folder (each algorithm will have a separate folder in the tree)
+          folder (each algorithm will have a separate folder in the tree),
+          or packed into an archive in `save_dir` (see `archive`)
         
         - If directory does not exist, we attempt to create it. 
 
 
         Parameters:
         -----------
-            X : matrix-like
+            X : matrix-like or DataHandle
                 2D matrix of shape (n_samples, n_features)
+                - When n_jobs > 1 the data is published once (see 
+                  gazer.utils.shared) and all workers attach to it.
 
             y : array-like
-                Label vector of shape (n_samples,)
+                Label vector of shape (n_samples,). Ignored if X is a DataHandle.
             
             save_dir : str
                 A valid folder wherein pickled algorithms will be saved
@@ -240,12 +716,42 @@ class GazerMetaEnsembler(object):
             
             n_jobs : integer, default: 1
                 If n_jobs > 1 we use parallel processing to fit and save
-                scikit-learn models. 
+                scikit-learn models. Models are fitted in order of their
+                estimated cost (data size times `n_estimators`), longest
+                first, so that a large model does not start last.
                 Note: it is not used when training the neural network.
                 
             verbose : integer, default: 0
                 Control verbosity during training process.
                 
+            archive : boolean, default: False
+                Pack the scikit-learn models into a few segment files in
+                `save_dir`, indexed by a manifest holding the name, params,
+                training score and byte range of every model (see 
+                gazer.archive). Neural networks are still saved as files.
+                
+            backend : str, default: 'threading'
+                Parallel backend used when n_jobs > 1: 'threading', or 
+                'multiprocessing' to fit in worker processes (not limited by
+                the GIL). Workers attach to data published once (see 
+                gazer.utils.shared); with an archive the pickled models are
+                sent back to this process, which writes them as they arrive.
+                
+            compress : integer, default: 0
+                joblib compression level (0-9) of the pickled models. Large
+                forests shrink several times at levels 1-3.
+                
+            max_pending : integer, default: 2
+                Models are written by a background thread while the next
+                ones are fitted (see gazer.archive.ModelWriter). At most 
+                'max_pending' fitted models wait to be written: fitting 
+                blocks while the queue is full. 'fit' returns once all 
+                models are written and synced to disk. Set max_pending=0 to
+                write synchronously. With backend='multiprocessing' workers
+                write (and sync) their own model files, or send the packed
+                models of an archive back as they finish: at most
+                n_jobs + max_pending models are in flight at once.
+                
             **kwargs: 
                 Variables related to scikit-learn estimator.
                 Used to alter estimator parameters if needed (such as e.g. n_jobs)
@@ -256,6 +762,8 @@ class GazerMetaEnsembler(object):
                     - Note that the key needs to match the a key in the `ensemble` dict
                       to take effect. 
                     - The change takes place through estimator.set_params()
+                    - With n_jobs > 1, an 'n_jobs' given here is capped so that
+                      all workers together do not use more than all cores.
 
         Returns:
         --------
@@ -268,64 +776,174 @@ class GazerMetaEnsembler(object):
                 "Try calling .hillclimb(X, y,..) method instead.")            
         if not save_dir:
             raise Exception("'{}' is not a valid directory.".format(save_dir))
+        if not backend in ('threading', 'multiprocessing'):
+            raise ValueError("backend should be 'threading' or 'multiprocessing'.")
         if os.path.exists(save_dir):
             warnings.warn("Warning: overwriting existing folder {}.".format(save_dir))
         else:
             os.makedirs(save_dir)
             
-        self.models = self._fit(X=X, y=y, save_dir=save_dir, 
-                                      scorer=get_scorer(scoring), 
-                                      n_jobs=n_jobs, verbose=verbose, 
-                                      **kwargs)
+        # Threads attach to an in-memory handle, processes to published data
+        with shared(X, y, n_jobs=1 if backend == 'threading' else n_jobs) as data:
+            history = self._fit(data=data, save_dir=save_dir, 
+                                scorer=get_scorer(scoring), 
+                                n_jobs=n_jobs, verbose=verbose, 
+                                archive=archive, backend=backend, compress=compress, 
+                                max_pending=max_pending, **kwargs)
+        # Flat list of (name, path) tuples, as in 'from_state'
+        self.models = [model for name in sorted(history) for model in history[name]]
     
-    def _fit(self, X, y, save_dir, scorer, n_jobs, verbose, **kwargs):
+    def _fit(self, data, save_dir, scorer, n_jobs, verbose, archive=False, backend='threading', 
+             compress=0, max_pending=2, **kwargs):
         """ Implement fitting. 
         """
+        from .optimization import param_search
+        
         # Keep track of model and score
         # All relevant data is available in `history`
         history = {}
                
         names = list(self.ensemble.keys())
         for name in names:
-            os.makedirs(os.path.join(save_dir, name))        
+            if name == 'neuralnet' or not archive:
+                os.makedirs(os.path.join(save_dir, name))        
+        archive = ModelArchive(save_dir, mode='w', compress=compress) if archive else None
+        writer = None
+        if n_jobs == 1 or backend == 'threading':
+            writer = ModelWriter(archive, compress=compress, max_pending=max_pending)
         
         name = 'neuralnet'
         if name in names:            
             args, param_grid = self.ensemble.pop(name)            
             n_iter = args['n_iter']            
-            data = {'train': (X, y), 'val': None} 
             modelfiles = [os.path.join(save_dir, name, file) for file in args['modelfiles']]            
             _, df = param_search(
                 self.learner, param_grid, 
-                data=data, 
+                data={'train': attach(data), 'val': None}, 
                 type_of_search='random', 
                 n_iter=n_iter, 
                 name=name, 
                 modelfiles=modelfiles)
             history[name] = zip(modelfiles, df.head(len(modelfiles))['train_score'].values)
         
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            for name, estimators in self.ensemble.items():                            
-                path = os.path.join(save_dir, name)
-                kwarg = kwargs.get(name, {})                                           
+        recorder = self.learner.costs if self.learner is not None else None
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
                 if n_jobs != 1:
-                    models = joblib.Parallel(n_jobs=n_jobs, verbose=verbose, backend="threading")(
-                        joblib.delayed(single_fit)(estimator, scorer, X, y, path, i, **kwarg) 
-                        for i, estimator in enumerate(estimators, start=1))
+                    history.update(self._fit_pool(data, save_dir, scorer, n_jobs, verbose, 
+                                                  archive, writer, backend, recorder, 
+                                                  compress, max_pending, **kwargs))
                 else:
-                    models = []
-                    for i, estimator in enumerate(tqdm(estimators, desc="{}".format(name), ncols=120)):
-                        this_modelfile, this_score = single_fit(estimator, scorer, X, y, path, i, **kwarg)
-                        models.append((this_modelfile, this_score))                   
-                history[name] = sorted(list(models), key=lambda x: -x[1]) 
+                    for name, estimators in self.ensemble.items():                            
+                        path = os.path.join(save_dir, name)
+                        kwarg = kwargs.get(name, {})                                           
+                        models = []
+                        for i, estimator in enumerate(progress(estimators, desc="{}".format(name), ncols=120)):
+                            this_modelfile, this_score = single_fit(estimator, scorer, data, path, i, 
+                                                                    recorder=recorder, algorithm=name, 
+                                                                    writer=writer, **kwarg)
+                            models.append((this_modelfile, this_score))                   
+                        history[name] = sorted(list(models), key=lambda x: -x[1]) 
+        finally:
+            # Wait for pending writes, then write the manifest (also of a 
+            # partially fitted library)
+            if writer is not None:
+                writer.close()
+            if archive is not None:
+                archive.close()
             
-        # Purge any failed fits
+        # Purge any failed fits (and writes)
+        failed = writer.failed if writer is not None else {}
         for name, models in history.items():
-            history[name] = [(name, file) for file, _ in models if file is not None]            
+            history[name] = [(name, file) for file, _ in models 
+                             if file is not None and not file in failed]            
         return history
     
     
+    def _fit_pool(self, data, save_dir, scorer, n_jobs, verbose, archive, writer, backend, 
+                  recorder, compress, max_pending=2, **kwargs):
+        """ Fit all scikit-learn models in a pool of workers, longest first. 
+        Returns a dictionary of (path, score) lists per algorithm.
+        - Worker processes are handed at most n_workers + max_pending 
+          tasks at a time, and their results are collected as they 
+          complete, so that few fitted (packed) models are held at once.
+        """
+        shape = attach(data)[0].shape
+        tasks = sorted([(name, i, estimator) for name, estimators in self.ensemble.items() 
+                        for i, estimator in enumerate(estimators, start=1)], 
+                       key=lambda task: -_fit_cost(task[2], shape))
+        n_workers = min(len(tasks), effective_n_jobs(n_jobs)) or 1
+        options = {}
+        for name in self.ensemble:
+            options[name] = dict(kwargs.get(name, {}))
+            if 'n_jobs' in options[name]:
+                options[name]['n_jobs'] = balance_n_jobs(options[name]['n_jobs'], n_workers)
+        
+        history = {name: [] for name in self.ensemble}
+        if backend == 'threading':
+            parallel = joblib.Parallel(n_jobs=n_workers, verbose=verbose, backend=backend)
+            fitted = parallel(
+                joblib.delayed(single_fit)(estimator, scorer, data, os.path.join(save_dir, name), 
+                                           i, recorder=recorder, algorithm=name, 
+                                           # Memory traces are per process
+                                           track_memory=False, writer=writer, 
+                                           **options[name]) 
+                for name, i, estimator in tasks)
+        else:
+            track_memory = recorder is not None and recorder.track_memory
+            pending = iter(enumerate(tasks))
+            running, fitted = {}, [None] * len(tasks)
+            with ProcessPoolExecutor(n_workers) as executor:
+                def submit():
+                    for k, (name, i, estimator) in pending:
+                        future = executor.submit(_process_fit, estimator, scorer, data, 
+                                                 os.path.join(save_dir, name), i, algorithm=name, 
+                                                 track_memory=track_memory, 
+                                                 packed=archive is not None, compress=compress, 
+                                                 **options[name])
+                        running[future] = k
+                        if len(running) >= n_workers + max_pending:
+                            return
+                    
+                submit()
+                while running:
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        k = running.pop(future)
+                        name, i, _ = tasks[k]
+                        fitted[k] = self._collect(future.result(), name, i, archive, 
+                                                  recorder, backend)
+                        if verbose > 0:
+                            print("Fitted {} of {} models".format(
+                                len(tasks) - fitted.count(None), len(tasks)))
+                    submit()
+        
+        for (name, _, _), model in zip(tasks, fitted):
+            history[name].append(model)
+        return {name: sorted(models, key=lambda x: -x[1]) for name, models in history.items()}
+    
+    
+    @staticmethod
+    def _collect(result, name, i, archive, recorder, backend):
+        """ Collect the model, costs and events reported by a worker process.
+        A packed model is added to 'archive'. Returns (path, score).
+        """
+        (modelfile, score), records = result
+        fields = {'algorithm': name, 'source': 'ensembler', 'model': i}
+        if modelfile is not None and archive is not None:
+            packed, params = modelfile
+            modelfile = archive.add_packed(name, packed, score=score, params=params)
+        for record in records:
+            bus.record(record['stage'], record['seconds'], backend=backend, **fields)
+            if recorder is not None:
+                recorder.record(name, record['stage'], record['seconds'], 
+                                (record['nrow'], record['ncol']), params=record['params'], 
+                                peak_bytes=record['peak_bytes'], source='ensembler')
+        bus.count('models_fitted' if modelfile is not None else 'fit_failures', **fields)
+        return (modelfile, score)
+    
+    
     def _add_networks(self, clf, X, y, path):
         """Add to ensemble repository a set of keras neural network
         models       
@@ -359,7 +977,7 @@ class GazerMetaEnsembler(object):
         model = clf.estimator
         models = []
                
-        for weightfile in tqdm(weightfiles, desc="Net (save wts)", ncols=120): 
+        for weightfile in progress(weightfiles, desc="Net (save wts)", ncols=120): 
             model.load_weights(weightfile)
             loss, score = model.evaluate(X, y_, verbose=0)
             models.append((weightfile, np.round(loss, decimals=4)))
@@ -370,19 +988,21 @@ class GazerMetaEnsembler(object):
    
 
     def hillclimb(self, X, y, n_best=0.1, p=0.3, iterations=10, scoring='accuracy', 
-                  greater_is_better=True, n_jobs=1, verbose=0):
+                  greater_is_better=True, n_jobs=1, verbose=0, random_state=None, voting='hard',
+                  cache=True, prune=None):
         """
         Perform hillclimbing on the validation data
         
         Parameters:
         ------------
-            X : validation data, shape (n_samples, n_features)
+            X : validation data, shape (n_samples, n_features), or DataHandle
             
-            y : validation labels, shape (n_samples,)
+            y : validation labels, shape (n_samples,). Ignored if X is a DataHandle.
             
             n_best : int or float, default: 0.1
                 Specify number (int) or fraction (float) of classifiers
                 to use as initial ensemble. The best will be chosen.
+                With 'prune', this is counted in the pruned pool.
                 
             p : float, default: 0.3
                 Fraction of classifiers to select for bootstrap
@@ -394,24 +1014,58 @@ class GazerMetaEnsembler(object):
                 
             scoring : str, default: 'accuracy'
                 The metric to use when hillclimbing
+                - 'log_loss' and 'auc' are only meaningful with voting='soft'.
             
             greater_is_better : boolean, default: True
                 If True then a higher score on the validation
-                set is better.
+                set is better. Ignored for scoring='log_loss' (lower is better).
             
             n_jobs : int, default: 1
-                Parallel processing of files.
+                Parallel processing of files (threads), and of the 
+                hillclimb restarts (worker processes). Workers attach to 
+                the pooled predictions read-only (see gazer.utils.shared).
                 
             verbose : int, default: 0
                 Whether to output extra information or not.
                 - Set verbose = 1 to get info.               
+                
+            random_state : None or int, default: None
+                Seeds the restarts: every restart draws from its own random
+                stream derived from 'random_state', so results do not depend 
+                on 'n_jobs'.
+                
+            voting : str, default: 'hard'
+                Select the ensemble by its weighted majority vote ('hard'), or
+                by its weighted average of probabilities ('soft'). Soft voting
+                keeps a float32 probability matrix per model in memory, and 
+                requires models that implement `predict_proba`.
+                
+            cache : boolean, default: True
+                Persist the validation predictions (and probabilities) of 
+                every model next to the model file, keyed by a fingerprint of
+                X. Later calls on the same validation data memory map them
+                instead of loading and re-predicting every model. Cached files
+                older than their model file are ignored.
+                
+            prune : None or float, default: None
+                Agreement threshold in (0, 1]. Before hillclimbing, a model
+                is dropped from the pool if its predictions agree with a 
+                better model on at least this fraction of the samples (e.g.
+                prune=0.99), or if it is only correct where a better model
+                is correct too. The agreement of all pairs is computed with
+                a single matrix product (on at most 10000 samples). With 
+                voting='soft' the predicted classes are compared.
         
         """
-        if isinstance(n_best, float):
-            grab = int(n_best*len(self.models))
-        elif isinstance(n_best, int):
-            grab = n_best
-        else:
+        if not voting in ('hard', 'soft'):
+            raise ValueError("voting should be 'hard' or 'soft'.")
+        if prune is not None and not 0 < prune <= 1:
+            raise ValueError("prune should be None or a fraction in (0, 1].")
+        if scoring == 'log_loss':
+            greater_is_better = False
+        if voting == 'hard' and scoring in ('log_loss', 'auc'):
+            warnings.warn("Scoring '{}' on hard votes: consider voting='soft'.".format(scoring))
+        if not isinstance(n_best, (int, float)):
             raise TypeError("n_best should be int or float.")
             
         nets = [path for name, path in self.models if (name == 'neuralnet')]    
@@ -421,142 +1075,92 @@ class GazerMetaEnsembler(object):
                                    verbose=verbose, 
                                    backend="threading")
         
-        with warnings.catch_warnings():
+        # Predictions are label encoded as soon as they are computed: the pool 
+        # is a single (n_models, n_samples) matrix of uint8/uint16 class codes,
+        # or a (n_models, n_samples, n_classes) float32 tensor of probabilities
+        options = {'voting': voting, 'scoring': scoring}
+        with warnings.catch_warnings(), shared(X, y) as data:
             warnings.simplefilter('ignore')      
-            sklearn = parallel(joblib.delayed(_sklearn_score_fitted)(path, X, y, scorer) 
+            X, y = attach(data)
+            options['key'] = fingerprint(X, full=True) if cache else None
+            classes = np.unique(y)
+            sklearn = parallel(joblib.delayed(_sklearn_score_fitted)(path, data, scorer, classes, 
+                                                                     **options) 
                                for path in clfs) if clfs else []
-            time.sleep(1)
-            external = parallel(joblib.delayed(_keras_score_fitted)(path, X, y, scorer) 
+            if nets:
+                time.sleep(1)
+            external = parallel(joblib.delayed(_keras_score_fitted)(path, data, scorer, classes, 
+                                                                    **options) 
                                 for path in nets) if nets else []
+            y = np.asarray(y)
+        # Best single models first
         pooled = sorted([clf for clf in sklearn+external if not clf is None], 
-                        key=itemgetter(2))                 
+                        key=itemgetter(1), reverse=greater_is_better)                 
         del sklearn
         del external        
+        if not pooled:
+            raise ValueError("No fitted models could be loaded.")
         
         if verbose > 0:        
-            max_score = max(pooled, key=itemgetter(2))
-            print("Single model max validation score = {}".format(np.round(max_score, 4))) 
-        
-        pooled = [(str(idx), clf, preds) for idx, (clf, preds, _) in enumerate(pooled)]
-        ensemble = pooled[:grab]        
-        weights = {idx: 0. for idx, *_ in pooled}    
-        for idx, *_ in ensemble: weights[idx] = 1.
-        
-        if verbose > 0: 
-            print("Best model: {}".format(ensemble[0][1]))                         
-    
-        all_ensembles = []
-        for _ in range(iterations):
-            this_ensemble = self._hillclimb_loop(X = X, y = y, scorer = scorer, ensemble = ensemble, 
-                                        weights = weights, pooled = pooled, p = p, verbose = verbose)
-            if this_ensemble: 
-                all_ensembles.append(this_ensemble)
-        
-        scores = []
-        ensembles = []
-        for ensemble in all_ensembles:
-            scores.append(ensemble[-1])
-            ensembles.append(ensemble[:-1])        
+            print("Single model max validation score = {:.4f}".format(pooled[0][1])) 
+            print("Best model: {}".format(pooled[0][0]))                         
         
-        max_score = max(scores)        
-        return max_score, ensembles[scores.index(max_score)]
-    
-    
-    def _hillclimb_loop(self, X, y, scorer, ensemble, weights, pooled, p, verbose, seed=None):
-        """ Execute hillclimb loop.        
-        """ 
-        max_iter = 100
-        val_scores = []
-        best_score = float("-Inf") if greater_is_better else float("Inf")
-        if seed is not None: 
-            np.random.seed(seed)
-        scargs = {'greater_is_better': greater_is_better}
-                
-        hc_weights = weights.copy()
-        hc_ensemble = ensemble.copy()
-        hc_pool = self.sample_algorithms(p, pooled)
-
-        curr_score = self.score(hc_ensemble, hc_weights, y, scorer)      
-        if verbose > 0:
-            print("Initial ensemble score = {:.4f}".format(curr_score))
-                  
-        for i in range(1, max_iter):                                    
-            for algorithm in hc_pool:                
-                idx = algorithm[0]                
-                local_ensemble = hc_ensemble.copy()
-                local_ensemble.append(algorithm)                         
-                local_weights = hc_weights.copy()
-                local_weights[idx] += 1
-                
-                this_score = self.score(local_ensemble, local_weights, y, scorer)            
-                if rank_scores(this_score, best_score, **scargs)
-                    best_idx = idx
-                    best_score = this_score
-                    best_algorithm = [algorithm]
-            
-            if rank_scores(curr_score, best_score, strict=False, **scargs)
-                print("Failed to improve. Updated score was: {:.4f}".format(best_score))
-                break                        
-            elif rank_scores(best_score, curr_score, **scargs)
-                curr_score = best_score
-                hc_weights[best_idx] += 1                
-                if not best_idx in self.get_idx(hc_ensemble):
-                    hc_ensemble += best_algorithm
-            
-            val_scores.append((i, curr_score))
+        paths = [path for path, *_ in pooled]
+        predictions = [preds if encoded else None for _, _, preds, encoded in pooled]
+        if not all(encoded for *_, encoded in pooled):
+            # Some models predict labels that are absent from 'y'
+            labels = [classes[preds] if encoded else preds for _, _, preds, encoded in pooled]
+            classes = np.unique(np.concatenate([np.unique(l) for l in labels]))
+            predictions = [_encode(l, classes) for l in labels]
+            del labels
+        del pooled
+        if voting == 'soft':
+            pool = np.empty((len(predictions), len(y), len(classes)), dtype=np.float32)
+        else:
+            pool = np.empty((len(predictions), len(y)), dtype=_code_dtype(len(classes)))
+        for i in range(len(predictions)):
+            pool[i], predictions[i] = predictions[i], None
+        if prune is not None:
+            labels = pool.argmax(axis=2) if voting == 'soft' else pool
+            keep = _prune(labels, _encode(y, classes), len(classes), prune)
+            del labels
+            bus.count('models_pruned', len(paths) - len(keep))
             if verbose > 0:
-                print("Loop iter: {} \tScore: {:.4f}".format(*val_scores[-1]))
-            
-        weighted_ensemble = [(path, hc_weights[idx]) for idx, path, _ in hc_ensemble]        
-        weighted_ensemble.append(val_scores[-1][-1])
-        return weighted_ensemble
-        
-    
-    @staticmethod
-    def rank_scores(score, score_to_compare, greater_is_better, strict=True):
-    if strict:
-        op = operator.gt if greater_is_better else operator.lt
-    else:
-        op = operator.ge if greater_is_better else operator.le
-    return op(score, score_to_compare)
+                print("Pruned pool: {} of {} models kept".format(len(keep), len(paths)))
+            pool, paths = pool[keep], [paths[i] for i in keep]
+        # The initial ensemble is taken from the (pruned) pool
+        if isinstance(n_best, float):
+            grab = int(n_best*len(paths))
+        else:
+            grab = min(n_best, len(paths))
+        weights = np.zeros(len(paths))
+        weights[:grab] = 1.
         
+        # Seeds are drawn up front: restart 'i' always gets seed 'i'
+        seeds = np.random.RandomState(random_state).randint(np.iinfo(np.int32).max, 
+                                                            size=iterations)
+        with shared(pool, _encode(y, classes), n_jobs=n_jobs) as data:
+            restarts = joblib.Parallel(n_jobs=n_jobs, backend='multiprocessing')(
+                joblib.delayed(_hillclimb_restart)(data, classes, scorer, weights, p, 
+                                                   greater_is_better=greater_is_better, 
+                                                   seed=seed, verbose=verbose, 
+                                                   voting=voting, scoring=scoring)
+                for seed in seeds)
+        restarts = [(w, score) for w, score in restarts if w is not None]
+        if not restarts:
+            raise ValueError("Hillclimbing failed: the pool is too small for p={}.".format(p))
         
-    def score(self, ensemble, weights, y, scorer):
-        """ Compute weighted majority vote. 
-        """        
-        wts = np.zeros(len(ensemble))
-        preds = np.zeros((len(y), len(ensemble)), dtype=int)        
-        for col, (idx, _, pred) in enumerate(ensemble):
-            wts[col] = weights[idx]
-            preds[:, col] = pred           
-        return self.weighted_vote_score(wts, preds, y, scorer)
-
-    
-    def weighted_vote_score(self, weights, preds, y, scorer):  
-        """ Score an ensemble of classifiers using weighted voting. 
-        """
-        classes = np.unique(preds)
-        classmapper = {}
-        for i, cls in enumerate(classes):
-            classmapper[i] = cls
-            belief = np.matmul(preds[:,:]==cls, weights)
-            weighted = belief if i==0 else np.vstack((weighted, belief))
-        predicted_class = np.array(
-            list(map(lambda idx: classmapper[idx], np.argmax(weighted.T, axis=1))))             
-        return scorer(predicted_class, y)
-    
-    
-    def sample_algorithms(self, p, pool):        
-        """ Sample algorithms from repository
+        # Ties go to the first restart
+        sign = 1. if greater_is_better else -1.
+        scores = [sign * score for _, score in restarts]
+        best_weights, max_score = restarts[scores.index(max(scores))]
+        return max_score, [(paths[i], float(best_weights[i])) for i in np.flatnonzero(best_weights)]
+    
+    
+    def predictor(self, ensemble, voting='hard', **kwargs):
+        """ Build an EnsemblePredictor (see gazer.predictor) from the output 
+        of 'hillclimb'. Use the voting the ensemble was selected with. 
+        Keyword arguments are passed to EnsemblePredictor.
         """
-        idxmapper = {idx: (idx, clf, pr) for idx, clf, pr in pool}               
-        if isinstance(p, float):
-            size = int(p * float(len(pool)))
-        elif isinstance(p, int):
-            size = p        
-        return list(map(lambda idx: idxmapper[idx], 
-                        np.random.choice(self.get_idx(pool), 
-                                         size=size, replace=False)))
-            
-    def get_idx(self, item):
-        return [idx for idx, *_ in item]
\ No newline at end of file
+        from .predictor import EnsemblePredictor
+        return EnsemblePredictor(ensemble, voting=voting, **kwargs)
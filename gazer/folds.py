@@ -0,0 +1,212 @@
+"""
+Fold-level cache for cross validation.
+
+A FoldCache splits the data into folds once and can then be shared by every
+algorithm and every candidate configuration of a search:
+
+    - fold indices are computed once (the cache is a valid 'cv' splitter
+      for RandomizedSearchCV, cross_val_score, etc.),
+    - contiguous (train, validation) fold arrays are sliced on first use and
+      then kept in a size-bounded LRU cache,
+    - for scikit-learn Pipelines the leading transformer steps (e.g. the
+      Nystroem kernel map of the 'svm' meta classifier) are fitted once per
+      fold and parameter setting; the transformed fold arrays are cached
+      as well, so candidates that only differ in the final step reuse them.
+
+Example:
+---------
+    >>> from gazer.folds import FoldCache
+    >>> folds = FoldCache(X, y, cv=5)
+    >>> learner.rand_optimize(X, y, cv=folds)
+    >>> learner.bayes_optimize(X, y, cv=folds)
+
+"""
+import numpy as np
+
+from .utils.lazy import LazyModule
+from .utils.cache import PredictionCache
+
+# Heavy dependencies are imported on first use
+base = LazyModule('sklearn.base')
+joblib = LazyModule('sklearn.externals.joblib')
+sklearn_metrics = LazyModule('sklearn.metrics')
+model_selection = LazyModule('sklearn.model_selection')
+
+
+
+def _take(X, idx):
+    """ Select rows from a numpy array, sparse matrix or pandas object. """
+    if hasattr(X, 'iloc'):
+        return X.iloc[idx]
+    return X[idx]
+
+
+def _describe(step):
+    """ Hashable description of a transformer and its parameters. """
+    params = sorted((key, repr(value)) for key, value in step.get_params(deep=True).items())
+    return (step.__class__.__name__, tuple(params))
+
+
+def _fit_and_score(estimator, X_train, y_train, X_val, y_val, scoring):
+    """ Fit on a training fold and score on its validation fold. Defined
+    at module level so that it can be dispatched to a pool of workers.
+    """
+    estimator.fit(X_train, y_train)
+    scorer = sklearn_metrics.check_scoring(estimator, scoring=scoring)
+    return scorer(estimator, X_val, y_val)
+
+
+
+class FoldCache(object):
+    """
+    Split data into cross validation folds once, and cache fold arrays
+    and fold-wise transformed features.
+
+    Parameters:
+    ------------
+        X : array-like, shape (n_samples, n_features)
+            Data matrix.
+
+        y : array-like, shape (n_samples,)
+            Labels/ground truth.
+
+        cv : integer or callable, default: 10
+            Number of (stratified) folds, or a splitter with a 'split' method.
+
+        cache_size : integer, default: 1024
+            Size (in megabytes) of the LRU cache holding contiguous fold
+            arrays and transformed features. Evicted arrays are recomputed
+            when needed again.
+
+    Notes:
+    -------
+        A transformer with random_state=None is fitted once per fold and
+        parameter setting, i.e. all candidates see the same random features.
+
+    """
+    def __init__(self, X, y, cv=10, cache_size=1024):
+        if hasattr(X, 'iloc'):
+            X = X.values
+        if hasattr(y, 'iloc'):
+            y = y.values
+        self.X = X
+        self.y = np.asarray(y)
+        splitter = model_selection.check_cv(cv, self.y, classifier=True)
+        self.folds = [(np.asarray(train), np.asarray(val))
+                      for train, val in splitter.split(X, self.y)]
+        self._cache = PredictionCache(max_bytes=cache_size * 2**20)
+
+    @property
+    def n_splits(self):
+        return len(self.folds)
+
+    # Splitter protocol: FoldCache can be passed as 'cv' to scikit-learn
+    def split(self, X=None, y=None, groups=None):
+        for train, val in self.folds:
+            yield train, val
+
+    def get_n_splits(self, X=None, y=None, groups=None):
+        return self.n_splits
+
+    def indices(self):
+        """ List of (train, validation) index arrays. Cheap to pickle. """
+        return list(self.folds)
+
+
+    def _store(self, key, value):
+        """ Cache a dense array; sparse matrices are not cached. """
+        if hasattr(value, 'tocsr'):
+            return value
+        return self._cache.put(key, np.ascontiguousarray(value))
+
+    def _cached(self, key, compute):
+        value = self._cache.get(key)
+        if value is None:
+            value = self._store(key, compute())
+        return value
+
+    def fold(self, i):
+        """ Return (X_train, y_train, X_val, y_val) of fold 'i'. """
+        train, val = self.folds[i]
+        return (self._cached(('X', 'train', i), lambda: _take(self.X, train)),
+                self.y[train],
+                self._cached(('X', 'val', i), lambda: _take(self.X, val)),
+                self.y[val])
+
+
+    def transform(self, i, steps):
+        """
+        Fit a chain of transformers on the training part of fold 'i'.
+
+        Parameters:
+        ------------
+            i : integer
+                Fold index.
+
+            steps : list of transformers
+                Applied in order (fit_transform on train, transform on val).
+
+        Returns:
+        ---------
+            Tuple (Xt_train, y_train, Xt_val, y_val).
+
+        """
+        X_train, y_train, X_val, y_val = self.fold(i)
+        key = tuple(_describe(step) for step in steps)
+        Xt_train = self._cache.get(('T', 'train', i, key))
+        Xt_val = self._cache.get(('T', 'val', i, key))
+
+        if Xt_train is None or Xt_val is None:
+            Xt_train, Xt_val = X_train, X_val
+            for step in steps:
+                step = base.clone(step)
+                Xt_train = step.fit_transform(Xt_train, y_train)
+                Xt_val = step.transform(Xt_val)
+            Xt_train = self._store(('T', 'train', i, key), Xt_train)
+            Xt_val = self._store(('T', 'val', i, key), Xt_val)
+        return Xt_train, y_train, Xt_val, y_val
+
+
+    def cross_val_score(self, estimator, scoring='accuracy', n_jobs=1, indices=None):
+        """
+        Cross validate 'estimator' on the cached folds. Equivalent to
+        sklearn.model_selection.cross_val_score(estimator, X, y, cv=self),
+        but fold arrays, and the transformed features of a Pipeline's
+        leading steps, are reused between calls.
+
+        Parameters:
+        ------------
+            estimator : sklearn estimator or Pipeline
+                Cloned, never fitted in place.
+
+            scoring : str or callable, default: 'accuracy'
+
+            n_jobs : integer, default: 1
+                Number of folds to fit in parallel.
+
+            indices : None or iterable of integers, default: None
+                Evaluate these folds only (all folds if None).
+
+        Returns:
+        ---------
+            Numpy array of scores, one per evaluated fold.
+
+        """
+        estimator = base.clone(estimator)
+        steps = []
+        if hasattr(estimator, 'steps') and len(estimator.steps) > 1:
+            steps = [step for _, step in estimator.steps[:-1]
+                     if step is not None and step != 'passthrough']
+            estimator = estimator.steps[-1][1]
+
+        indices = range(self.n_splits) if indices is None else indices
+        if steps:
+            data = [self.transform(i, steps) for i in indices]
+        else:
+            data = [self.fold(i) for i in indices]
+
+        scores = joblib.Parallel(n_jobs=n_jobs)(
+            joblib.delayed(_fit_and_score)(base.clone(estimator), X_train, y_train,
+                                           X_val, y_val, scoring)
+            for X_train, y_train, X_val, y_val in data)
+        return np.asarray(scores)
@@ -0,0 +1,384 @@
+"""
+Multi-fidelity hyperparameter search: successive halving and Hyperband.
+
+Many configurations are first evaluated on a small budget (few training
+samples, few trees, few epochs, ...). Only the best 1/eta fraction is promoted
+to the next rung, where the budget is multiplied by eta. The last rung always
+runs on the full budget, so the selected configuration is scored exactly as in
+a plain randomized search -- but most of the poor configurations never get
+that far.
+
+The budget ("resource") depends on the algorithm, see 'RESOURCES':
+
+    - 'n_estimators' for ensembles of trees,
+    - 'max_iter' for iterative linear models,
+    - the number of training samples for everything else.
+
+The full budget of a parameter is the upper bound of its search space, or
+else the estimator's own value, unless 'max_resource' is given.
+
+Both searches mimic RandomizedSearchCV: call fit(X, y) and consult
+'best_params_', 'best_score_', 'best_estimator_' and 'cv_results_'.
+
+Reference:
+-----------
+    Li et al., "Hyperband: A Novel Bandit-Based Approach to Hyperparameter
+    Optimization", JMLR 18 (2018).
+
+"""
+from __future__ import print_function
+
+import math
+import warnings
+
+import numpy as np
+
+from .utils.lazy import LazyModule
+
+# Heavy dependencies are imported on first use
+base = LazyModule('sklearn.base')
+model_selection = LazyModule('sklearn.model_selection')
+
+
+# Use the number of training samples as resource
+SAMPLES = 'n_samples'
+
+# Algorithm name -> (resource, min resource)
+RESOURCES = {
+    'adaboost': ('n_estimators', 10),
+    'gbm': ('n_estimators', 10),
+    'random_forest': ('n_estimators', 8),
+    'xgboost': ('n_estimators', 20),
+    'logreg': ('max_iter', 10),
+    'sgd_hinge': ('max_iter', 5),
+    'svm': ('model__max_iter', 6),
+}
+
+
+def get_resource(name):
+    """
+    Return (resource, min_resource, max_resource) for an algorithm.
+    The max resource is None, i.e. it is resolved at fit time (from the
+    search space, the estimator or the data).
+    """
+    resource, r_min = RESOURCES.get(name, (SAMPLES, None))
+    return resource, r_min, None
+
+
+def _space_max(param_distributions, key):
+    """ Upper bound of parameter 'key' in a search space (a dict or a list
+    of dicts). None if the parameter is absent or unbounded.
+    """
+    spaces = param_distributions if isinstance(param_distributions, list) else [param_distributions]
+    bounds = []
+    for space in spaces:
+        if not key in space:
+            continue
+        values = space[key]
+        if hasattr(values, 'support'):
+            upper = values.support()[1]
+        elif hasattr(values, 'rvs'):
+            return None
+        else:
+            upper = max(values)
+        if not np.isfinite(upper):
+            return None
+        bounds.append(upper)
+    return int(max(bounds)) if bounds else None
+
+
+def _rank_score(score):
+    """ Score used for ranking: NaN (a failed evaluation) ranks last. """
+    return -np.inf if np.isnan(score) else score
+
+
+def _ilog(x, eta):
+    """ Largest integer k such that eta**k <= x. """
+    k = 0
+    while eta**(k+1) <= x:
+        k += 1
+    return k
+
+
+def _take(X, idx):
+    """ Select rows from a numpy array, sparse matrix or pandas object. """
+    if hasattr(X, 'iloc'):
+        return X.iloc[idx]
+    return X[idx]
+
+
+
+class SuccessiveHalvingSearch(object):
+    """
+    Successive halving over randomly sampled configurations.
+
+    Parameters:
+    ------------
+        estimator : sklearn estimator
+            Estimator to tune (it is cloned, never fitted in place).
+
+        param_distributions : dict or list of dicts
+            Parameter distributions as in RandomizedSearchCV. If the resource
+            is a parameter it is removed from the search space.
+
+        n_candidates : integer, default: 27
+            Number of configurations to sample for the first rung.
+
+        resource : str, default: 'n_samples'
+            Estimator parameter to use as budget, or 'n_samples' to budget
+            by the number of training samples.
+
+        min_resource : None or integer, default: None
+            Budget of the first rung. If budgeting by samples, defaults
+            to twice the number of classes times the number of CV folds,
+            else to max_resource / eta**2.
+
+        max_resource : None or integer, default: None
+            Budget of the last rung. If budgeting by samples, defaults
+            to all samples, else to the upper bound of the resource in
+            'param_distributions', or the estimator's own value. The best
+            configuration is refit with this budget.
+
+        eta : integer, default: 3
+            Keep the best 1/eta configurations at every rung, and multiply
+            the budget by eta.
+
+        scoring : str or callable, default: 'accuracy'
+            Scorer passed to cross_val_score.
+
+        cv : integer, callable or FoldCache, default: 5
+            Number of cross validation folds, or callable of correct type.
+            A FoldCache (gazer.folds) is reused when the budget is a parameter.
+
+        n_jobs : integer, default: 1
+            Used by cross_val_score to evaluate folds in parallel.
+
+        random_state : None or integer, default: None
+            Seeds both the parameter sampler and the sample subsets.
+
+        refit : boolean, default: True
+            Fit the best configuration on all data ('best_estimator_').
+
+        verbose : integer, default: 0
+            If verbose > 0 print progress of every rung.
+
+    """
+    def __init__(self, estimator, param_distributions, n_candidates=27,
+                 resource=SAMPLES, min_resource=None, max_resource=None, eta=3,
+                 scoring='accuracy', cv=5, n_jobs=1, random_state=None,
+                 refit=True, verbose=0):
+
+        if eta < 2:
+            raise ValueError("'eta' should be an integer >= 2.")
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.n_candidates = n_candidates
+        self.resource = resource
+        self.min_resource = min_resource
+        self.max_resource = max_resource
+        self.eta = int(eta)
+        self.scoring = scoring
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.refit = refit
+        self.verbose = verbose
+
+
+    def _resource_limits(self, X, y):
+        """ Resolve (min_resource, max_resource). """
+        if self.resource != SAMPLES:
+            r_max = self.max_resource
+            if r_max is None:
+                r_max = _space_max(self.param_distributions, self.resource)
+            if r_max is None:
+                r_max = self.estimator.get_params().get(self.resource)
+            if not isinstance(r_max, (int, float, np.number)):
+                raise ValueError("Specify 'max_resource' for '{}'.".format(self.resource))
+            r_min = self.min_resource
+            if r_min is None:
+                r_min = max(1, r_max // self.eta**2)
+            return int(min(r_min, r_max)), int(r_max)
+
+        n_samples = X.shape[0]
+        r_max = n_samples if self.max_resource is None else min(n_samples, self.max_resource)
+        if self.min_resource is None:
+            n_splits = self.cv if isinstance(self.cv, int) else self.cv.get_n_splits()
+            r_min = 2 * n_splits * len(np.unique(y))
+        else:
+            r_min = self.min_resource
+        return int(min(r_min, r_max)), int(r_max)
+
+
+    def _sample(self, n, rng):
+        """ Sample 'n' configurations (never the resource itself). The
+        search space is a dict, or a list of dicts as in RandomizedSearchCV.
+        """
+        spaces = self.param_distributions
+        if isinstance(spaces, dict):
+            spaces = [spaces]
+        elif not isinstance(spaces, list) or not all(isinstance(d, dict) for d in spaces):
+            raise ValueError("param_distributions should be a dict or a list of dicts.")
+        space = [{k: v for k, v in d.items() if k != self.resource} for d in spaces]
+        space = [d for d in space if d]
+        if not space:
+            return [{}]
+        with warnings.catch_warnings():
+            # Small grids yield fewer than 'n' configurations
+            warnings.simplefilter('ignore', UserWarning)
+            return list(model_selection.ParameterSampler(space, n_iter=n, random_state=rng))
+
+
+    def _evaluate(self, params, r, X, y, order):
+        """ Mean cross validation score of a configuration on budget 'r'. """
+        estimator = base.clone(self.estimator).set_params(**params)
+        folds = self.cv if hasattr(self.cv, 'cross_val_score') else None
+        cv = self.cv
+        if self.resource == SAMPLES:
+            idx = np.sort(order[:r])
+            X, y = _take(X, idx), _take(y, idx)
+            # Cached folds do not apply to a subset of the data
+            cv = self.cv.n_splits if folds is not None else self.cv
+            folds = None
+        else:
+            estimator.set_params(**{self.resource: r})
+        try:
+            if folds is not None:
+                scores = folds.cross_val_score(estimator, scoring=self.scoring, n_jobs=self.n_jobs)
+            else:
+                scores = model_selection.cross_val_score(
+                    estimator, X, y, scoring=self.scoring, cv=cv, n_jobs=self.n_jobs)
+        except Exception as e:
+            if self.verbose > 0:
+                print("Failed fit ({}): {}".format(params, e))
+            return -np.inf
+        return np.mean(scores)
+
+
+    def _run_bracket(self, X, y, candidates, n_rungs, r_max, order, bracket=0):
+        """ Run successive halving on 'candidates' for 'n_rungs' rungs,
+        where the last rung uses budget 'r_max'.
+
+        Returns list of (score, params) pairs evaluated on the last rung.
+        """
+        for rung in range(n_rungs):
+            r = int(round(r_max / float(self.eta**(n_rungs-1-rung))))
+            if self.verbose > 0:
+                print("Bracket {}, rung {}: {} candidates, {}={}"
+                      .format(bracket, rung, len(candidates), self.resource, r))
+
+            scores = [self._evaluate(params, r, X, y, order) for params in candidates]
+            for params, score in zip(candidates, scores):
+                self.cv_results_['params'].append(params)
+                self.cv_results_['bracket'].append(bracket)
+                self.cv_results_['rung'].append(rung)
+                self.cv_results_['resource'].append(r)
+                self.cv_results_['mean_test_score'].append(score)
+
+            ranked = sorted(zip(scores, range(len(candidates))), key=lambda t: -_rank_score(t[0]))
+            if rung < n_rungs-1:
+                n_keep = max(1, len(candidates) // self.eta)
+                candidates = [candidates[i] for _, i in ranked[:n_keep]]
+        return [(score, candidates[i]) for score, i in ranked]
+
+
+    def _brackets(self, r_min, r_max):
+        """ Yield (n_candidates, n_rungs) for every bracket. """
+        n_rungs = 1 + min(_ilog(self.n_candidates, self.eta), _ilog(r_max / float(r_min), self.eta))
+        yield self.n_candidates, n_rungs
+
+
+    def fit(self, X, y):
+        """ Run the search.
+
+        Parameters:
+        ------------
+            X : array-like, shape (n_samples, n_features)
+
+            y : array-like, shape (n_samples,)
+
+        """
+        rng = np.random.RandomState(self.random_state)
+        r_min, r_max = self._resource_limits(X, y)
+
+        # A fixed permutation makes the sample subsets of later rungs
+        # supersets of the earlier ones
+        order = rng.permutation(X.shape[0])
+
+        self.cv_results_ = {key: [] for key in
+                            ('params', 'bracket', 'rung', 'resource', 'mean_test_score')}
+        finalists = []
+        for bracket, (n, n_rungs) in enumerate(self._brackets(r_min, r_max)):
+            candidates = self._sample(n, rng)
+            finalists.extend(self._run_bracket(X, y, candidates, n_rungs, r_max, order, bracket))
+
+        self.best_score_, self.best_params_ = max(finalists, key=lambda t: _rank_score(t[0]))
+        if not np.isfinite(self.best_score_):
+            raise ValueError("All candidate configurations failed to fit.")
+
+        self.best_params_ = dict(self.best_params_)
+        if self.resource != SAMPLES and r_max != self.estimator.get_params().get(self.resource):
+            # The finalists were scored on 'r_max'
+            self.best_params_[self.resource] = r_max
+        if self.refit:
+            self.best_estimator_ = (base.clone(self.estimator)
+                                    .set_params(**self.best_params_).fit(X, y))
+        return self
+
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
+
+
+
+class HyperbandSearch(SuccessiveHalvingSearch):
+    """
+    Hyperband: run several successive halving brackets that trade off the
+    number of configurations against the budget they start with. The most
+    exploratory bracket starts 'n_candidates' configurations on 'min_resource',
+    the most conservative one evaluates a few configurations on the full budget
+    only.
+
+    Parameters are those of SuccessiveHalvingSearch.
+
+    """
+    def _brackets(self, r_min, r_max):
+        s_max = min(_ilog(self.n_candidates, self.eta), _ilog(r_max / float(r_min), self.eta))
+        for s in range(s_max, -1, -1):
+            n = int(math.ceil((s_max+1) / float(s+1) * self.eta**s))
+            yield n, s+1
+
+
+
+def make_search(name, estimator, param_distributions, search='halving', **kwargs):
+    """
+    Build a multi-fidelity search for algorithm 'name', using the
+    resource registered in 'RESOURCES'.
+
+    Parameters:
+    ------------
+        name : str
+            Name of the algorithm (i.e. the key in GazerMetaLearner.clf).
+
+        estimator : sklearn estimator
+
+        param_distributions : dict or list of dicts
+
+        search : str, default: 'halving'
+            'halving' (SuccessiveHalvingSearch) or 'hyperband' (HyperbandSearch).
+
+        kwargs :
+            Passed to the search class.
+
+    """
+    searches = {'halving': SuccessiveHalvingSearch, 'hyperband': HyperbandSearch}
+    if not search in searches:
+        raise ValueError("search should be in: {}".format(", ".join(searches)))
+    resource, r_min, r_max = get_resource(name)
+    kwargs.setdefault('resource', resource)
+    kwargs.setdefault('min_resource', r_min)
+    kwargs.setdefault('max_resource', r_max)
+    return searches[search](estimator, param_distributions, **kwargs)
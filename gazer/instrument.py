@@ -0,0 +1,349 @@
+"""
+Instrumentation: a pluggable event bus with per-stage timers and counters.
+
+The learner, the ensembler, param_search and RandomEnsembler report what they
+do to the module level 'bus'. Every timed stage is aggregated in memory (count,
+total and max seconds) and forwarded as an event to the subscribed sinks:
+
+    {'event': 'stage', 'stage': 'fit', 'seconds': 1.23, 'time': 1537272000.0,
+     'source': 'ensembler', 'algorithm': 'random_forest', ...}
+
+Stages reported by the library:
+
+    - 'construct': import and instantiation of a meta estimator,
+    - 'fit', 'predict': fitting and predicting with a model,
+    - 'serialize', 'load': pickling a fitted model and loading it back,
+    - 'score': computing a metric,
+    - 'trial': a single param_search configuration (fit and evaluation),
+    - 'hillclimb': a single iteration of the ensemble hillclimb.
+
+A sink is any callable that accepts an event dictionary; 'JsonLinesSink'
+appends events to a file. Chosen stages can also be profiled: cProfile and
+tracemalloc are run around every occurrence of the stage, and the hottest
+functions and allocation sites are added to the event.
+
+Example:
+---------
+    >>> from gazer.instrument import bus, JsonLinesSink
+    >>> bus.subscribe(JsonLinesSink('events.jsonl'))
+    >>> bus.profile('fit', path='profiles')
+    >>> learner.fit(X, y)
+    >>> bus.summary()
+
+"""
+from __future__ import print_function
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+import warnings
+from collections import defaultdict
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+STAGES = ('construct', 'fit', 'serialize', 'load', 'predict', 'score', 'trial', 'hillclimb')
+
+
+
+@contextlib.contextmanager
+def _nothing():
+    yield
+
+
+def _to_json(value):
+    """ Fallback encoder for numpy scalars and other objects. """
+    if hasattr(value, 'item'):
+        return value.item()
+    return repr(value)
+
+
+
+class JsonLinesSink(object):
+    """
+    Append events to a JSON-lines file (one event per line).
+
+    Parameters:
+    ------------
+        path : str
+            File to append to. It is created if it does not exist.
+
+        flush : boolean, default: True
+            Flush after every event, so that the file can be followed
+            while a long run is in progress.
+
+    """
+    def __init__(self, path, flush=True):
+        self.path = path
+        self.flush = flush
+        self._lock = threading.Lock()
+        self._file = open(path, 'a')
+
+    def __call__(self, event):
+        line = json.dumps(event, default=_to_json)
+        with self._lock:
+            self._file.write(line + "\n")
+            if self.flush:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+
+class PrintSink(object):
+    """ Print events, e.g. to follow a batch job in its log. """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def __call__(self, event):
+        fields = ", ".join("{}={}".format(key, value) for key, value in sorted(event.items())
+                           if not key in ('event', 'time'))
+        print("[{}] {}".format(event['event'], fields), file=self.stream or sys.stdout)
+
+
+
+class _Profiler(object):
+    """ Run cProfile and tracemalloc around a block of code. """
+
+    # Only one cProfile profiler can be active at a time: blocks running
+    # concurrently in other threads are timed, but not profiled
+    _active = threading.Lock()
+
+    def __init__(self, cpu=True, memory=True, path=None, top=10):
+        self.cpu = cpu
+        self.memory = memory and tracemalloc is not None
+        self.path = path
+        self.top = top
+        self.n_calls = 0
+
+    @contextlib.contextmanager
+    def capture(self, stage, event):
+        profiler = None
+        if self.cpu and self._active.acquire(False):
+            profiler = cProfile.Profile()
+        trace = self.memory and not tracemalloc.is_tracing()
+        if trace:
+            tracemalloc.start()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._active.release()
+                self._report_cpu(profiler, stage, event)
+            if trace:
+                snapshot = tracemalloc.take_snapshot()
+                event['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                event['allocations'] = [
+                    "{}: {} bytes".format(stat.traceback, stat.size)
+                    for stat in snapshot.statistics('lineno')[:self.top]]
+
+    def _report_cpu(self, profiler, stage, event):
+        self.n_calls += 1
+        if self.path is not None:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            filename = os.path.join(self.path, "{}_{:04d}.prof".format(stage, self.n_calls))
+            profiler.dump_stats(filename)
+            event['profile'] = filename
+        stats = pstats.Stats(profiler).stats
+        hottest = sorted(stats.items(), key=lambda item: -item[1][3])[:self.top]
+        event['hotspots'] = ["{}:{}({}) {:.4f}s".format(source, line, func, cumulative)
+                             for (source, line, func), (_, _, _, cumulative, _) in hottest]
+
+
+
+class EventBus(object):
+    """
+    Collect stage timings and counters, and forward events to sinks.
+    Safe to use from several threads.
+
+    Events of worker processes are not collected: stages that run in a
+    pool of processes are reported by the parent once the workers return.
+
+    """
+    def __init__(self):
+        self.sinks = []
+        self.show_progress = True
+        self._profilers = {}
+        self._lock = threading.Lock()
+        self.reset()
+
+
+    def subscribe(self, sink):
+        """ Forward every event to 'sink', a callable taking a dictionary. """
+        with self._lock:
+            self.sinks.append(sink)
+        return sink
+
+    def unsubscribe(self, sink):
+        with self._lock:
+            if sink in self.sinks:
+                self.sinks.remove(sink)
+        return
+
+
+    def profile(self, stage, path=None, cpu=True, memory=True, top=10):
+        """
+        Profile every occurrence of a stage.
+
+        Parameters:
+        ------------
+            stage : str
+                Name of the stage (see 'STAGES').
+
+            path : None or str, default: None
+                Folder to dump the cProfile statistics of every occurrence
+                to ('<stage>_<n>.prof', readable with pstats or snakeviz).
+
+            cpu : boolean, default: True
+                Run cProfile; the 'top' functions by cumulative time are
+                added to the event ('hotspots').
+
+            memory : boolean, default: True
+                Run tracemalloc; the peak and the 'top' allocation sites are
+                added to the event ('peak_bytes', 'allocations').
+                - Note: cost records (gazer.cost) made within a traced stage
+                  have no peak memory, since tracemalloc is already tracing.
+
+            top : integer, default: 10
+                Number of functions and allocation sites to report.
+
+        """
+        if not stage in STAGES:
+            warnings.warn("'{}' is not a library stage.".format(stage))
+        self._profilers[stage] = _Profiler(cpu=cpu, memory=memory, path=path, top=top)
+        return
+
+    def unprofile(self, stage=None):
+        """ Stop profiling a stage (all stages if None). """
+        if stage is None:
+            self._profilers = {}
+        else:
+            self._profilers.pop(stage, None)
+        return
+
+
+    def emit(self, event, **fields):
+        """ Send an event to all sinks. A failing sink is reported with a
+        warning and does not interrupt the caller.
+        """
+        fields['event'] = event
+        fields.setdefault('time', time.time())
+        for sink in list(self.sinks):
+            try:
+                sink(fields)
+            except Exception:
+                warnings.warn("Event sink failed: {}".format(sys.exc_info()[1]))
+        return fields
+
+
+    def count(self, name, n=1, **fields):
+        """ Increment counter 'name' by 'n'. """
+        with self._lock:
+            self.counters[name] += n
+        if self.sinks:
+            self.emit('count', name=name, n=n, **fields)
+        return
+
+
+    def record(self, stage, seconds, **fields):
+        """ Report a stage that was timed elsewhere (e.g. in a worker process). """
+        with self._lock:
+            stats = self.stages[stage]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+        if self.sinks:
+            self.emit('stage', stage=stage, seconds=seconds, **fields)
+        return
+
+
+    @contextlib.contextmanager
+    def timer(self, stage, **fields):
+        """
+        Time a block of code as an occurrence of 'stage'.
+
+        The context yields the event dictionary: fields added to it inside
+        the block (e.g. a score) are reported with the event. If the block
+        raises, the error is added to the event and the exception propagates.
+
+        >>> with bus.timer('fit', algorithm='logreg') as event:
+        ...     model.fit(X, y)
+        ...     event['n_iter'] = model.n_iter_
+
+        """
+        event = dict(fields)
+        profiler = self._profilers.get(stage)
+        capture = profiler.capture(stage, event) if profiler is not None else _nothing()
+        start = time.time()
+        try:
+            with capture:
+                yield event
+        except Exception:
+            event['error'] = repr(sys.exc_info()[1])
+            raise
+        finally:
+            self.record(stage, time.time() - start, **event)
+
+
+    def summary(self):
+        """
+        Aggregated timings and counters.
+
+        Returns:
+        ---------
+            Dictionary {'stages': {stage: {'count', 'seconds', 'mean', 'max'}},
+                        'counters': {name: value}}.
+
+        """
+        with self._lock:
+            stages = {stage: {'count': n, 'seconds': total, 'mean': total / n, 'max': longest}
+                      for stage, (n, total, longest) in self.stages.items() if n}
+            return {'stages': stages, 'counters': dict(self.counters)}
+
+
+    def reset(self):
+        """ Clear timings and counters (sinks and profiled stages are kept). """
+        with self._lock:
+            self.stages = defaultdict(lambda: [0, 0., 0.])
+            self.counters = defaultdict(int)
+        return
+
+
+
+# Shared by all components of the library
+bus = EventBus()
+
+
+
+def progress(iterable, desc=None, total=None, **kwargs):
+    """
+    Progress bar around 'iterable'. Uses tqdm.auto, which renders a widget
+    in notebooks and a text bar in terminals and batch jobs. Progress bars
+    are disabled with 'bus.show_progress = False' (or if tqdm is missing).
+    """
+    if not bus.show_progress:
+        return iterable
+    try:
+        from tqdm.auto import tqdm
+    except ImportError:
+        try:
+            from tqdm import tqdm
+        except ImportError:
+            return iterable
+    return tqdm(iterable, desc=desc, total=total, **kwargs)
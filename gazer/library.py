@@ -1,6 +1,4 @@
 import numpy as np
-from scipy.stats import (uniform, 
-                         randint)
 
 
 
@@ -166,6 +164,8 @@ def keras_lib():
     if we shall be able to include it in the ensemble library
     
     """
+    from scipy.stats import uniform, randint
+    
     # Define the number of networks you want to keep for ensembling
     n_networks = 5
     
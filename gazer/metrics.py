@@ -1,18 +1,16 @@
-from sklearn.metrics import (
-    f1_score, 
-    precision_score, 
-    recall_score, 
-    roc_auc_score, 
-    accuracy_score, 
-    log_loss )
+import numpy as np
+from .utils.lazy import LazyModule
+
+# Imported on first use
+sklearn_metrics = LazyModule('sklearn.metrics')
 
 metrics = {
-    'f1': f1_score, 
-    'precision': precision_score,
-    'recall': recall_score, 
-    'auc': roc_auc_score,
-    'accuracy': accuracy_score, 
-    'log_loss': log_loss }
+    'f1': 'f1_score', 
+    'precision': 'precision_score',
+    'recall': 'recall_score', 
+    'auc': 'roc_auc_score',
+    'accuracy': 'accuracy_score', 
+    'log_loss': 'log_loss' }
 
 def get_scorer(scorer):
     """
@@ -29,4 +27,121 @@ def get_scorer(scorer):
     available = ('f1', 'precision', 'recall', 'auc', 'accuracy', 'log_loss')
     if not scorer in available:
         raise ValueError("Invalid scorer type. Valid: %s" % ",".join(available))       
-    return metrics[scorer]
\ No newline at end of file
+    return getattr(sklearn_metrics, metrics[scorer])
+
+class StreamingScorer(object):
+    """
+    Accumulate a label based metric over chunks of predictions, such that
+    memory stays bounded by the chunk size. Only a confusion count per
+    (true, predicted) label pair is kept between chunks.
+    
+    - Binary metrics follow scikit-learn: the positive class is 'pos_label',
+      which must be one of the observed labels.
+    - 'auc' on hard labels equals the mean of the true positive 
+      and true negative rates (binary problems only).
+    
+    Parameters:
+    ------------
+        metric : str
+            One of ('f1', 'precision', 'recall', 'auc', 'accuracy').
+            
+        pos_label : str or int, default: 1
+            Positive class of the binary metrics ('f1', 'precision', 'recall').
+    
+    """
+    def __init__(self, metric, pos_label=1):
+        available = ('f1', 'precision', 'recall', 'auc', 'accuracy')
+        if not metric in available:
+            raise ValueError("Invalid streaming metric. Valid: %s" % ",".join(available))
+        self.metric = metric
+        self.pos_label = pos_label
+        self.counts = {}
+    
+    def update(self, y_true, y_pred):
+        true_labels, true_idx = np.unique(np.asarray(y_true), return_inverse=True)
+        pred_labels, pred_idx = np.unique(np.asarray(y_pred), return_inverse=True)
+        pairs = np.bincount(true_idx.ravel()*len(pred_labels) + pred_idx.ravel(), 
+                            minlength=len(true_labels)*len(pred_labels))
+        for code in np.flatnonzero(pairs):
+            key = (true_labels[code // len(pred_labels)], 
+                   pred_labels[code % len(pred_labels)])
+            self.counts[key] = self.counts.get(key, 0) + int(pairs[code])
+        return self
+    
+    def result(self):
+        total = float(sum(self.counts.values()))
+        if total == 0:
+            return np.nan
+        if self.metric == 'accuracy':
+            return sum(c for (t, p), c in self.counts.items() if t == p) / total
+        
+        labels = set(t for t, _ in self.counts) | set(p for _, p in self.counts)
+        if len(labels) > 2:
+            raise ValueError("Streaming '{}' requires a binary problem.".format(self.metric))
+        
+        pos = self.pos_label
+        if not pos in labels:
+            if self.metric != 'auc':
+                raise ValueError("pos_label={!r} is not a valid label. It should be one of {}"
+                                 .format(pos, sorted(labels)))
+            # Balanced rates do not depend on which class is positive
+            pos = sorted(labels)[-1]
+        tp = float(self.counts.get((pos, pos), 0))
+        fp = float(sum(c for (t, p), c in self.counts.items() if p == pos and t != pos))
+        fn = float(sum(c for (t, p), c in self.counts.items() if t == pos and p != pos))
+        tn = total - tp - fp - fn
+        
+        precision = tp / (tp + fp) if (tp + fp) > 0 else 0.
+        recall = tp / (tp + fn) if (tp + fn) > 0 else 0.
+        if self.metric == 'precision':
+            return precision
+        if self.metric == 'recall':
+            return recall
+        if self.metric == 'f1':
+            return (2*precision*recall / (precision + recall) 
+                    if (precision + recall) > 0 else 0.)
+        if self.metric == 'auc':
+            if (tp + fn) == 0 or (tn + fp) == 0:
+                raise ValueError("Only one class present in y_true: 'auc' is undefined.")
+            return 0.5 * (recall + tn / (tn + fp))
+
+        
+class StreamingLogLoss(object):
+    """
+    Accumulate log loss over chunks of predicted probabilities.
+    
+    Parameters:
+    ------------
+        classes : array-like
+            Class labels in the column order of the predicted probabilities
+            (i.e. the estimator's 'classes_' attribute).
+            
+        eps : float, default: 1e-15
+            Probabilities are clipped to [eps, 1-eps] (as in scikit-learn).
+    
+    """
+    def __init__(self, classes, eps=1e-15):
+        self.classes = np.asarray(classes)
+        self.eps = eps
+        self.total = 0.
+        self.n_samples = 0
+    
+    def update(self, y_true, probas):
+        probas = np.asarray(probas, dtype=np.float64)
+        if probas.ndim != 2 or probas.shape[1] != len(self.classes):
+            raise ValueError("Probabilities do not match 'classes'.")
+        y_true = np.asarray(y_true)
+        order = np.argsort(self.classes)
+        pos = np.searchsorted(self.classes[order], y_true)
+        pos = np.clip(pos, 0, len(self.classes)-1)
+        idx = order[pos]
+        if not np.all(self.classes[idx] == y_true):
+            raise ValueError("y_true contains labels not present in 'classes'.")
+        probas = np.clip(probas, self.eps, 1-self.eps)
+        probas /= probas.sum(axis=1)[:, np.newaxis]
+        self.total -= np.log(probas[np.arange(len(idx)), idx]).sum()
+        self.n_samples += len(idx)
+        return self
+    
+    def result(self):
+        return self.total / self.n_samples if self.n_samples else np.nan
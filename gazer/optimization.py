@@ -14,14 +14,16 @@ import shutil
 import itertools
 
 import numpy as np
-import pandas as pd
-
-from tqdm import tqdm_notebook as tqdm
-from sklearn.model_selection import ParameterSampler
 
 from .utils.meta import Mute
+from .instrument import bus, progress
+from .utils.lazy import LazyModule
 from .utils.estimators import save_model
 
+# Heavy dependencies are imported on first use
+pd = LazyModule('pandas')
+model_selection = LazyModule('sklearn.model_selection')
+
 
 
 def iter_safe(value):
@@ -144,9 +146,9 @@ def param_search(learner, param_grid, data, type_of_search,
     except:
         pass    
     
-    with Mute(learner):        
+    with Mute(learner), learner.costs.tagged('param_search'):        
         if type_of_search == 'random':
-            generator = ParameterSampler(param_grid, n_iter=n_iter)
+            generator = model_selection.ParameterSampler(param_grid, n_iter=n_iter)
             number_of_fits = n_iter
         elif type_of_search == 'grid':
             generator = get_dicts(param_grid)
@@ -161,15 +163,17 @@ def param_search(learner, param_grid, data, type_of_search,
 
 
 def _search(learner, name, generator, data, number_of_fits, modelfiles, top_n):
-    
     scores = []
     params_scores = [] 
     
     n_models = len(modelfiles)-1
     
-    for params in tqdm(generator, desc=name, total=number_of_fits):        
+    for params in progress(generator, desc=name, total=number_of_fits):        
         
-        params.update(train_eval(name, learner, data, params))
+        with bus.timer('trial', algorithm=name, source='param_search') as event:
+            event['params'] = dict(params)
+            params.update(train_eval(name, learner, data, params))
+            event['train_score'], event['val_score'] = params['train_score'], params['val_score']
         params_scores.append(params)         
         this_score = params['val_score'] 
         if np.isnan(this_score):
@@ -184,7 +188,9 @@ def _search(learner, name, generator, data, number_of_fits, modelfiles, top_n):
                     if os.path.exists(src):                                                
                         os.replace(src, dest)                
                 scores.insert(rank, this_score)
-                save_model(learner.clf[name].estimator, 
-                           modelfiles[rank]) 
+                with bus.timer('serialize', algorithm=name, path=modelfiles[rank], 
+                               source='param_search'):
+                    save_model(learner.clf[name].estimator, 
+                               modelfiles[rank]) 
     
     return get_result(params_scores, top_n)
\ No newline at end of file
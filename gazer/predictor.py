@@ -0,0 +1,271 @@
+"""
+Serving ensembles selected by hillclimbing.
+
+An 'EnsemblePredictor' is built from the output of GazerMetaEnsembler.hillclimb,
+i.e. a list of (model path, weight) tuples. Duplicate members are merged into
+a single weight and every member is loaded once (from a model file or an
+archive, see gazer.archive). Data is then predicted a batch of rows at a
+time: each member predicts the batch (optionally in a pool of threads) and
+the predictions are combined by a weighted vote.
+
+    - voting='hard': weighted majority vote of the predicted labels,
+    - voting='soft': weighted average of the predicted probabilities.
+
+Example:
+---------
+    >>> score, ensemble = ensembler.hillclimb(X_val, y_val, voting='soft')
+    >>> predictor = EnsemblePredictor(ensemble, voting='soft', n_jobs=4)
+    >>> predictor.predict(X_test)
+    >>> predictor.stats()
+
+"""
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .archive import load_model
+from .instrument import bus
+from .utils.chunks import iter_chunks
+
+
+# Keras networks are saved as weight files (see GazerMetaEnsembler)
+KERAS_SUFFIXES = ('.hdf5', '.h5', '.h5py')
+
+
+
+def _merge(ensemble):
+    """ Sum the weights of duplicate members, in order of first appearance.
+    Members without a positive weight are dropped.
+    """
+    weights = OrderedDict()
+    for path, weight in ensemble:
+        weights[path] = weights.get(path, 0.) + float(weight)
+    return [(path, weight) for path, weight in weights.items() if weight > 0]
+
+
+def _load_member(path):
+    """ Load a scikit-learn model, or a keras network. """
+    if path.endswith(KERAS_SUFFIXES):
+        from keras.models import load_model as load_network
+        return load_network(path)
+    return load_model(path)
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else None
+
+
+
+class EnsemblePredictor(object):
+    """
+    Weighted voting ensemble for inference.
+
+    Parameters:
+    ------------
+        ensemble : list of (path, weight) tuples
+            Members of the ensemble, as returned by 'hillclimb' (the full
+            (score, members) output of 'hillclimb' is accepted as well).
+
+        voting : str, default: 'hard'
+            'hard' (weighted majority vote) or 'soft' (weighted average of
+            probabilities, requires members that implement `predict_proba`).
+            Use the voting the ensemble was hillclimbed with.
+
+        classes : None or array-like, default: None
+            Class labels. Defaults to the union of the members' `classes_`.
+            The outputs of a keras network are taken to be these classes.
+
+        n_jobs : integer, default: 1
+            Number of threads predicting with members concurrently. Most
+            scikit-learn estimators release the GIL while predicting.
+
+        batch_size : integer, default: 10000
+            Number of rows predicted at a time. Memory is bounded by the
+            predictions of all members for a single batch.
+
+    Notes:
+    -------
+        Ties of the hard vote go to the first class (as with np.argmax),
+        as in 'hillclimb'.
+
+    """
+    def __init__(self, ensemble, voting='hard', classes=None, n_jobs=1, batch_size=10000):
+        if not voting in ('hard', 'soft'):
+            raise ValueError("voting should be 'hard' or 'soft'.")
+        if isinstance(ensemble, tuple) and len(ensemble) == 2 and np.isscalar(ensemble[0]):
+            ensemble = ensemble[1]
+        ensemble = _merge(ensemble)
+        if not ensemble:
+            raise ValueError("The ensemble has no members with a positive weight.")
+        self.voting = voting
+        self.n_jobs = max(1, n_jobs)
+        self.batch_size = batch_size
+        self.paths = [path for path, _ in ensemble]
+        self.weights = np.array([weight for _, weight in ensemble])
+
+        self._executor = ThreadPoolExecutor(self.n_jobs) if self.n_jobs > 1 else None
+        self.members = self._map(self._load, self.paths)
+        if classes is None:
+            known = [m.classes_ for m in self.members if hasattr(m, 'classes_')]
+            if not known:
+                raise ValueError("Pass 'classes': no member exposes `classes_`.")
+            classes = np.unique(np.concatenate(known))
+        self.classes_ = np.asarray(classes)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+
+    def __len__(self):
+        return len(self.members)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def close(self):
+        """ Shut down the thread pool. """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        return
+
+
+    def _map(self, fn, items):
+        if self._executor is None:
+            return [fn(item) for item in items]
+        return list(self._executor.map(fn, items))
+
+
+    def _load(self, path):
+        with bus.timer('load', path=path, source='predictor'):
+            return _load_member(path)
+
+
+    def _codes(self, labels):
+        codes = np.searchsorted(self.classes_, labels)
+        codes = np.minimum(codes, len(self.classes_) - 1)
+        if not np.array_equal(self.classes_[codes], labels):
+            raise ValueError("A member predicts labels that are not in 'classes'.")
+        return codes
+
+
+    def _member_votes(self, args):
+        """ Votes of a member on a batch: class codes (hard voting), or
+        probabilities aligned with 'classes_' (soft voting).
+        """
+        member, X = args
+        start = time.time()
+        model_classes = getattr(member, 'classes_', None)
+        if self.voting == 'hard':
+            if model_classes is None:
+                # Keras network: the outputs are the classes
+                votes = member.predict(X).argmax(axis=1)
+            else:
+                votes = self._codes(member.predict(X))
+        else:
+            proba = member.predict_proba(X) if model_classes is not None else member.predict(X)
+            if model_classes is None:
+                votes = proba
+            else:
+                votes = np.zeros((proba.shape[0], len(self.classes_)))
+                votes[:, self._codes(model_classes)] = proba
+        return votes, time.time() - start
+
+
+    def _tally(self, X):
+        """ Weighted votes of the ensemble on a batch, shape (n_rows, n_classes),
+        normalized by the total weight.
+        """
+        start = time.time()
+        results = self._map(self._member_votes, [(member, X) for member in self.members])
+        n_rows = results[0][0].shape[0]
+        tally = np.zeros((n_rows, len(self.classes_)))
+        rows = np.arange(n_rows)
+        for (votes, _), weight in zip(results, self.weights):
+            if self.voting == 'hard':
+                tally[rows, votes] += weight
+            else:
+                tally += weight * votes
+        tally /= self.weights.sum()
+        self._update(n_rows, time.time() - start, [seconds for _, seconds in results])
+        return tally
+
+
+    def _iter_tally(self, X):
+        for X_batch, _ in iter_chunks(X, chunk_size=self.batch_size):
+            with bus.timer('predict', source='predictor', n_rows=X_batch.shape[0]):
+                tally = self._tally(X_batch)
+            yield tally
+
+
+    def predict_proba(self, X):
+        """
+        Class probabilities: the weighted average of the members' probabilities
+        (soft voting), or the weighted share of votes (hard voting).
+
+        Parameters:
+        ------------
+            X : array-like, or iterable of chunks
+                Data of shape (n_samples, n_features), predicted 'batch_size'
+                rows at a time, or an iterable yielding batches.
+
+        Returns:
+        ---------
+            Numpy array of shape (n_samples, n_classes), columns ordered as
+            'classes_'.
+
+        """
+        return np.concatenate(list(self._iter_tally(X)))
+
+
+    def predict(self, X):
+        """ Class labels predicted by the weighted vote (see 'predict_proba'). """
+        return np.concatenate([self.classes_[tally.argmax(axis=1)]
+                               for tally in self._iter_tally(X)])
+
+
+    def _update(self, n_rows, seconds, member_seconds):
+        with self._lock:
+            self._batches += 1
+            self._rows += n_rows
+            self._seconds += seconds
+            self._latencies.append(seconds)
+            self._member_seconds += member_seconds
+
+
+    def stats(self):
+        """
+        Throughput and latency counters.
+
+        Returns:
+        ---------
+            Dictionary with the number of 'batches' and 'rows' predicted,
+            the total 'seconds', the 'throughput' (rows per second), the
+            mean, median, 95th percentile and max batch 'latency_*' (over
+            the last 1000 batches), and the total seconds spent in each
+            member ('member_seconds', in the order of 'paths').
+
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+            return {'batches': self._batches, 'rows': self._rows, 'seconds': self._seconds,
+                    'throughput': self._rows / self._seconds if self._seconds > 0 else None,
+                    'latency_mean': float(np.mean(latencies)) if latencies else None,
+                    'latency_p50': _percentile(latencies, 50),
+                    'latency_p95': _percentile(latencies, 95),
+                    'latency_max': max(latencies) if latencies else None,
+                    'member_seconds': self._member_seconds.tolist()}
+
+
+    def reset_stats(self):
+        with self._lock:
+            self._batches, self._rows, self._seconds = 0, 0, 0.
+            self._latencies = deque(maxlen=1000)
+            self._member_seconds = np.zeros(len(self.members))
+        return
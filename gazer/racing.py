@@ -0,0 +1,235 @@
+"""
+Racing: evaluate candidate configurations fold by fold and stop early.
+
+A 'Racer' cross validates candidates one fold (or one block of n_jobs folds)
+at a time. After 'min_folds' folds a candidate is dropped if either
+
+    - median rule: its running mean score is below the median of the running
+      means of earlier candidates after the same number of folds, or
+    - paired test: a one-sided paired t-test on the folds evaluated so far
+      finds it significantly worse than the incumbent (the best candidate
+      evaluated on all folds) at level 'alpha'.
+
+Dropped candidates keep the mean of the folds they did run; they are never
+selected as best. Since all candidates are evaluated on the same folds (see
+gazer.folds.FoldCache) fold scores are directly comparable.
+
+Reference:
+-----------
+    Birattari et al., "A Racing Algorithm for Configuring Metaheuristics",
+    GECCO (2002).
+
+"""
+from __future__ import print_function
+
+import warnings
+
+import numpy as np
+
+from .utils.lazy import LazyModule
+
+# Heavy dependencies are imported on first use
+base = LazyModule('sklearn.base')
+stats = LazyModule('scipy.stats')
+model_selection = LazyModule('sklearn.model_selection')
+
+
+
+class Racer(object):
+    """
+    Fold by fold evaluation with early pruning.
+
+    Parameters:
+    ------------
+        folds : FoldCache
+            Cross validation folds shared by all candidates.
+
+        scoring : str or callable, default: 'accuracy'
+            Scorer.
+
+        greater_is_better : boolean, default: True
+            If False, a lower score is better.
+
+        min_folds : integer, default: 2
+            Number of folds every candidate runs before it may be dropped.
+
+        alpha : float, default: 0.05
+            Significance level of the paired test against the incumbent.
+            Set alpha=0 to disable the test.
+
+        n_startup : integer, default: 3
+            Number of earlier candidates required before the median rule
+            is applied.
+
+        n_jobs : integer, default: 1
+            Number of folds evaluated in parallel (i.e. the block size).
+
+    """
+    def __init__(self, folds, scoring='accuracy', greater_is_better=True, min_folds=2,
+                 alpha=0.05, n_startup=3, n_jobs=1):
+        self.folds = folds
+        self.scoring = scoring
+        self.sign = 1. if greater_is_better else -1.
+        self.min_folds = max(1, min_folds)
+        self.alpha = alpha
+        self.n_startup = n_startup
+        self.n_jobs = max(1, n_jobs)
+        self.history = []
+        self.incumbent = None
+        self.n_pruned = 0
+
+
+    # Comparisons below are on sign * score, i.e. greater is better
+    def _worse_than_median(self, scores):
+        k = len(scores)
+        means = [np.mean(h[:k]) for h in self.history if len(h) >= k]
+        if len(means) < self.n_startup:
+            return False
+        return np.mean(scores) < np.median(means)
+
+
+    def _worse_than_incumbent(self, scores):
+        if self.incumbent is None or self.alpha <= 0:
+            return False
+        k = len(scores)
+        diff = np.asarray(scores) - self.incumbent[:k]
+        if k < 2 or np.allclose(diff, diff[0]):
+            # The test is undefined for constant differences
+            return False
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            t, p = stats.ttest_rel(scores, self.incumbent[:k])
+        return t < 0 and p / 2. < self.alpha
+
+
+    def evaluate(self, estimator):
+        """
+        Race a single candidate.
+
+        Returns:
+        ---------
+            Tuple (mean score, fold scores, pruned) where 'pruned' is True
+            if the candidate was dropped before the last fold.
+
+        """
+        n_splits = self.folds.n_splits
+        scores = []
+        pruned = False
+        while len(scores) < n_splits:
+            # Run at least 'min_folds' folds, then one block at a time
+            stop = max(self.min_folds, len(scores) + self.n_jobs)
+            block = range(len(scores), min(n_splits, stop))
+            scores.extend(self.folds.cross_val_score(
+                estimator, scoring=self.scoring, n_jobs=self.n_jobs, indices=block))
+            signed = self.sign * np.asarray(scores)
+            if len(scores) < n_splits and (self._worse_than_median(signed)
+                                           or self._worse_than_incumbent(signed)):
+                pruned = True
+                break
+
+        scores = np.asarray(scores)
+        self.history.append(self.sign * scores)
+        if pruned:
+            self.n_pruned += 1
+        elif self.incumbent is None or self.sign * scores.mean() > self.incumbent.mean():
+            self.incumbent = self.sign * scores
+        return scores.mean(), scores, pruned
+
+
+
+class RacingSearch(object):
+    """
+    Randomized search where candidates are raced over the folds.
+    Mimics RandomizedSearchCV: call fit(X, y) and consult 'best_params_',
+    'best_score_', 'best_estimator_' and 'cv_results_'.
+
+    Parameters:
+    ------------
+        estimator : sklearn estimator
+            Estimator to tune (it is cloned, never fitted in place).
+
+        param_distributions : dict
+            Parameter distributions as in RandomizedSearchCV.
+
+        folds : FoldCache
+            Cross validation folds.
+
+        n_iter : integer, default: 10
+            Number of candidate configurations.
+
+        scoring, min_folds, alpha, n_startup, n_jobs :
+            See Racer.
+
+        racing : boolean, default: True
+            If False no candidate is dropped: every candidate runs on all
+            folds, as in RandomizedSearchCV, but on the cached folds.
+
+        random_state : None or integer, default: None
+
+        refit : boolean, default: True
+            Fit the best configuration on all data ('best_estimator_').
+
+        verbose : integer, default: 0
+
+    """
+    def __init__(self, estimator, param_distributions, folds, n_iter=10, scoring='accuracy',
+                 min_folds=2, alpha=0.05, n_startup=3, n_jobs=1, random_state=None,
+                 refit=True, racing=True, verbose=0):
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.folds = folds
+        self.n_iter = n_iter
+        self.scoring = scoring
+        self.min_folds = min_folds
+        self.alpha = alpha
+        self.n_startup = n_startup
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.refit = refit
+        self.racing = racing
+        self.verbose = verbose
+
+
+    def fit(self, X, y):
+        # A candidate is never dropped before its 'min_folds' folds
+        min_folds = self.min_folds if self.racing else self.folds.n_splits
+        racer = Racer(self.folds, scoring=self.scoring, min_folds=min_folds,
+                      alpha=self.alpha, n_startup=self.n_startup, n_jobs=self.n_jobs)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            candidates = list(model_selection.ParameterSampler(
+                self.param_distributions, n_iter=self.n_iter, random_state=self.random_state))
+
+        self.cv_results_ = {key: [] for key in ('params', 'mean_test_score', 'n_folds', 'pruned')}
+        best = None
+        for params in candidates:
+            estimator = base.clone(self.estimator).set_params(**params)
+            try:
+                score, scores, pruned = racer.evaluate(estimator)
+            except Exception as e:
+                if self.verbose > 0:
+                    print("Failed fit ({}): {}".format(params, e))
+                continue
+            self.cv_results_['params'].append(params)
+            self.cv_results_['mean_test_score'].append(score)
+            self.cv_results_['n_folds'].append(len(scores))
+            self.cv_results_['pruned'].append(pruned)
+            if not pruned and (best is None or score > best[0]):
+                best = (score, params)
+
+        if best is None:
+            raise ValueError("All candidate configurations failed to fit.")
+        if self.verbose > 0 and self.racing:
+            print("Racing: pruned {} of {} candidates".format(racer.n_pruned, len(candidates)))
+        self.best_score_, self.best_params_ = best
+        if self.refit:
+            self.best_estimator_ = (base.clone(self.estimator)
+                                    .set_params(**self.best_params_).fit(X, y))
+        return self
+
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
@@ -8,6 +8,8 @@ from sklearn.base import clone
 from sklearn.pipeline import Pipeline
 from sklearn.exceptions import NotFittedError
 
+from ..instrument import bus
+
 
 class RandomEnsembler:
     
@@ -85,7 +87,8 @@ class RandomEnsembler:
             model = clone(self.estimator)
             self.fitted_params.update({key: random_state})
             model.set_params(**self.fitted_params)
-            model.fit(X, y, **kwargs)
+            with bus.timer('fit', source='bagging', random_state=random_state):
+                model.fit(X, y, **kwargs)
             self.models.append(model)
             del model    
         
@@ -116,7 +119,8 @@ class RandomEnsembler:
         
         preds = np.zeros((X.shape[0], self.n_ensembles), dtype=int)
         for i, model in enumerate(self.models):
-            preds[:, i] = model.predict(X)            
+            with bus.timer('predict', source='bagging', model=i):
+                preds[:, i] = model.predict(X)            
 
         # This is a trick that allows for 
         # vectorization of computations
@@ -164,7 +168,8 @@ class RandomEnsembler:
         
         preds = np.ndarray((X.shape[0], len(self.classes), self.n_ensembles), dtype=float)
         for i, model in enumerate(self.models):
-            preds[:, :, i] = model.predict_proba(X)            
+            with bus.timer('predict', source='bagging', method='predict_proba', model=i):
+                preds[:, :, i] = model.predict_proba(X)            
         
         probas = np.average(preds, axis=-1, weights=None)        
         
@@ -0,0 +1,124 @@
+""" Memoization of model outputs keyed by model version and input data.
+"""
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+
+def fingerprint(X, n_rows=64, full=False):
+    """
+    Compute a cheap fingerprint of a data matrix.
+
+    By default only the shape, the dtype and 'n_rows' evenly spaced rows are
+    hashed, so the cost does not grow with the number of samples. Two matrices
+    that agree on all sampled rows share a fingerprint; pass full=True to hash
+    the complete buffer instead.
+
+    Parameters:
+    ------------
+        X : array-like, sparse matrix or pandas object
+            Data to fingerprint.
+
+        n_rows : integer, default: 64
+            Number of rows to sample.
+
+        full : boolean, default: False
+            Hash every row.
+
+    Returns:
+    ---------
+        Hex digest (str).
+
+    """
+    if hasattr(X, 'iloc'):
+        X = X.values
+    digest = hashlib.sha1()
+
+    if hasattr(X, 'tocsr'):
+        X = X.tocsr()
+        digest.update(repr(('sparse', X.shape, X.nnz, X.dtype.str)).encode())
+        arrays = (X.data, X.indices, X.indptr)
+        for array in arrays:
+            step = 1 if full else max(1, len(array) // n_rows)
+            digest.update(np.ascontiguousarray(array[::step]).tobytes())
+        return digest.hexdigest()
+
+    X = np.asarray(X)
+    digest.update(repr((X.shape, X.dtype.str)).encode())
+    if X.ndim == 0 or X.shape[0] == 0:
+        return digest.hexdigest()
+    if full:
+        sample = X
+    else:
+        rows = np.unique(np.linspace(0, X.shape[0]-1, min(X.shape[0], n_rows)).astype(int))
+        sample = X[rows]
+    if sample.dtype.hasobject:
+        digest.update(repr(sample.tolist()).encode())
+    else:
+        digest.update(np.ascontiguousarray(sample).tobytes())
+    return digest.hexdigest()
+
+
+
+class PredictionCache(object):
+    """
+    Size bounded LRU cache for predictions.
+
+    Parameters:
+    ------------
+        max_bytes : integer, default: 256 * 2**20
+            Upper bound on the total size of cached arrays. The least recently
+            used entries are evicted first. Arrays larger than 'max_bytes'
+            are never cached.
+
+    Notes:
+    -------
+        Cached arrays are marked read-only: treat returned arrays as such.
+
+    """
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        value = np.asarray(value)
+        if value.nbytes > self.max_bytes:
+            return value
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key).nbytes
+        value.flags.writeable = False
+        self._entries[key] = value
+        self.nbytes += value.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        return value
+
+    def memoize(self, key, compute):
+        """ Return cached value for 'key', or compute, store and return it. """
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+        return
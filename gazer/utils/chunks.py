@@ -0,0 +1,48 @@
+""" Helpers for processing data in row chunks.
+"""
+
+
+def _slice_rows(X, start, stop):
+    """ Slice rows from a numpy array, sparse matrix or pandas object. """
+    if hasattr(X, 'iloc'):
+        return X.iloc[start:stop]
+    return X[start:stop]
+
+
+def iter_chunks(X, y=None, chunk_size=10000):
+    """
+    Iterate over data in chunks of rows.
+
+    Parameters:
+    ------------
+        X : array-like, or iterable of chunks
+            - If X has a 'shape' it is sliced into chunks of 'chunk_size' rows.
+            - Otherwise X is treated as an iterable that yields either data
+              chunks, or (X_chunk, y_chunk) tuples.
+
+        y : None or array-like, default: None
+            Labels. Sliced alongside X if X is an array.
+
+        chunk_size : integer, default: 10000
+            Number of rows per chunk when slicing an array.
+
+    Yields:
+    --------
+        (X_chunk, y_chunk) tuples. 'y_chunk' is None when no labels are known.
+
+    """
+    if hasattr(X, 'shape'):
+        if chunk_size is None or chunk_size < 1:
+            raise ValueError("'chunk_size' should be a positive integer.")
+        n_samples = X.shape[0]
+        for start in range(0, n_samples, chunk_size):
+            stop = min(start + chunk_size, n_samples)
+            yield (_slice_rows(X, start, stop),
+                   None if y is None else _slice_rows(y, start, stop))
+        return
+
+    for chunk in X:
+        if isinstance(chunk, tuple):
+            yield chunk
+        else:
+            yield (chunk, None)
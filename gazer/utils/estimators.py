@@ -1,6 +1,8 @@
 import os
 import sys
-from sklearn.externals import joblib
+from .lazy import LazyModule
+
+joblib = LazyModule('sklearn.externals.joblib')
 
 __estimator_types__ = ('keras', 'sklearn')
 
@@ -0,0 +1,24 @@
+""" Deferred imports: heavy dependencies are imported on first use,
+which keeps 'import gazer' fast.
+"""
+from importlib import import_module
+
+
+class LazyModule(object):
+    """ Module proxy that imports 'name' on first attribute access.
+
+    >>> joblib = LazyModule('sklearn.externals.joblib')
+    >>> joblib.dump(estimator, file)  # sklearn is imported here
+    """
+    def __init__(self, name):
+        self.__name = name
+        self.__module = None
+
+    def __getattr__(self, attr):
+        if self.__module is None:
+            self.__module = import_module(self.__name)
+        return getattr(self.__module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.__module is not None else 'not loaded'
+        return "<lazy module '{}' ({})>".format(self.__name, state)
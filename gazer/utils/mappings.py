@@ -1,8 +1,4 @@
-from scipy.stats import uniform
 import numpy as np
-from skopt.space import (Real, 
-                         Categorical, 
-                         Integer) 
 
 
 def skopt_space_mapping(all_params, threshold=100):
@@ -52,6 +48,11 @@ def skopt_space_mapping(all_params, threshold=100):
     >>> result = skopt_space_mapping(input)
       
     """         
+    from scipy.stats import uniform
+    from skopt.space import (Real, 
+                             Categorical, 
+                             Integer) 
+    
     spaces = []    
     for name, params in all_params:
         
@@ -0,0 +1,71 @@
+""" Helpers for splitting a core budget between concurrently running tasks.
+"""
+import multiprocessing
+
+
+def effective_n_jobs(n_jobs):
+    """ Translate a joblib style 'n_jobs' value into a number of cores.
+
+    Negative values count backwards from the number of available cores,
+    i.e. n_jobs=-1 means all cores, n_jobs=-2 all but one, and so on.
+    """
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, multiprocessing.cpu_count() + 1 + n_jobs)
+    return int(n_jobs)
+
+
+def balance_n_jobs(n_jobs, n_workers):
+    """ Cap the inner 'n_jobs' of tasks that run in 'n_workers' concurrent
+    workers, so that together they do not use more than all cores.
+    """
+    share = max(1, multiprocessing.cpu_count() // max(1, n_workers))
+    return min(effective_n_jobs(n_jobs), share)
+
+
+def supports_n_jobs(estimator):
+    """ True if the estimator can parallelize internally. """
+    return hasattr(estimator, 'n_jobs')
+
+
+def allocate_jobs(can_parallelize, n_jobs):
+    """
+    Split a core budget between a set of tasks that run concurrently.
+
+    Every task is given one core. If there are more cores than tasks, the
+    spare cores are handed out (round robin) to the tasks that are able to
+    use them internally, i.e. estimators exposing an 'n_jobs' parameter.
+
+    Parameters:
+    ------------
+        can_parallelize : list of booleans
+            One flag per task, True if the task can use more than one core.
+
+        n_jobs : integer
+            Total core budget (joblib convention, -1 means all cores).
+
+    Returns:
+    ---------
+        Tuple (n_workers, inner_jobs) where 'n_workers' is the size of the
+        outer worker pool and 'inner_jobs' is a list with the number of cores
+        to assign to each task.
+
+    """
+    n_cores = effective_n_jobs(n_jobs)
+    n_tasks = len(can_parallelize)
+    if n_tasks == 0:
+        return 1, []
+
+    n_workers = min(n_tasks, n_cores)
+    inner_jobs = [1] * n_tasks
+
+    spare = n_cores - n_workers
+    candidates = [i for i, flag in enumerate(can_parallelize) if flag]
+    while spare > 0 and candidates:
+        for i in candidates:
+            if spare == 0:
+                break
+            inner_jobs[i] += 1
+            spare -= 1
+    return n_workers, inner_jobs
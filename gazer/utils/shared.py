@@ -0,0 +1,262 @@
+"""
+Module implements a data handle that publishes training data once, so that
+parallel workers can attach to it instead of receiving their own copy.
+
+Two ways of publishing data are available:
+
+    - memmap: arrays are written once to .npy files in a (temporary) folder and
+      workers attach through read-only memory maps. Memory maps are passed by
+      reference by joblib, so this also covers scikit-learn's own parallel
+      code paths (RandomizedSearchCV, cross_val_score).
+
+    - shm: arrays are copied once into shared memory blocks that workers
+      attach to by name (requires python >= 3.8).
+
+Sparse matrices are published as their CSR (or CSC) component arrays.
+With backend='memory' (threads only) data is kept as is, DataFrames
+included.
+
+Example:
+---------
+    >>> from gazer.utils.shared import DataHandle
+    >>> with DataHandle(X, y, backend='memmap') as data:
+    ...     learner.fit(data, None, n_jobs=8, backend='multiprocessing')
+    ...     learner.rand_optimize(data, None, n_jobs=8)
+
+"""
+import os
+import shutil
+import tempfile
+import contextlib
+import warnings
+import numpy as np
+
+from .lazy import LazyModule
+
+# Heavy dependencies are imported on first use
+sparse = LazyModule('scipy.sparse')
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+
+__backends__ = ('memory', 'memmap', 'shm')
+
+
+def _open_block(name):
+    """ Attach to an existing shared memory block. Where possible we opt out
+    of resource tracking, since only the publishing process should unlink.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class DataHandle(object):
+    """
+    Handle to a published (X, y) pair. The handle is cheap to pickle:
+    only file paths or shared memory block names are sent to workers.
+
+    Parameters:
+    ------------
+        X : array-like or sparse matrix, shape (n_samples, n_features)
+            Data matrix to publish. DataFrames are published as arrays,
+            unless backend='memory'.
+
+        y : None or array-like, shape (n_samples,)
+            Labels to publish.
+
+        backend : str, default: 'memmap'
+            One of 'memory' (keep a reference, for threads only),
+            'memmap' (on-disk memory map) or 'shm' (shared memory).
+
+        folder : None or str, default: None
+            Folder wherein memory mapped files are written. A temporary
+            folder is created when None. Only used when backend='memmap'.
+
+    """
+    def __init__(self, X, y=None, backend='memmap', folder=None):
+
+        if backend not in __backends__:
+            raise ValueError("backend should be in: {}".format(", ".join(__backends__)))
+        if backend == 'shm' and shared_memory is None:
+            warnings.warn("Shared memory requires python>=3.8: using 'memmap'.")
+            backend = 'memmap'
+        self.backend = backend
+
+        self._owner = os.getpid()
+        self._folder = None
+        self._remove_folder = False
+        if backend == 'memmap':
+            if folder is None:
+                folder = tempfile.mkdtemp(prefix='gazer_')
+                self._remove_folder = True
+            elif not os.path.isdir(folder):
+                os.makedirs(folder)
+            self._folder = folder
+
+        self._specs = {}
+        self._blocks = []
+        self._attached = {}
+        for key, array in (('X', X), ('y', y)):
+            if array is None:
+                continue
+            if backend == 'memory':
+                self._specs[key] = ('inline', array)
+            elif sparse.issparse(array):
+                self._publish_sparse(key, array)
+            else:
+                self._publish(key, np.asarray(array))
+
+
+    def _publish(self, key, array):
+        """ Publish a single array according to backend. """
+
+        # Object arrays (e.g. string labels) cannot be shared by buffer;
+        # they are small in practice and simply travel with the handle.
+        if self.backend == 'memory' or array.dtype.hasobject:
+            self._specs[key] = ('inline', array)
+
+        elif self.backend == 'memmap':
+            filename = os.path.join(self._folder, "{}.npy".format(key))
+            np.save(filename, array)
+            self._specs[key] = ('memmap', filename)
+
+        elif self.backend == 'shm':
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            shared[...] = array
+            self._blocks.append(block)
+            self._attached[key] = (shared, block)
+            self._specs[key] = ('shm', block.name, array.shape, array.dtype.str)
+
+
+    def _publish_sparse(self, key, matrix):
+        """ Publish the component arrays of a CSR (or CSC) matrix. """
+        if not matrix.format in ('csr', 'csc'):
+            matrix = matrix.tocsr()
+        for part in ('data', 'indices', 'indptr'):
+            self._publish("{}.{}".format(key, part), getattr(matrix, part))
+        self._specs[key] = ('sparse', matrix.format, matrix.shape)
+
+
+    def _attach(self, key):
+        """ Attach to a single published array (without copying). """
+        if not key in self._specs:
+            return None
+        if key in self._attached:
+            return self._attached[key][0]
+
+        spec = self._specs[key]
+        if spec[0] == 'inline':
+            return spec[1]
+
+        if spec[0] == 'sparse':
+            _, fmt, shape = spec
+            parts = tuple(self._attach("{}.{}".format(key, part)) 
+                          for part in ('data', 'indices', 'indptr'))
+            matrix_class = sparse.csr_matrix if fmt == 'csr' else sparse.csc_matrix
+            self._attached[key] = (matrix_class(parts, shape=shape, copy=False), None)
+            return self._attached[key][0]
+
+        if spec[0] == 'memmap':
+            array = np.load(spec[1], mmap_mode='r')
+            block = None
+        elif spec[0] == 'shm':
+            _, name, shape, dtype = spec
+            block = _open_block(name)
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            array.flags.writeable = False
+        self._attached[key] = (array, block)
+        return array
+
+
+    @property
+    def X(self):
+        return self._attach('X')
+
+    @property
+    def y(self):
+        return self._attach('y')
+
+    @property
+    def shape(self):
+        return self.X.shape
+
+
+    def attach(self):
+        """ Return (X, y) as read-only views onto the published data. """
+        return self.X, self.y
+
+
+    def close(self):
+        """ Release published data. Only the publishing process deletes files
+        and unlinks shared memory; workers merely detach.
+        """
+        owner = (os.getpid() == self._owner)
+        for key, (array, block) in list(self._attached.items()):
+            if block is not None and not block in self._blocks:
+                block.close()
+        self._attached = {}
+        if owner:
+            for block in self._blocks:
+                block.close()
+                block.unlink()
+            if self._remove_folder and self._folder is not None:
+                shutil.rmtree(self._folder, ignore_errors=True)
+        self._blocks = []
+        return
+
+
+    def __getstate__(self):
+        # Never send attached views or block objects to workers
+        state = self.__dict__.copy()
+        state['_attached'] = {}
+        state['_blocks'] = []
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+
+def publish(X, y=None, n_jobs=1, backend='memmap', folder=None):
+    """
+    Publish (X, y) for use by parallel workers.
+
+    - If X already is a DataHandle it is returned as is.
+    - Serial work (n_jobs=1) never copies data: backend='memory' is used.
+
+    """
+    if isinstance(X, DataHandle):
+        return X
+    if n_jobs == 1:
+        backend = 'memory'
+    return DataHandle(X, y, backend=backend, folder=folder)
+
+
+@contextlib.contextmanager
+def shared(X, y=None, n_jobs=1, backend='memmap', folder=None):
+    """
+    Context manager around 'publish'. Data published here is released on
+    exit, whereas a DataHandle passed in by the caller is left untouched.
+    """
+    data = publish(X, y, n_jobs=n_jobs, backend=backend, folder=folder)
+    try:
+        yield data
+    finally:
+        if data is not X:
+            data.close()
+
+
+def attach(data):
+    """ Return (X, y) from a DataHandle or from an (X, y) tuple. """
+    if isinstance(data, DataHandle):
+        return data.attach()
+    return data
@@ -1,7 +1,10 @@
 import sys
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+from .utils.lazy import LazyModule
+
+# Plotting libraries are imported on first use
+pd = LazyModule('pandas')
+sns = LazyModule('seaborn')
+plt = LazyModule('matplotlib.pyplot')
 
 class Visualizer():    
     
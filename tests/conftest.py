@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.naive_bayes import GaussianNB
+
+from gazer.archive import ModelArchive
+from gazer.utils.lazy import LazyModule
+
+joblib = LazyModule('sklearn.externals.joblib')
+
+
+def make_models(X, y):
+    """ A small library of diverse fitted models: (name, model) tuples. """
+    models = [('logreg', LogisticRegression(C=c, max_iter=500).fit(X, y))
+              for c in (1e-3, 1e-1, 10.)]
+    models += [('tree', DecisionTreeClassifier(max_depth=d, random_state=d).fit(X, y))
+               for d in (1, 2, 3, 5, 8)]
+    models += [('gaussian_nb', GaussianNB().fit(X, y))]
+    return models
+
+
+@pytest.fixture(scope='module')
+def data():
+    """ (X_train, y_train, X_val, y_val) of a 3-class problem. """
+    X, y = make_classification(1500, 10, n_informative=5, n_classes=3, random_state=0)
+    return X[:600], y[:600], X[600:], y[600:]
+
+
+@pytest.fixture(scope='module')
+def learner_data():
+    """ (X, y) of a small binary problem. """
+    return make_classification(300, 6, n_informative=4, random_state=0)
+
+
+@pytest.fixture
+def archive_library(tmpdir, data):
+    """ Folder holding an archive of fitted models. """
+    X, y, _, _ = data
+    path = str(tmpdir.join('library'))
+    with ModelArchive(path, mode='w') as archive:
+        for name, model in make_models(X, y):
+            archive.add(name, model, score=model.score(X, y))
+    return path
+
+
+@pytest.fixture
+def file_library(tmpdir, data):
+    """ Folder holding one model file per model, in per-algorithm folders. """
+    X, y, _, _ = data
+    path = str(tmpdir.join('library'))
+    for i, (name, model) in enumerate(make_models(X, y)):
+        folder = os.path.join(path, name)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        joblib.dump(model, os.path.join(folder, "model_{:04d}train.pkl".format(i)))
+    return path
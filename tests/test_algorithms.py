@@ -0,0 +1,63 @@
+import sys
+import warnings
+
+import pytest
+
+from gazer import GazerMetaLearner
+from gazer.algorithms import implemented, AlgorithmDescriptor, AlgorithmRegistry
+
+
+@pytest.mark.parametrize('module, cls, name', implemented())
+def test_registered_names_match_the_classes(module, cls, name):
+    descriptor = AlgorithmDescriptor(module, cls, name)
+    if descriptor.missing():
+        pytest.skip("requires {}".format(", ".join(descriptor.missing())))
+    learner = GazerMetaLearner(method='select', estimators=[name])
+    assert learner.names == [name]
+    try:
+        instance = learner.clf[name]
+    except TypeError as e:
+        pytest.skip("not supported by the installed scikit-learn: {}".format(e))
+    assert instance.name == name
+
+
+def test_algorithms_are_built_on_first_access():
+    learner = GazerMetaLearner(method='all')
+    assert not any(learner.clf.is_loaded(name) for name in learner.names)
+    assert learner.clf['tree'].name == 'tree'
+    assert learner.clf.is_loaded('tree')
+    assert not learner.clf.is_loaded('svm')
+
+
+def test_importing_classifiers_imports_nothing_else():
+    import gazer.classifiers
+    for name, module in gazer.classifiers._modules.items():
+        if module in ('neural_network', 'xgb'):
+            assert not 'gazer.classifiers.{}'.format(module) in sys.modules
+
+
+def test_unbuildable_algorithms_are_dropped():
+    learner = GazerMetaLearner(method='all')
+    descriptors = [AlgorithmDescriptor('tree', 'MetaDecisionTreeClassifier', 'tree'),
+                   AlgorithmDescriptor('missing_module', 'MetaMissingClassifier', 'missing')]
+    registry = AlgorithmRegistry(descriptors, learner._add_algorithm)
+    with warnings.catch_warnings(record=True):
+        warnings.simplefilter('always')
+        assert [name for name, _ in registry.items()] == ['tree']
+    assert list(registry) == ['tree']
+
+
+def test_registered_name_must_match():
+    learner = GazerMetaLearner(method='all')
+    descriptor = AlgorithmDescriptor('tree', 'MetaDecisionTreeClassifier', 'decision_tree')
+    with pytest.raises(ValueError):
+        learner._add_algorithm(descriptor)
+
+
+def test_update_and_set():
+    learner = GazerMetaLearner(method='select', estimators=['tree'])
+    learner.update('tree', {'max_depth': 3})
+    assert learner.clf['tree'].estimator.max_depth == 3
+    learner.clf['my_tree'] = learner.clf['tree']
+    assert learner.names == ['tree', 'my_tree']
+    assert learner.clf.descriptor('my_tree').load() is type(learner.clf['tree'])
@@ -0,0 +1,118 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+from sklearn.linear_model import LogisticRegression
+
+from gazer.archive import (ModelArchive, ModelWriter, MANIFEST, is_archive, member_ref,
+                           split_ref, load_model)
+
+
+def _fit(X, y, c):
+    return LogisticRegression(C=c, max_iter=500).fit(X, y)
+
+
+def test_round_trip(tmpdir, data):
+    X, y, X_val, _ = data
+    path = str(tmpdir.join('archive'))
+    models = [_fit(X, y, c) for c in (0.01, 1., 100.)]
+    with ModelArchive(path, mode='w') as archive:
+        refs = [archive.add('logreg', model, score=0.5) for model in models]
+
+    assert is_archive(path)
+    archive = ModelArchive(path)
+    members = archive.members()
+    assert [m['id'] for m in members] == [0, 1, 2]
+    # Members are laid out back to back in a single segment
+    assert [m['offset'] for m in members] == [0] + list(np.cumsum([m['size'] for m in members])[:-1])
+    assert all(m['score'] == 0.5 and m['params']['C'] is not None for m in members)
+    assert archive.refs() == [('logreg', ref) for ref in refs]
+    for ref, model in zip(refs, models):
+        assert split_ref(ref) == (path, refs.index(ref))
+        np.testing.assert_array_equal(load_model(ref).predict_proba(X_val),
+                                      model.predict_proba(X_val))
+
+
+def test_segment_rollover(tmpdir, data):
+    X, y, X_val, _ = data
+    path = str(tmpdir.join('archive'))
+    models = [_fit(X, y, c) for c in (0.01, 1., 100.)]
+    # Every member exceeds the segment size: one segment per member
+    with ModelArchive(path, mode='w', segment_size=1e-6) as archive:
+        for model in models:
+            archive.add('logreg', model)
+    archive = ModelArchive(path)
+    assert [m['segment'] for m in archive.members()] == [0, 1, 2]
+    assert all(m['offset'] == 0 for m in archive.members())
+    assert len(archive.manifest['segments']) == 3
+    for member, model in zip(archive.members(), models):
+        np.testing.assert_array_equal(archive.load(member['id']).predict(X_val),
+                                      model.predict(X_val))
+
+
+def test_append_mode(tmpdir, data):
+    X, y, X_val, _ = data
+    path = str(tmpdir.join('archive'))
+    with ModelArchive(path, mode='w') as archive:
+        archive.add('logreg', _fit(X, y, 1.))
+    segment = os.path.join(path, archive.manifest['segments'][0])
+    before = open(segment, 'rb').read()
+
+    with ModelArchive(path, mode='a') as archive:
+        ref = archive.add('logreg', _fit(X, y, 0.01))
+    # Existing segments are never modified: new members go to new segments
+    assert open(segment, 'rb').read() == before
+    archive = ModelArchive(path)
+    assert len(archive) == 2
+    assert [m['segment'] for m in archive.members()] == [0, 1]
+    assert ref == member_ref(path, 1)
+    assert load_model(ref).C == 0.01
+
+    # 'w' replaces the archive
+    with ModelArchive(path, mode='w') as archive:
+        archive.add('logreg', _fit(X, y, 1.))
+    assert len(ModelArchive(path)) == 1
+    assert sorted(f for f in os.listdir(path) if f.endswith('.bin')) == ['segment_0000.bin']
+
+
+def test_manifest_is_written_atomically(tmpdir, data):
+    X, y, _, _ = data
+    path = str(tmpdir.join('archive'))
+    archive = ModelArchive(path, mode='w')
+    archive.add('logreg', _fit(X, y, 1.))
+    # Nothing is visible to readers before the manifest is flushed
+    assert not is_archive(path)
+    archive.flush()
+    assert len(ModelArchive(path)) == 1
+
+    archive.add('logreg', _fit(X, y, 0.1))
+    assert len(ModelArchive(path)) == 1
+    archive.close()
+    assert len(ModelArchive(path)) == 2
+    # No temporary files are left behind, and the manifest is valid json
+    assert not [f for f in os.listdir(path) if f.endswith('.tmp')]
+    with open(os.path.join(path, MANIFEST)) as f:
+        assert len(json.load(f)['members']) == 2
+
+    with pytest.raises(ValueError):
+        ModelArchive(path).add('logreg', _fit(X, y, 1.))
+
+
+def test_writer(tmpdir, data):
+    X, y, X_val, _ = data
+    path = str(tmpdir.join('archive'))
+    models = [_fit(X, y, c) for c in (0.01, 1., 100.)]
+    with ModelArchive(path, mode='w') as archive:
+        with ModelWriter(archive, max_pending=1) as writer:
+            refs = [writer.submit('logreg', model, score=1.) for model in models]
+    assert not writer.failed
+    for ref, model in zip(refs, models):
+        np.testing.assert_array_equal(load_model(ref).predict(X_val), model.predict(X_val))
+
+    writer = ModelWriter(max_pending=1)
+    with pytest.warns(UserWarning):
+        filename = writer.submit('logreg', models[0], str(tmpdir.join('missing', 'model.pkl')))
+        writer.close()
+    assert filename in writer.failed
@@ -0,0 +1,127 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.datasets import make_classification
+from sklearn.tree import DecisionTreeClassifier
+
+skopt = pytest.importorskip('skopt')
+from skopt.space import Integer, Real
+
+from gazer.bayesopt import Study, StudyStore, run_studies, _finite_losses, FAILED_LOSS
+
+
+class Flaky(ClassifierMixin, BaseEstimator):
+    """ Predicts the majority class; fails to fit if c > 0.5. """
+    def __init__(self, c=0.):
+        self.c = c
+
+    def fit(self, X, y):
+        if self.c > 0.5:
+            raise ValueError("c > 0.5")
+        self.classes_, counts = np.unique(y, return_counts=True)
+        self.majority_ = self.classes_[counts.argmax()]
+        return self
+
+    def predict(self, X):
+        return np.repeat(self.majority_, X.shape[0])
+
+
+@pytest.fixture(scope='module')
+def Xy():
+    return make_classification(200, 5, random_state=0)
+
+
+def _tree_study(key, n_calls, **kwargs):
+    return Study(key, 'tree', DecisionTreeClassifier(random_state=0),
+                 {'max_depth': Integer(1, 8), 'min_samples_leaf': Integer(1, 20)},
+                 n_calls, random_state=0, **kwargs)
+
+
+def test_studies_run_concurrently(Xy):
+    X, y = Xy
+    studies = [_tree_study('a', 6), _tree_study('b', 4)]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        run_studies(studies, X, y, cv=3, batch_size=3)
+    assert [study.n_told for study in studies] == [6, 4]
+    assert [study.remaining for study in studies] == [0, 0]
+    params, loss = studies[0].best()
+    assert set(params) == {'max_depth', 'min_samples_leaf'}
+    # Scores are maximized: losses are negated scores
+    assert -1 <= loss < -0.5
+    assert loss == min(studies[0].optimizer.yi)
+
+
+def test_failed_points_do_not_end_a_study(Xy):
+    X, y = Xy
+    study = Study('flaky', 'flaky', Flaky(), {'c': Real(0., 1.)}, 8, random_state=2)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        run_studies([study], X, y, cv=3, batch_size=4)
+    assert not study.failed
+    assert study.n_told == 8
+    assert any('points failed' in str(w.message) for w in caught)
+    # Failed points are told the worst loss of the study: all losses are finite
+    losses = np.array(study.optimizer.yi)
+    c = np.array([x[0] for x in study.optimizer.Xi])
+    assert np.isfinite(losses).all()
+    assert (losses[c > 0.5] == losses.max()).all()
+
+
+def test_a_study_fails_when_all_points_fail(Xy):
+    X, y = Xy
+    study = Study('broken', 'flaky', Flaky(), {'c': Real(0.6, 1.)}, 8, random_state=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        run_studies([study], X, y, cv=3, batch_size=2)
+    assert study.failed and study.remaining == 0
+    assert study.best() is None
+
+
+def test_resume_from_store(tmpdir, Xy):
+    X, y = Xy
+    path = str(tmpdir.join('studies', 'tree.jsonl'))
+    first = _tree_study('a', 4, store=StudyStore(path))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        run_studies([first], X, y, cv=3, batch_size=2)
+    assert len(StudyStore(path).load()) == 4
+
+    # Stored points warm-start the optimizer and count towards n_calls
+    resumed = _tree_study('a', 6, store=StudyStore(path))
+    assert resumed.n_told == 4 and resumed.remaining == 2
+    assert resumed.optimizer.yi == first.optimizer.yi
+    for x in first.optimizer.Xi:
+        assert resumed.lookup(x) is not None
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        run_studies([resumed], X, y, cv=3, batch_size=2)
+    assert len(StudyStore(path).load()) == 6
+
+
+def test_resume_with_random_state_instance(tmpdir):
+    path = str(tmpdir.join('tree.jsonl'))
+    store = StudyStore(path)
+    store.append([3, 5], -0.8, {'max_depth': 3, 'min_samples_leaf': 5})
+    study = Study('a', 'tree', DecisionTreeClassifier(),
+                  {'max_depth': Integer(1, 8), 'min_samples_leaf': Integer(1, 20)},
+                  5, random_state=np.random.RandomState(0), store=store)
+    assert study.n_told == 1
+    assert len(study.ask(2)) == 2
+
+
+def test_nan_losses_are_told_as_the_worst_loss(tmpdir):
+    path = str(tmpdir.join('tree.jsonl'))
+    with open(path, 'w') as f:
+        f.write('{"x": [2, 2], "loss": -0.7, "params": {}}\n')
+        f.write('{"x": [3, 3], "loss": NaN, "params": {}}\n')
+        # A truncated line, e.g. after a crash
+        f.write('{"x": [4, ')
+    study = _tree_study('a', 5, store=StudyStore(path))
+    assert study.optimizer.yi == [-0.7, -0.7]
+    study.tell([[5, 5], [6, 6]], [np.nan, -0.9])
+    assert study.optimizer.yi[-2:] == [-0.7, -0.9]
+    assert _finite_losses([np.nan, np.inf]) == [FAILED_LOSS, FAILED_LOSS]
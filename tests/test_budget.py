@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+import pytest
+
+from sklearn.tree import DecisionTreeClassifier
+
+from gazer.budget import TimeBudget, TrialResults
+
+
+def test_time_is_shifted_to_promising_tasks():
+    budget = TimeBudget(['good', 'bad'], 3600, min_trials=2)
+    for score in (0.8, 0.9):
+        budget.report('good', 1., score)
+        budget.report('bad', 1., score - 0.3)
+    weights = budget.weights()
+    assert weights['good'] > weights['bad']
+    assert sum(weights.values()) == pytest.approx(1.)
+    # Both spent the same time: the task with the larger share goes first
+    assert budget.select(n=2) == ['good', 'bad']
+
+
+def test_slow_tasks_are_penalized():
+    budget = TimeBudget(['fast', 'slow', 'typical'], 3600, min_trials=10)
+    budget.report('fast', 1., 0.5)
+    budget.report('typical', 2., 0.5)
+    budget.report('slow', 10., 0.5)
+    weights = budget.weights()
+    assert weights['fast'] == weights['typical'] > weights['slow']
+
+
+def test_lower_is_better():
+    budget = TimeBudget(['a', 'b'], 3600, greater_is_better=False, min_trials=1)
+    budget.report('a', 1., 0.1)
+    budget.report('b', 1., 0.5)
+    assert budget.weights()['a'] > budget.weights()['b']
+    assert budget.summary() == [('a', 1, 1., 0.1), ('b', 1, 1., 0.5)]
+
+
+def test_patience_halves_the_promise():
+    budget = TimeBudget(['a'], 3600, min_trials=1, patience=2)
+    for score in (0.9, 0.5, 0.5):
+        budget.report('a', 1., score)
+    assert budget._promise('a') == 0.5
+    budget.report('a', 1., 0.95)
+    assert budget._promise('a') == 1.
+
+
+def test_stops_when_the_budget_is_spent():
+    budget = TimeBudget(['a', 'b'], 100)
+    budget.report('a', 30., 0.5, refit_time=20.)
+    budget.report('b', 60., None)
+    # Failed trials take time but have no score
+    assert budget.best('b') is None
+    budget.start = time.time() - 40
+    # 'b' would not finish before the refit reserve is needed
+    assert budget.select(n=2) == ['a']
+    budget.exhaust('a')
+    assert budget.select(n=2) == []
+    assert not budget.expired
+    budget.start = time.time() - 90
+    assert budget.expired
+    with pytest.raises(ValueError):
+        TimeBudget(['a'], 0)
+
+
+def test_trial_results(learner_data):
+    X, y = learner_data
+    trials = TrialResults(DecisionTreeClassifier(random_state=0))
+    trials.add({'max_depth': 1}, 0.7)
+    trials.add({'max_depth': 8}, 0.95, eligible=False)
+    trials.add({'max_depth': 3}, 0.8)
+    assert len(trials) == 3
+    trials.refit(X, y)
+    # Ineligible trials are never selected
+    assert trials.best_params_ == {'max_depth': 3}
+    assert trials.best_score_ == 0.8
+    assert trials.best_estimator_.get_depth() <= 3
+    np.testing.assert_array_equal(trials.predict(X), trials.best_estimator_.predict(X))
+    with pytest.raises(ValueError):
+        TrialResults(DecisionTreeClassifier()).refit(X, y)
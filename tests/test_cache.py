@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from gazer.utils.cache import PredictionCache, fingerprint
+
+
+def test_lru_eviction():
+    cache = PredictionCache(max_bytes=3 * 80)
+    for key in 'abc':
+        cache.put(key, np.zeros(10))
+    assert cache.get('a') is not None
+    cache.put('d', np.zeros(10))
+    # 'b' was the least recently used entry
+    assert 'b' not in cache and 'a' in cache and 'd' in cache
+    assert cache.nbytes == 3 * 80
+    # Too large to be cached at all
+    cache.put('e', np.zeros(100))
+    assert 'e' not in cache and len(cache) == 3
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def test_memoize():
+    cache = PredictionCache()
+    calls = []
+    compute = lambda: calls.append(1) or np.arange(5)
+    first = cache.memoize('key', compute)
+    second = cache.memoize('key', compute)
+    assert len(calls) == 1 and second is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    with pytest.raises(ValueError):
+        first[0] = 1
+
+
+def test_fingerprint():
+    X = np.random.RandomState(0).rand(1000, 4)
+    assert fingerprint(X) == fingerprint(X.copy())
+    assert fingerprint(X) != fingerprint(X[:999])
+    Y = X.copy()
+    Y[3] += 1
+    # Row 3 is not sampled: only the full hash tells the two apart
+    assert fingerprint(X) == fingerprint(Y)
+    assert fingerprint(X, full=True) != fingerprint(Y, full=True)
+
+
+def test_learner_predictions_are_cached(learner_data):
+    from gazer import GazerMetaLearner
+    X, y = learner_data
+    learner = GazerMetaLearner(method='select', estimators=['logreg', 'tree'])
+    learner.fit(X, y)
+    first = dict(learner.predict_proba(X))
+    hits = learner._cache.hits
+    second = dict(learner.predict_proba(X))
+    assert learner._cache.hits == hits + 2
+    assert all(second[name] is first[name] for name in first)
+    # Changed rows and updated algorithms are predicted again
+    Y = X.copy()
+    Y[3] *= -5
+    assert not np.array_equal(dict(learner.predict_proba(Y))['logreg'][3], first['logreg'][3])
+    learner.fit(X, y)
+    assert dict(learner.predict_proba(X))['tree'] is not first['tree']
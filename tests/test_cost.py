@@ -0,0 +1,88 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from gazer import GazerMetaLearner
+from gazer.cost import CostRecorder, CostModel, measure, get_params
+
+
+def power_law_records(n_estimators=(10, 20, 50, 100), nrows=(1000, 5000, 20000)):
+    """ Fit times that grow linearly in n_estimators and in nrow. """
+    recorder = CostRecorder()
+    for k in n_estimators:
+        for nrow in nrows:
+            recorder.record('forest', 'fit', 1e-6 * k * nrow, (nrow, 10),
+                            params={'n_estimators': k, 'criterion': 'gini'},
+                            peak_bytes=100 * nrow)
+    return recorder
+
+
+def test_recorder_file_round_trip(tmpdir):
+    path = str(tmpdir.join('costs.jsonl'))
+    recorder = CostRecorder(path)
+    with recorder.tagged('ensembler'):
+        recorder.record('logreg', 'fit', 1.5, (100, 4), params={'C': np.float64(2.),
+                                                               'classes': [0, 1]})
+    recorder.record('logreg', 'predict', 0.1, (100,))
+    with open(path, 'a') as f:
+        f.write('{"truncated')
+
+    loaded = CostRecorder(path)
+    assert len(loaded) == 2
+    fit = loaded.records(stage='fit')[0]
+    # Only scalar parameters are kept
+    assert fit['params'] == {'C': 2.}
+    assert fit['source'] == 'ensembler'
+    assert loaded.records(stage='predict')[0]['ncol'] == 1
+    assert loaded.records(stage='predict')[0]['source'] == 'learner'
+
+    copy = pickle.loads(pickle.dumps(loaded))
+    copy.record('logreg', 'fit', 1., (10, 2))
+    assert len(copy) == 3
+    with pytest.raises(ValueError):
+        copy.record('logreg', 'score', 1., (10, 2))
+
+
+def test_cost_model_extrapolates_power_laws():
+    model = CostModel(alpha=1e-6).fit(power_law_records())
+    seconds, peak = model.predict('forest', {'n_estimators': 400, 'criterion': 'gini'},
+                                  nrow=10**5, ncol=10)
+    # Exact time: 1e-6 * 400 * 1e5 = 40s. log1p(n_estimators) is close to log
+    assert 20 < seconds < 80
+    assert peak == pytest.approx(100 * 10**5, rel=0.1)
+    assert model.affordable('forest', {'n_estimators': 10}, 1000, 10, seconds=1.)
+    assert not model.affordable('forest', {'n_estimators': 400}, 10**5, 10, seconds=1.)
+
+
+def test_cost_model_without_enough_records():
+    recorder = power_law_records(n_estimators=(10,), nrows=(1000,))
+    recorder.record('forest', 'predict', 0.1, (1000, 10))
+    model = CostModel(min_records=2).fit(recorder)
+    assert model.predict('forest', {}, 1000, 10) == (None, None)
+    assert model.affordable('forest', {}, 10**9, 10, seconds=0.)
+    # Peak memory was not measured
+    model = CostModel(min_records=1).fit(recorder)
+    seconds, peak = model.predict('forest', {}, 1000, 10, stage='predict')
+    assert seconds == pytest.approx(0.1)
+    assert peak is None
+
+
+def test_measure():
+    result, seconds, peak = measure(np.ones, 10**6, track_memory=True)
+    assert result.shape == (10**6,)
+    assert seconds >= 0
+    assert peak >= 8 * 10**6
+    assert measure(sum, [1, 2])[2] is None
+
+
+def test_learner_records_fits(learner_data):
+    X, y = learner_data
+    learner = GazerMetaLearner(method='select', estimators=['logreg', 'gaussian_nb'])
+    learner.fit(X, y)
+    names = set(r['algorithm'] for r in learner.costs.records(stage='fit'))
+    assert names == {'logreg', 'gaussian_nb'}
+    record = learner.costs.records('logreg')[0]
+    assert (record['nrow'], record['ncol']) == X.shape
+    assert record['params'] == get_params(learner.clf['logreg'])
+    assert isinstance(learner.cost_model(min_records=1), CostModel)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from gazer.folds import FoldCache
+from gazer.bayesopt import evaluate_point
+from gazer.racing import RacingSearch
+
+
+class CountingScaler(StandardScaler):
+    """ StandardScaler that counts its fits (on the class, clones share it). """
+    n_fits = 0
+
+    def fit(self, X, y=None, **kwargs):
+        CountingScaler.n_fits += 1
+        return super(CountingScaler, self).fit(X, y, **kwargs)
+
+
+def test_folds_match_the_splitter(learner_data):
+    X, y = learner_data
+    folds = FoldCache(X, y, cv=5)
+    expected = list(StratifiedKFold(5).split(X, y))
+    assert folds.n_splits == folds.get_n_splits() == 5
+    for (train, val), (train_, val_) in zip(folds.indices(), expected):
+        np.testing.assert_array_equal(train, train_)
+        np.testing.assert_array_equal(val, val_)
+    X_train, y_train, X_val, y_val = folds.fold(1)
+    np.testing.assert_array_equal(X_val, X[expected[1][1]])
+    np.testing.assert_array_equal(y_train, y[expected[1][0]])
+
+
+def test_cross_val_score_matches_sklearn(learner_data):
+    X, y = learner_data
+    folds = FoldCache(X, y, cv=5)
+    for estimator in (DecisionTreeClassifier(max_depth=3, random_state=0),
+                      make_pipeline(StandardScaler(), DecisionTreeClassifier(random_state=0))):
+        np.testing.assert_allclose(folds.cross_val_score(estimator),
+                                   cross_val_score(estimator, X, y, cv=folds))
+    np.testing.assert_allclose(folds.cross_val_score(estimator, indices=[0, 2]),
+                               cross_val_score(estimator, X, y, cv=folds)[[0, 2]])
+
+
+def test_transformed_features_are_reused(learner_data):
+    X, y = learner_data
+    folds = FoldCache(X, y, cv=4)
+    CountingScaler.n_fits = 0
+    for depth in (1, 2, 3):
+        folds.cross_val_score(make_pipeline(CountingScaler(),
+                                            DecisionTreeClassifier(max_depth=depth)))
+    # The scaler is fitted once per fold, not once per fold and candidate
+    assert CountingScaler.n_fits == 4
+
+
+def test_searches_use_the_cached_folds(learner_data):
+    X, y = learner_data
+    folds = FoldCache(X, y, cv=4)
+    pipeline = make_pipeline(CountingScaler(), DecisionTreeClassifier(random_state=0))
+    CountingScaler.n_fits = 0
+    score, error, _ = evaluate_point(pipeline, {'decisiontreeclassifier__max_depth': 2},
+                                     (X, y), 'accuracy', folds)
+    assert error is None
+    assert score == pytest.approx(np.mean(cross_val_score(
+        pipeline.set_params(decisiontreeclassifier__max_depth=2), X, y, cv=folds)))
+
+    CountingScaler.n_fits = 0
+    search = RacingSearch(pipeline, {'decisiontreeclassifier__max_depth': [1, 2, 3, 4, 5]},
+                          folds, n_iter=5, random_state=0, racing=False, refit=False)
+    search.fit(X, y)
+    # No candidate is dropped without racing, and the cached scaler is reused
+    assert search.cv_results_['n_folds'] == [4] * 5
+    assert not any(search.cv_results_['pruned'])
+    assert CountingScaler.n_fits == 0
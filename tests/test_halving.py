@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from scipy.stats import randint
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from gazer.halving import (SuccessiveHalvingSearch, HyperbandSearch, make_search,
+                           get_resource, _ilog)
+
+
+@pytest.fixture(scope='module')
+def Xy():
+    return make_classification(400, 6, n_informative=4, random_state=0)
+
+
+def test_halving_by_samples(Xy):
+    X, y = Xy
+    search = SuccessiveHalvingSearch(DecisionTreeClassifier(random_state=0),
+                                     {'max_depth': [1, 2, 3, 4, 6, 8, None],
+                                      'min_samples_leaf': [1, 5, 20]},
+                                     n_candidates=9, eta=3, cv=3, random_state=0).fit(X, y)
+    rungs = np.array(search.cv_results_['rung'])
+    resources = np.array(search.cv_results_['resource'])
+    # 9 -> 3 -> 1 candidates, the budget grows by eta and ends on all samples
+    assert [np.sum(rungs == rung) for rung in range(3)] == [9, 3, 1]
+    assert sorted(set(resources)) == [int(round(400 / 9.)), int(round(400 / 3.)), 400]
+    assert search.best_score_ == search.cv_results_['mean_test_score'][-1]
+    assert search.best_estimator_.get_params()['max_depth'] == search.best_params_['max_depth']
+    # Only the best of a rung are promoted
+    first = [(score, params) for score, params, rung in zip(search.cv_results_['mean_test_score'],
+                                                           search.cv_results_['params'], rungs)
+             if rung == 0]
+    promoted = [params for params, rung in zip(search.cv_results_['params'], rungs) if rung == 1]
+    best = sorted(first, key=lambda t: -t[0])[:3]
+    assert sorted(map(str, promoted)) == sorted(str(params) for _, params in best)
+
+
+def test_hyperband_brackets(Xy):
+    X, y = Xy
+    search = HyperbandSearch(DecisionTreeClassifier(random_state=0),
+                             {'max_depth': randint(1, 10)},
+                             n_candidates=9, eta=3, cv=3, random_state=0,
+                             refit=False).fit(X, y)
+    assert sorted(set(search.cv_results_['bracket'])) == [0, 1, 2]
+    assert not hasattr(search, 'best_estimator_')
+    assert _ilog(9, 3) == 2 and _ilog(8.9, 3) == 1
+
+
+def test_max_resource_of_a_parameter(Xy):
+    X, y = Xy
+    assert get_resource('random_forest') == ('n_estimators', 8, None)
+    assert get_resource('knn')[0] == 'n_samples'
+    # From the search space
+    search = make_search('random_forest', RandomForestClassifier(n_estimators=5, random_state=0),
+                         {'max_depth': [2, 4], 'n_estimators': [8, 40]},
+                         n_candidates=3, eta=2, cv=3, random_state=0).fit(X, y)
+    assert max(search.cv_results_['resource']) == 40
+    assert search.best_params_['n_estimators'] == 40
+    # From the estimator: its own value is kept
+    search = make_search('random_forest', RandomForestClassifier(n_estimators=30, random_state=0),
+                         {'max_depth': [2, 4]}, n_candidates=2, eta=2, cv=3,
+                         random_state=0).fit(X, y)
+    assert max(search.cv_results_['resource']) == 30
+    assert not 'n_estimators' in search.best_params_
+    # Given
+    search = make_search('logreg', LogisticRegression(), [{'C': [0.1, 1.]}],
+                         n_candidates=2, eta=2, cv=3, max_resource=60).fit(X, y)
+    assert max(search.cv_results_['resource']) == 60
+    assert search.best_params_['max_iter'] == 60
+
+
+def test_list_of_spaces(Xy):
+    X, y = Xy
+    spaces = [{'max_depth': [1, 2], 'n_estimators': [8, 16]},
+              {'min_samples_leaf': [5, 10]}]
+    search = make_search('random_forest', RandomForestClassifier(random_state=0), spaces,
+                         n_candidates=4, eta=2, cv=3, random_state=0).fit(X, y)
+    assert all(not 'n_estimators' in params for params in search.cv_results_['params'])
+    with pytest.raises(ValueError):
+        make_search('tree', DecisionTreeClassifier(), ({'max_depth': [1]},)).fit(X, y)
+
+
+def test_nan_scores_rank_last(Xy):
+    X, y = Xy
+
+    class Search(SuccessiveHalvingSearch):
+        def _evaluate(self, params, r, X, y, order):
+            return np.nan if params['C'] == 10. else params['C']
+
+    search = Search(LogisticRegression(), {'C': [10., 1., 0.5]}, n_candidates=3,
+                    random_state=0).fit(X, y)
+    assert search.best_params_ == {'C': 1.}
+    with pytest.raises(ValueError):
+        Search(LogisticRegression(), {'C': [10.]}, n_candidates=1).fit(X, y)
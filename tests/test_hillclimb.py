@@ -0,0 +1,139 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.tree import DecisionTreeClassifier
+
+from gazer.archive import load_model
+from gazer.ensembler import GazerMetaEnsembler, PREDICTIONS_SUFFIX, _agreement, _prune
+from gazer.instrument import bus
+from gazer.utils.lazy import LazyModule
+
+joblib = LazyModule('sklearn.externals.joblib')
+
+
+def vote(ensemble, X, classes):
+    """ Weighted majority vote of an ensemble, ties to the first class. """
+    tally = np.zeros((X.shape[0], len(classes)))
+    for path, weight in ensemble:
+        codes = np.searchsorted(classes, load_model(path).predict(X))
+        tally[np.arange(X.shape[0]), codes] += weight
+    return classes[tally.argmax(axis=1)]
+
+
+def test_score_is_that_of_the_weighted_vote(archive_library, data):
+    _, _, X_val, y_val = data
+    ensembler = GazerMetaEnsembler.from_state(archive_library)
+    score, ensemble = ensembler.hillclimb(X_val, y_val, n_best=2, iterations=3,
+                                          random_state=0)
+    assert ensemble and all(weight > 0 for _, weight in ensemble)
+    assert set(path for path, _ in ensemble) <= set(path for _, path in ensembler.models)
+    assert score == pytest.approx(accuracy_score(y_val, vote(ensemble, X_val, np.unique(y_val))))
+    # Never worse than the best single model
+    best = max(accuracy_score(y_val, load_model(path).predict(X_val))
+               for _, path in ensembler.models)
+    assert score >= best
+
+
+@pytest.mark.parametrize('voting', ['hard', 'soft'])
+def test_same_result_with_any_n_jobs(archive_library, data, voting):
+    _, _, X_val, y_val = data
+    ensembler = GazerMetaEnsembler.from_state(archive_library)
+    results = [ensembler.hillclimb(X_val, y_val, n_best=2, iterations=4, random_state=0,
+                                   voting=voting, n_jobs=n_jobs, cache=False)
+               for n_jobs in (1, 2)]
+    assert results[0] == results[1]
+
+
+def test_soft_score_is_that_of_the_averaged_probabilities(archive_library, data):
+    _, _, X_val, y_val = data
+    ensembler = GazerMetaEnsembler.from_state(archive_library)
+    score, ensemble = ensembler.hillclimb(X_val, y_val, n_best=2, iterations=3,
+                                          scoring='log_loss', voting='soft', random_state=0)
+    weights = np.array([weight for _, weight in ensemble])
+    proba = sum(weight * load_model(path).predict_proba(X_val) for path, weight in ensemble)
+    assert score == pytest.approx(log_loss(y_val, proba / weights.sum()), rel=1e-4)
+    # Lower is better: never worse than the best single model
+    best = min(log_loss(y_val, load_model(path).predict_proba(X_val))
+               for _, path in ensembler.models)
+    assert score <= best + 1e-6
+
+
+def test_string_labels(tmpdir, data):
+    X, y, X_val, y_val = data
+    names = np.array(['setosa', 'versicolor', 'virginica'])
+    path = str(tmpdir.join('library'))
+    os.makedirs(os.path.join(path, 'tree'))
+    for depth in (1, 2, 3, 5):
+        model = DecisionTreeClassifier(max_depth=depth, random_state=0).fit(X, names[y])
+        joblib.dump(model, os.path.join(path, 'tree', 'model_{:04d}.pkl'.format(depth)))
+    ensembler = GazerMetaEnsembler.from_state(path)
+    score, ensemble = ensembler.hillclimb(X_val, names[y_val], n_best=1, iterations=2,
+                                          random_state=0)
+    assert score == pytest.approx(accuracy_score(names[y_val], vote(ensemble, X_val, names)))
+
+
+def test_cached_predictions_are_invalidated_by_mtime(file_library, data):
+    X, y, X_val, y_val = data
+    ensembler = GazerMetaEnsembler.from_state(file_library)
+    bus.reset()
+    first = ensembler.hillclimb(X_val, y_val, n_best=1, iterations=2, random_state=0)
+    cached = [f for _, _, files in os.walk(file_library) for f in files
+              if f.endswith(PREDICTIONS_SUFFIX)]
+    assert len(cached) == len(ensembler.models)
+    assert not bus.summary()['counters'].get('prediction_cache_hits')
+
+    # Cached predictions are reused
+    bus.reset()
+    assert ensembler.hillclimb(X_val, y_val, n_best=1, iterations=2, random_state=0) == first
+    assert bus.summary()['counters']['prediction_cache_hits'] == len(ensembler.models)
+
+    # Overwrite the best single model with the weakest one: its cached
+    # predictions are older than the file and must not be used
+    best = first[1][0][0]
+    weak = DecisionTreeClassifier(max_depth=1, random_state=0).fit(X, y)
+    time.sleep(0.01)
+    joblib.dump(weak, best)
+    os.utime(best, None)
+    bus.reset()
+    score, ensemble = ensembler.hillclimb(X_val, y_val, n_best=1, iterations=2, random_state=0)
+    assert bus.summary()['counters']['prediction_cache_hits'] == len(ensembler.models) - 1
+    assert score == pytest.approx(accuracy_score(y_val, vote(ensemble, X_val, np.unique(y_val))))
+
+
+def test_prune():
+    rng = np.random.RandomState(0)
+    y = rng.randint(3, size=1000)
+    best = np.where(rng.rand(1000) < 0.9, y, (y + 1) % 3)
+    # Right on 5 samples where 'best' is wrong, wrong on 10 where it is right
+    near_copy = best.copy()
+    wrong, right = np.flatnonzero(best != y), np.flatnonzero(best == y)
+    near_copy[wrong[:5]] = y[wrong[:5]]
+    near_copy[right[:10]] = (y[right[:10]] + 1) % 3
+    # Only correct where 'best' is correct too
+    dominated = np.where(best == y, best, (y + 2) % 3)
+    dominated[:300] = (y[:300] + 1) % 3
+    diverse = np.where(rng.rand(1000) < 0.8, y, (y + 2) % 3)
+    labels = np.array([best, near_copy, dominated, diverse])
+
+    agreement = _agreement(labels, 3, max_bytes=1000)
+    assert agreement[0, 1] == pytest.approx(0.985)
+    np.testing.assert_allclose(np.diag(agreement), 1.)
+    np.testing.assert_array_equal(_prune(labels, y, 3, threshold=0.98), [0, 3])
+    # The near copy is kept under a stricter threshold, the dominated model never is
+    np.testing.assert_array_equal(_prune(labels, y, 3, threshold=0.99), [0, 1, 3])
+    np.testing.assert_array_equal(_prune(labels, y, 3, threshold=0.98, max_samples=500), [0, 3])
+
+
+def test_hillclimb_on_a_pruned_pool(archive_library, data):
+    _, _, X_val, y_val = data
+    ensembler = GazerMetaEnsembler.from_state(archive_library)
+    bus.reset()
+    score, ensemble = ensembler.hillclimb(X_val, y_val, n_best=1, iterations=2,
+                                          random_state=0, prune=0.9)
+    assert 0 < bus.summary()['counters']['models_pruned'] < len(ensembler.models)
+    assert score == pytest.approx(accuracy_score(y_val, vote(ensemble, X_val, np.unique(y_val))))
+
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from gazer import GazerMetaLearner
+from gazer.instrument import EventBus, JsonLinesSink, bus
+
+
+def test_timer_aggregates_and_forwards_events():
+    events = []
+    local = EventBus()
+    local.subscribe(events.append)
+    for i in range(3):
+        with local.timer('fit', algorithm='logreg') as event:
+            event['score'] = i
+    local.count('cache_hit', n=2)
+
+    stats = local.summary()['stages']['fit']
+    assert stats['count'] == 3
+    assert stats['max'] >= stats['mean'] >= 0
+    assert local.summary()['counters'] == {'cache_hit': 2}
+    assert [e['score'] for e in events if e['event'] == 'stage'] == [0, 1, 2]
+    assert events[-1]['name'] == 'cache_hit'
+
+    local.reset()
+    assert local.summary() == {'stages': {}, 'counters': {}}
+    # Sinks survive a reset
+    local.record('predict', 1.5)
+    assert events[-1]['seconds'] == 1.5
+
+
+def test_errors_are_reported_and_propagate():
+    events = []
+    local = EventBus()
+    local.subscribe(events.append)
+    with pytest.raises(ZeroDivisionError):
+        with local.timer('score'):
+            1 / 0
+    assert 'ZeroDivisionError' in events[0]['error']
+    assert local.summary()['stages']['score']['count'] == 1
+
+
+def test_failing_sink_does_not_interrupt():
+    def broken(event):
+        raise IOError("disk full")
+    events = []
+    local = EventBus()
+    local.subscribe(broken)
+    local.subscribe(events.append)
+    with pytest.warns(UserWarning):
+        local.record('fit', 1.)
+    assert len(events) == 1
+    local.unsubscribe(broken)
+    local.record('fit', 1.)
+    assert len(events) == 2
+
+
+def test_json_lines_sink_and_profiles(tmpdir):
+    path = str(tmpdir.join('events.jsonl'))
+    sink = JsonLinesSink(path)
+    local = EventBus()
+    local.subscribe(sink)
+    local.profile('fit', path=str(tmpdir.join('profiles')), top=3)
+    with local.timer('fit'):
+        sorted(range(10000))
+    local.unprofile()
+    with local.timer('fit'):
+        pass
+    sink.close()
+
+    with open(path) as f:
+        profiled, plain = [json.loads(line) for line in f]
+    assert len(profiled['hotspots']) <= 3
+    assert tmpdir.join('profiles', 'fit_0001.prof').check()
+    assert profiled['peak_bytes'] > 0
+    assert not 'hotspots' in plain
+    with pytest.warns(UserWarning):
+        local.profile('training')
+
+
+def test_learner_reports_to_the_bus(learner_data):
+    X, y = learner_data
+    bus.reset()
+    learner = GazerMetaLearner(method='select', estimators=['logreg', 'gaussian_nb'])
+    learner.fit(X, y)
+    learner.predict(X)
+    stages = bus.summary()['stages']
+    assert stages['construct']['count'] == 2
+    assert stages['fit']['count'] >= 2
+    assert 'predict' in stages
+    bus.reset()
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from sklearn import metrics
+
+from gazer.metrics import StreamingScorer, StreamingLogLoss
+
+
+def _chunks(*arrays, size=7):
+    for start in range(0, len(arrays[0]), size):
+        yield tuple(array[start:start+size] for array in arrays)
+
+
+@pytest.mark.parametrize('metric', ['accuracy', 'precision', 'recall', 'f1'])
+def test_streaming_scores_match_sklearn(metric):
+    rng = np.random.RandomState(0)
+    y_true, y_pred = rng.randint(0, 2, 100), rng.randint(0, 2, 100)
+    scorer = StreamingScorer(metric)
+    for y_chunk, pred_chunk in _chunks(y_true, y_pred):
+        scorer.update(y_chunk, pred_chunk)
+    expected = getattr(metrics, '{}_score'.format(metric))(y_true, y_pred)
+    assert scorer.result() == pytest.approx(expected)
+
+
+def test_auc_of_hard_labels():
+    rng = np.random.RandomState(1)
+    y_true, y_pred = rng.randint(0, 2, 100), rng.randint(0, 2, 100)
+    scorer = StreamingScorer('auc').update(y_true, y_pred)
+    assert scorer.result() == pytest.approx(metrics.roc_auc_score(y_true, y_pred))
+    # Labels without a 1
+    labels = np.array(['no', 'yes'])
+    scorer = StreamingScorer('auc').update(labels[y_true], labels[y_pred])
+    assert scorer.result() == pytest.approx(metrics.roc_auc_score(y_true, y_pred))
+
+
+def test_pos_label():
+    rng = np.random.RandomState(2)
+    y_true = rng.choice(['spam', 'ham'], 50)
+    y_pred = rng.choice(['spam', 'ham'], 50)
+    scorer = StreamingScorer('f1', pos_label='spam').update(y_true, y_pred)
+    assert scorer.result() == pytest.approx(metrics.f1_score(y_true, y_pred, pos_label='spam'))
+    # As in scikit-learn, the default pos_label=1 is not a valid label here
+    with pytest.raises(ValueError):
+        StreamingScorer('precision').update(y_true, y_pred).result()
+    y_true, y_pred = np.where(y_true == 'spam', 1, -1), np.where(y_pred == 'spam', 1, -1)
+    scorer = StreamingScorer('recall', pos_label=-1).update(y_true, y_pred)
+    assert scorer.result() == pytest.approx(metrics.recall_score(y_true, y_pred, pos_label=-1))
+
+
+def test_multiclass():
+    scorer = StreamingScorer('accuracy').update([0, 1, 2, 2], [0, 2, 2, 2])
+    assert scorer.result() == pytest.approx(0.75)
+    with pytest.raises(ValueError):
+        StreamingScorer('f1').update([0, 1, 2], [0, 1, 2]).result()
+    assert np.isnan(StreamingScorer('accuracy').result())
+
+
+def test_streaming_log_loss():
+    rng = np.random.RandomState(3)
+    classes = np.array(['b', 'a', 'c'])
+    y_true = rng.choice(classes, 60)
+    proba = rng.dirichlet(np.ones(3), 60)
+    scorer = StreamingLogLoss(classes)
+    for y_chunk, proba_chunk in _chunks(y_true, proba):
+        scorer.update(y_chunk, proba_chunk)
+    # scikit-learn orders the columns by the sorted labels
+    order = np.argsort(classes)
+    assert scorer.result() == pytest.approx(metrics.log_loss(y_true, proba[:, order],
+                                                             labels=classes[order]))
+    with pytest.raises(ValueError):
+        scorer.update(['d'], proba[:1])
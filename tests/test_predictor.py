@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from sklearn.metrics import accuracy_score
+
+from gazer import EnsemblePredictor
+from gazer.ensembler import GazerMetaEnsembler
+
+
+@pytest.mark.parametrize('voting', ['hard', 'soft'])
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_matches_hillclimb_score(archive_library, data, voting, n_jobs):
+    _, _, X_val, y_val = data
+    ensembler = GazerMetaEnsembler.from_state(archive_library)
+    score, ensemble = ensembler.hillclimb(X_val, y_val, n_best=2, iterations=3,
+                                          random_state=0, voting=voting)
+    with ensembler.predictor(ensemble, voting=voting, n_jobs=n_jobs, batch_size=100) as predictor:
+        assert accuracy_score(y_val, predictor.predict(X_val)) == pytest.approx(score)
+        proba = predictor.predict_proba(X_val)
+        np.testing.assert_allclose(proba.sum(axis=1), 1.)
+        stats = predictor.stats()
+    assert stats['rows'] == 2 * len(y_val)
+    assert stats['batches'] == 2 * int(np.ceil(len(y_val) / 100.))
+    assert len(stats['member_seconds']) == len(predictor)
+
+
+def test_duplicate_members_are_merged(archive_library, data):
+    _, _, X_val, y_val = data
+    ensembler = GazerMetaEnsembler.from_state(archive_library)
+    (_, first), (_, second) = ensembler.models[:2]
+    predictor = EnsemblePredictor([(first, 1.), (second, 2.), (first, 1.), (second, 0.)])
+    assert predictor.paths == [first, second]
+    np.testing.assert_array_equal(predictor.weights, [2., 2.])
+    np.testing.assert_array_equal(predictor.classes_, np.unique(y_val))
+    with pytest.raises(ValueError):
+        EnsemblePredictor([(first, 0.)])
+    with pytest.raises(ValueError):
+        EnsemblePredictor([(first, 1.)], voting='median')
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from sklearn.dummy import DummyClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from gazer.folds import FoldCache
+from gazer.racing import Racer, RacingSearch
+
+
+@pytest.fixture
+def folds(learner_data):
+    X, y = learner_data
+    return FoldCache(X, y, cv=10)
+
+
+def test_full_evaluation_without_pruning(folds):
+    racer = Racer(folds, alpha=0, n_startup=100)
+    estimator = DecisionTreeClassifier(max_depth=3, random_state=0)
+    score, scores, pruned = racer.evaluate(estimator)
+    assert not pruned
+    np.testing.assert_allclose(scores, folds.cross_val_score(estimator))
+    assert score == pytest.approx(scores.mean())
+    assert racer.incumbent is not None
+
+
+def test_poor_candidates_are_dropped_early(folds):
+    racer = Racer(folds, min_folds=2, n_startup=3)
+    for depth in (3, 4, 5):
+        assert not racer.evaluate(DecisionTreeClassifier(max_depth=depth, random_state=0))[2]
+    # A majority vote is worse than the median and than the incumbent
+    score, scores, pruned = racer.evaluate(DummyClassifier(strategy='most_frequent'))
+    assert pruned
+    assert 2 <= len(scores) < folds.n_splits
+    assert racer.n_pruned == 1
+
+
+def error_rate(estimator, X, y):
+    return np.mean(estimator.predict(X) != y)
+
+
+@pytest.mark.parametrize('greater_is_better', [True, False])
+def test_greater_is_better(folds, greater_is_better):
+    racer = Racer(folds, scoring=error_rate, greater_is_better=greater_is_better,
+                  alpha=0, n_startup=1)
+    racer.evaluate(DecisionTreeClassifier(max_depth=3, random_state=0))
+    # A majority vote has a higher error rate
+    pruned = racer.evaluate(DummyClassifier(strategy='most_frequent'))[2]
+    assert pruned != greater_is_better
+
+
+def test_racing_search(learner_data, folds):
+    X, y = learner_data
+    search = RacingSearch(DecisionTreeClassifier(random_state=0),
+                          {'max_depth': [1, 2, 3, 4, 6, 8, None]}, folds, n_iter=7,
+                          random_state=0)
+    search.fit(X, y)
+    results = search.cv_results_
+    assert len(results['params']) == 7
+    # The best candidate ran on all folds
+    best = results['params'].index(search.best_params_)
+    assert not results['pruned'][best]
+    assert results['n_folds'][best] == folds.n_splits
+    assert search.best_score_ == max(score for score, pruned in
+                                     zip(results['mean_test_score'], results['pruned'])
+                                     if not pruned)
+    assert search.predict(X).shape == y.shape
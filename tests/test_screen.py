@@ -0,0 +1,63 @@
+import pytest
+
+from gazer import GazerMetaLearner
+from gazer.core import _extrapolate_score
+
+
+def make_learner():
+    return GazerMetaLearner(method='select', estimators=['logreg', 'gaussian_nb', 'tree'])
+
+
+def test_extrapolate_score():
+    # Linear in log(size), capped at the gain seen over the subsamples
+    assert _extrapolate_score([10, 100], [0.5, 0.6], 1000) == pytest.approx(0.7)
+    assert _extrapolate_score([10, 100], [0.5, 0.6], 10**6) == pytest.approx(0.7)
+    # Learning curves never go down, and lower is better with sign=-1
+    assert _extrapolate_score([10, 100], [0.6, 0.5], 1000) == pytest.approx(0.5)
+    assert _extrapolate_score([10, 100], [0.6, 0.5], 1000, sign=-1.) == pytest.approx(0.4)
+    assert _extrapolate_score([50, 50], [0.5, 0.7], 1000) == 0.5
+
+
+def test_screen_reports_every_algorithm(learner_data):
+    X, y = learner_data
+    learner = make_learner()
+    results = learner.screen(X, y, sizes=(20, 40, 0.5), tolerance=1., random_state=0)
+    assert sorted(results) == sorted(learner.names)
+    for name, result in results.items():
+        assert result['dropped'] is None
+        # 0.5 is a fraction of the 240 training rows
+        assert sorted(result['sizes']) == [20, 40, 120]
+        assert len(result['scores']) == len(result['fit_times']) == 3
+        assert result['predicted_time'] > 0
+        assert 0 <= result['predicted_score'] <= 1
+    # Screening fits are recorded
+    assert len(learner.costs.records(stage='fit')) == 9
+    assert set(r['source'] for r in learner.costs.records()) == {'screen'}
+
+
+def test_dominated_algorithms_are_dropped(learner_data):
+    X, y = learner_data
+    learner = make_learner()
+    # With a negative tolerance, only the fastest algorithm is not dominated
+    results = learner.screen(X, y, sizes=(40, 80), tolerance=-1., random_state=0)
+    kept = [name for name, r in results.items() if r['dropped'] is None]
+    fastest = min(results, key=lambda name: results[name]['predicted_time'])
+    assert kept == [fastest]
+    assert learner.names == kept
+    assert all(r['dropped'].startswith('dominated by') for name, r in results.items()
+               if name != fastest)
+
+
+def test_slow_algorithms_and_dropping_all(learner_data):
+    X, y = learner_data
+    learner = make_learner()
+    with pytest.warns(UserWarning):
+        results = learner.screen(X, y, sizes=(40,), time_limit=0., random_state=0)
+    assert all(r['dropped'] == 'slow' for r in results.values())
+    # Screening would drop all algorithms: all are kept
+    assert sorted(learner.names) == sorted(results)
+
+    learner = make_learner()
+    results = learner.screen(X, y, sizes=(40,), tolerance=-1., drop=False, random_state=0)
+    assert len(learner.names) == 3
+    assert sum(r['dropped'] is not None for r in results.values()) == 2
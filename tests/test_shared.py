@@ -0,0 +1,66 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from gazer.utils.shared import DataHandle, publish, shared, attach
+
+
+@pytest.mark.parametrize('backend', ['memmap', 'shm'])
+def test_workers_attach_to_published_data(backend):
+    X = np.arange(60, dtype=np.float64).reshape(20, 3)
+    y = np.array(['a', 'b'] * 10, dtype=object)
+    with DataHandle(X, y, backend=backend) as data:
+        # Only a reference travels to the workers
+        worker = pickle.loads(pickle.dumps(data))
+        X_worker, y_worker = worker.attach()
+        np.testing.assert_array_equal(X_worker, X)
+        np.testing.assert_array_equal(y_worker, y)
+        assert not X_worker.flags.writeable
+        assert worker.shape == X.shape
+
+
+def test_memmap_folder_is_removed():
+    data = DataHandle(np.ones((5, 2)), backend='memmap')
+    folder = data._folder
+    assert os.path.isdir(folder)
+    data.close()
+    assert not os.path.exists(folder)
+
+
+def test_memory_keeps_data_as_is():
+    pd = pytest.importorskip('pandas')
+    X = pd.DataFrame({'a': [1, 2, 3], 'b': ['x', 'y', 'z']})
+    data = DataHandle(X, backend='memory')
+    assert data.X is X
+    S = sp.random(10, 4, density=0.3, format='coo', random_state=0)
+    assert DataHandle(S, backend='memory').X is S
+
+
+@pytest.mark.parametrize('backend', ['memmap', 'shm'])
+def test_sparse_data(backend):
+    S = sp.random(30, 6, density=0.2, format='coo', random_state=0)
+    with DataHandle(S, np.arange(30), backend=backend) as data:
+        # The worker's handle holds the mapping of its views
+        worker = pickle.loads(pickle.dumps(data))
+        X = worker.X
+        assert sp.isspmatrix_csr(X)
+        assert X.shape == S.shape
+        assert abs(X - S).sum() == 0
+
+
+def test_publish_and_attach():
+    X, y = np.zeros((4, 2)), np.zeros(4)
+    # Serial work never copies data
+    assert publish(X, y, n_jobs=1).backend == 'memory'
+    with shared(X, y, n_jobs=2) as data:
+        assert data.backend == 'memmap'
+        # A handle passed in is used as is, and not closed
+        with shared(data, n_jobs=2) as same:
+            assert same is data
+        assert attach(data)[0].shape == (4, 2)
+    assert attach((X, y)) == (X, y)
+    with pytest.raises(ValueError):
+        DataHandle(X, backend='disk')